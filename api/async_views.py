@@ -0,0 +1,108 @@
+# Async (ASGI) variants of the read endpoints. They share query building,
+# caches and response shapes with the DRF views in products.py/views.py, but
+# await an AsyncElasticsearch client so one worker can keep many searches in
+# flight. Served under /api/async/ when running backend.asgi. Token decoding
+# and cache lookups are blocking (the caches may sit behind memcached/redis),
+# so they run in a worker thread rather than on the event loop.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.views import View
+from .documents import afetch_documents, document_payload
+from .es_client import get_async_es_client
+from .pagination import parse_page_params, parse_track_total
+from .permissions import jwt_payload_from_request
+from .products import PRODUCT_INDEX, page_payload, search_cache_lookup
+from .query_builder import InvalidQuery, build_article_search_body, build_product_search_body
+from .views import ARTICLE_INDEX, article_page_payload, wants_envelope
+
+
+def _in_thread(func):
+    # The wrapped calls are thread-safe, so they need not queue behind each
+    # other on the single thread-sensitive executor.
+    return sync_to_async(func, thread_sensitive=False)
+
+
+class AsyncJWTView(View):
+    """Async base view applying the same bearer-token check as IsAuthenticatedFromJWT."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        if await _in_thread(jwt_payload_from_request)(request) is None:
+            return JsonResponse({"detail": "You do not have permission to perform this action."}, status=403)
+        return await super().dispatch(request, *args, **kwargs)
+
+
+async def _detail_response(request, index, pk):
+    es = get_async_es_client()
+    entry = (await afetch_documents(es, index, [pk]))[0]
+    if entry is None:
+        return HttpResponse(status=404)
+    code, doc, etag = document_payload(request, entry, pk)
+    response = JsonResponse(doc, status=code) if doc is not None else HttpResponse(status=code)
+    if etag:
+        response["ETag"] = etag
+    return response
+
+
+class AsyncProductListView(AsyncJWTView):
+    async def get(self, request):
+        params = request.GET
+        if params.get("cursor") is not None:
+            return JsonResponse({"detail": "cursor pagination is served by /api/products/"}, status=400)
+        page, size = parse_page_params(params)
+        from_ = (page - 1) * size
+        if from_ + size > settings.PRODUCT_MAX_RESULT_WINDOW:
+            return JsonResponse(
+                {"detail": f"page window exceeds {settings.PRODUCT_MAX_RESULT_WINDOW} results; use cursor pagination (cursor=*)"},
+                status=400,
+            )
+        track_total = parse_track_total(params.get("track_total"), settings.PRODUCT_TRACK_TOTAL_HITS)
+        try:
+            body = build_product_search_body(params, track_total)
+        except InvalidQuery as exc:
+            return JsonResponse({"detail": str(exc)}, status=400)
+        cache, cache_key = await _in_thread(search_cache_lookup)(body, from_, size)
+        if cache_key is not None:
+            cached = await _in_thread(cache.get)(cache_key)
+            if cached is not None:
+                return JsonResponse(cached)
+
+        es = get_async_es_client()
+        res = await es.search(index=PRODUCT_INDEX, body=body, from_=from_, size=size, ignore_unavailable=True)
+        payload = page_payload(res, page, size)
+        if cache_key is not None:
+            await _in_thread(cache.set)(cache_key, payload)
+        return JsonResponse(payload)
+
+
+class AsyncProductDetailView(AsyncJWTView):
+    async def get(self, request, pk):
+        return await _detail_response(request, PRODUCT_INDEX, pk)
+
+
+class AsyncArticleListView(AsyncJWTView):
+    async def get(self, request):
+        params = request.GET
+        if params.get("cursor") is not None:
+            return JsonResponse({"detail": "cursor pagination is served by /api/articles/"}, status=400)
+        page, size = parse_page_params(params, settings.ARTICLE_PAGE_SIZE)
+        from_ = (page - 1) * size
+        if from_ + size > settings.ARTICLE_MAX_RESULT_WINDOW:
+            return JsonResponse(
+                {"detail": f"page window exceeds {settings.ARTICLE_MAX_RESULT_WINDOW} results; use cursor pagination (cursor=*)"},
+                status=400,
+            )
+        track_total = parse_track_total(params.get("track_total"), settings.ARTICLE_TRACK_TOTAL_HITS)
+        try:
+            body = build_article_search_body(params, track_total)
+        except InvalidQuery as exc:
+            return JsonResponse({"detail": str(exc)}, status=400)
+        es = get_async_es_client()
+        res = await es.search(index=ARTICLE_INDEX, body=body, from_=from_, size=size, ignore_unavailable=True)
+        envelope = wants_envelope(params)
+        return JsonResponse(article_page_payload(res, page, size, envelope=envelope), safe=envelope)
+
+
+class AsyncArticleDetailView(AsyncJWTView):
+    async def get(self, request, pk):
+        return await _detail_response(request, ARTICLE_INDEX, pk)
@@ -0,0 +1,345 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+
+MISSING = object()
+
+# Named caches register here so their counters can be reported together.
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class LocalLRUCache:
+    """
+    Thread-safe in-process LRU cache with a size bound and per-entry TTL.
+    Entries may carry their own TTL (``set(..., ttl=...)``), which is handy
+    when the cached value has a natural expiry of its own.
+    """
+
+    def __init__(self, max_entries=1024, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=MISSING):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl is not None and ttl <= 0:
+            return
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": "local",
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class DjangoCacheBackend:
+    """
+    Adapter over Django's cache framework (shared across workers when the
+    alias points at memcached/redis). Eviction happens inside the cache
+    server, so only hits and misses are counted here.
+    """
+
+    def __init__(self, alias="default", ttl=30, prefix="api"):
+        from django.core.cache import caches
+        self._cache = caches[alias]
+        self.alias = alias
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key):
+        return f"{self.prefix}:{key}"
+
+    def get(self, key, default=MISSING):
+        value = self._cache.get(self._key(key), MISSING)
+        if value is MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl is not None and ttl <= 0:
+            return
+        self._cache.set(self._key(key), value, ttl)
+
+    def delete(self, key):
+        self._cache.delete(self._key(key))
+
+    def incr(self, key):
+        full_key = self._key(key)
+        # add() is a no-op when the counter already exists.
+        self._cache.add(full_key, 0, None)
+        try:
+            return self._cache.incr(full_key)
+        except ValueError:
+            self._cache.set(full_key, 1, None)
+            return 1
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": "django",
+            "alias": self.alias,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": None,
+        }
+
+
+def build_cache_backend(config, prefix):
+    backend = config.get("BACKEND", "local")
+    if backend in ("", "none", None):
+        return None
+    if backend == "django":
+        return DjangoCacheBackend(config.get("ALIAS", "default"), ttl=config.get("TTL", 30), prefix=prefix)
+    if backend == "local":
+        return LocalLRUCache(max_entries=config.get("MAX_ENTRIES", 1024), ttl=config.get("TTL", 30))
+    raise ValueError(f"unknown cache backend {backend!r}")
+
+
+class GenerationalCache:
+    """
+    Result cache whose keys embed a generation number. Writes bump the
+    generation instead of hunting down affected keys, which makes every
+    older entry unreachable at once; stale entries then age out through
+    LRU eviction or TTL.
+    """
+
+    def __init__(self, name, backend):
+        self.name = name
+        self.backend = backend
+        self._generation = 0
+        self.invalidations = 0
+
+    def generation(self):
+        if isinstance(self.backend, DjangoCacheBackend):
+            return self.backend._cache.get(self.backend._key(f"{self.name}:gen"), 0)
+        return self._generation
+
+    def invalidate(self):
+        self.invalidations += 1
+        if isinstance(self.backend, DjangoCacheBackend):
+            self.backend.incr(f"{self.name}:gen")
+        else:
+            self._generation += 1
+
+    def make_key(self, parts):
+        raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+        digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+        return f"{self.name}:{self.generation()}:{digest}"
+
+    def get(self, key, default=None):
+        return self.backend.get(key, default)
+
+    def set(self, key, value, ttl=None):
+        self.backend.set(key, value, ttl)
+
+    def stats(self):
+        stats = self.backend.stats()
+        stats["generation"] = self.generation()
+        stats["invalidations"] = self.invalidations
+        return stats
+
+
+class TieredCache:
+    """
+    Two-tier cache: a small in-process LRU in front of an optional shared
+    backend. Reads fall through local -> shared and promote shared hits into
+    the local tier; writes and deletes go to both tiers.
+    """
+
+    def __init__(self, local, shared=None, local_ttl=None):
+        self.local = local
+        self.shared = shared
+        self.local_ttl = local_ttl
+
+    def get(self, key, default=None):
+        value = self.local.get(key, MISSING)
+        if value is not MISSING:
+            return value
+        if self.shared is not None:
+            value = self.shared.get(key, MISSING)
+            if value is not MISSING:
+                self.local.set(key, value, self.local_ttl)
+                return value
+        return default
+
+    def set(self, key, value, ttl=None):
+        self.local.set(key, value, self.local_ttl)
+        if self.shared is not None:
+            self.shared.set(key, value, ttl)
+
+    def delete(self, key):
+        self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(key)
+
+    def stats(self):
+        stats = {"local": self.local.stats()}
+        if self.shared is not None:
+            stats["shared"] = self.shared.stats()
+        return stats
+
+
+def register_cache(name, cache):
+    with _registry_lock:
+        _registry[name] = cache
+    return cache
+
+
+def cache_stats():
+    with _registry_lock:
+        caches = dict(_registry)
+    return {name: cache.stats() for name, cache in caches.items()}
+
+
+_product_search_cache = MISSING
+
+
+def get_product_search_cache():
+    """Return the shared product search result cache, or None when disabled."""
+    global _product_search_cache
+    if _product_search_cache is MISSING:
+        backend = build_cache_backend(settings.PRODUCT_SEARCH_CACHE, prefix="search")
+        cache = GenerationalCache("product_search", backend) if backend is not None else None
+        if cache is not None:
+            register_cache("product_search", cache)
+        _product_search_cache = cache
+    return _product_search_cache
+
+
+# A write that did not wait for a refresh only becomes searchable at the next
+# index refresh, so a search in between would cache the old results again
+# under the new generation. Such writes bump the generation a second time
+# once REFRESH_DELAY has passed; one timer thread covers any number of writes.
+_followup_lock = threading.Lock()
+_followup = {"timer": None, "due": 0.0}
+
+
+def _followup_invalidate():
+    with _followup_lock:
+        remaining = _followup["due"] - time.monotonic()
+        if remaining > 0:
+            _start_followup(remaining)
+            return
+        _followup["timer"] = None
+    invalidate_product_search(searchable=True)
+
+
+def _start_followup(delay):
+    timer = threading.Timer(delay, _followup_invalidate)
+    timer.daemon = True
+    _followup["timer"] = timer
+    timer.start()
+
+
+def invalidate_product_search(searchable=False):
+    """
+    Drop cached product search and suggest results. Pass ``searchable=True`` when the
+    change is already visible to searches (``refresh=wait_for``, index
+    create/delete); otherwise results are invalidated again after the
+    index refresh.
+    """
+    caches = [c for c in (get_product_search_cache(), get_product_suggest_cache()) if c is not None]
+    if not caches:
+        return
+    for cache in caches:
+        cache.invalidate()
+    delay = settings.PRODUCT_SEARCH_CACHE.get("REFRESH_DELAY", 0)
+    if searchable or delay <= 0:
+        return
+    with _followup_lock:
+        _followup["due"] = time.monotonic() + delay
+        if _followup["timer"] is None:
+            _start_followup(delay)
+
+
+_product_suggest_cache = MISSING
+
+
+def get_product_suggest_cache():
+    """Return the short-TTL autocomplete cache, or None when disabled."""
+    global _product_suggest_cache
+    if _product_suggest_cache is MISSING:
+        backend = build_cache_backend(settings.PRODUCT_SUGGEST_CACHE, prefix="suggest")
+        cache = GenerationalCache("product_suggest", backend) if backend is not None else None
+        if cache is not None:
+            register_cache("product_suggest", cache)
+        _product_suggest_cache = cache
+    return _product_suggest_cache
+
+
+_document_cache = MISSING
+
+
+def get_document_cache():
+    """Return the shared single-document cache, or None when disabled."""
+    global _document_cache
+    if _document_cache is MISSING:
+        config = settings.DOCUMENT_CACHE
+        cache = None
+        if config.get("MAX_ENTRIES", 0) > 0:
+            local = LocalLRUCache(max_entries=config["MAX_ENTRIES"], ttl=config.get("TTL", 5))
+            shared = None
+            if config.get("SHARED_BACKEND") == "django":
+                shared = DjangoCacheBackend(config.get("SHARED_ALIAS", "default"), ttl=config.get("SHARED_TTL", 60), prefix="doc")
+            cache = register_cache("documents", TieredCache(local, shared, local_ttl=config.get("TTL", 5)))
+        _document_cache = cache
+    return _document_cache
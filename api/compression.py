@@ -0,0 +1,79 @@
+# Negotiated response compression. Brotli is used when the client accepts it
+# and the optional ``brotli`` package is installed, gzip otherwise.
+import gzip
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from .metrics import phase
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+
+def accepted_encodings(header):
+    """Codings from an Accept-Encoding header, minus the ones sent with q=0."""
+    accepted = set()
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding)
+    return accepted
+
+
+def choose_encoding(header):
+    accepted = accepted_encodings(header)
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(data, encoding):
+    config = settings.RESPONSE_COMPRESSION
+    if encoding == "br":
+        return brotli.compress(data, quality=config["BROTLI_QUALITY"])
+    # mtime=0 keeps the output deterministic for identical bodies.
+    return gzip.compress(data, compresslevel=config["GZIP_LEVEL"], mtime=0)
+
+
+def compress_response(request, response):
+    """
+    Compress a finished response in place when it is large enough and the
+    client accepts a coding we support. Streaming responses, responses
+    that already carry a Content-Encoding and responses under
+    ``EXCLUDE_PATHS`` (token endpoints) are returned unchanged.
+    """
+    if response.streaming or response.has_header("Content-Encoding"):
+        return response
+    if request.path.startswith(tuple(settings.RESPONSE_COMPRESSION.get("EXCLUDE_PATHS", ()))):
+        return response
+    if len(response.content) < settings.RESPONSE_COMPRESSION["MIN_BYTES"]:
+        return response
+    patch_vary_headers(response, ("Accept-Encoding",))
+    encoding = choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING"))
+    if encoding is None:
+        return response
+    with phase("compress"):
+        compressed = compress(response.content, encoding)
+    if len(compressed) >= len(response.content):
+        return response
+    response.content = compressed
+    response["Content-Length"] = str(len(compressed))
+    # The compressed body is a different representation of the same
+    # document; a weak ETag still validates it (If-Match accepts W/ too).
+    etag = response.get("ETag")
+    if etag and etag.startswith('"'):
+        response["ETag"] = "W/" + etag
+    response["Content-Encoding"] = encoding
+    return response
@@ -0,0 +1,255 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from elasticsearch import NotFoundError
+from rest_framework import status
+from rest_framework.response import Response
+from .cache import get_document_cache
+
+
+def _cache_key(index, pk):
+    return f"{index}:{pk}"
+
+
+def document_etag(entry):
+    if entry.get("seq_no") is None or entry.get("primary_term") is None:
+        return None
+    return f'"{entry["primary_term"]}-{entry["seq_no"]}"'
+
+
+def _entry_from_hit(hit):
+    return {
+        "source": hit["_source"],
+        "seq_no": hit.get("_seq_no"),
+        "primary_term": hit.get("_primary_term"),
+    }
+
+
+def _project(source, fields):
+    return {k: v for k, v in source.items() if k in fields}
+
+
+def _split_cached(index, ids):
+    cache = get_document_cache()
+    found = {}
+    # A dict rather than a list: constant-time membership, insertion order kept.
+    missing = {}
+    for pk in ids:
+        if pk in found or pk in missing:
+            continue
+        entry = cache.get(_cache_key(index, pk)) if cache is not None else None
+        if entry is not None:
+            found[pk] = entry
+        else:
+            missing[pk] = None
+    return found, list(missing)
+
+
+def _mget_kwargs(index, missing, fields):
+    kwargs = {"index": index, "ids": missing}
+    if fields:
+        kwargs["source_includes"] = list(fields)
+    return kwargs
+
+
+def _absorb_mget(index, res, found, fields):
+    cache = get_document_cache()
+    for hit in res.get("docs", []):
+        if not hit.get("found"):
+            continue
+        entry = _entry_from_hit(hit)
+        found[hit["_id"]] = entry
+        if cache is not None and not fields:
+            cache.set(_cache_key(index, hit["_id"]), entry)
+
+
+def _in_request_order(ids, found, fields):
+    results = []
+    for pk in ids:
+        entry = found.get(pk)
+        if entry is not None and fields:
+            entry = dict(entry, source=_project(entry["source"], fields))
+        results.append(entry)
+    return results
+
+
+def fetch_documents(es, index, ids, fields=None):
+    """
+    Resolve ``ids`` in request order with at most one ``mget`` round trip.
+    Each result is a cache entry ``{"source", "seq_no", "primary_term"}`` or
+    None for a miss. Full documents read from the cluster populate the cache;
+    with ``fields`` the cluster is asked only for those ``_source`` fields
+    and cached documents are projected locally. Callers must copy
+    ``source`` before modifying it.
+    """
+    found, missing = _split_cached(index, ids)
+    if missing:
+        try:
+            res = es.mget(**_mget_kwargs(index, missing, fields))
+        except NotFoundError:
+            res = {"docs": []}
+        _absorb_mget(index, res, found, fields)
+    return _in_request_order(ids, found, fields)
+
+
+async def afetch_documents(es, index, ids, fields=None):
+    """:func:`fetch_documents` for an ``AsyncElasticsearch`` client."""
+    # The document cache may be shared (memcached/redis): keep its I/O off the event loop.
+    found, missing = await sync_to_async(_split_cached, thread_sensitive=False)(index, ids)
+    if missing:
+        try:
+            res = await es.mget(**_mget_kwargs(index, missing, fields))
+        except NotFoundError:
+            res = {"docs": []}
+        await sync_to_async(_absorb_mget, thread_sensitive=False)(index, res, found, fields)
+    return _in_request_order(ids, found, fields)
+
+
+def fetch_document(es, index, pk):
+    """Read-through lookup of a single document; None when it does not exist."""
+    return fetch_documents(es, index, [pk])[0]
+
+
+def store_document(index, pk, source, write_result):
+    """Write-through after an index call, using the seq_no it returned."""
+    entry = {
+        "source": source,
+        "seq_no": write_result.get("_seq_no"),
+        "primary_term": write_result.get("_primary_term"),
+    }
+    return remember_document(index, pk, entry)
+
+
+def remember_document(index, pk, entry):
+    cache = get_document_cache()
+    if cache is not None:
+        cache.set(_cache_key(index, pk), entry)
+    return entry
+
+
+def entry_from_update(res):
+    """Cache entry from an ``_update`` response made with ``source=True``."""
+    return {
+        "source": res["get"]["_source"],
+        "seq_no": res.get("_seq_no"),
+        "primary_term": res.get("_primary_term"),
+    }
+
+
+def parse_if_match(header):
+    """
+    Turn an ``If-Match`` ETag into ``if_seq_no``/``if_primary_term`` kwargs
+    ({} when absent). Raises ValueError for anything that is not one of our
+    ETags, which callers answer with 412.
+    """
+    if not header:
+        return {}
+    value = header.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    try:
+        primary_term, seq_no = value.strip('"').split("-", 1)
+        return {"if_primary_term": int(primary_term), "if_seq_no": int(seq_no)}
+    except ValueError:
+        raise ValueError("If-Match must be an ETag returned by this API")
+
+
+def refresh_kwargs(request):
+    """
+    Map the ``refresh`` query parameter onto write kwargs: ``wait_for``
+    blocks until the change is searchable (read-your-writes), ``false``
+    returns as soon as it is durable. Returns None for anything else.
+    """
+    value = request.query_params.get("refresh") or settings.ES_WRITE_REFRESH
+    value = value.lower()
+    if value in ("false", "0", "no"):
+        return {}
+    if value == "wait_for":
+        return {"refresh": "wait_for"}
+    return None
+
+
+def invalid_refresh():
+    return Response({"detail": "refresh must be false or wait_for"}, status=status.HTTP_400_BAD_REQUEST)
+
+
+def update_document(es, index, pk, partial, if_match=None, retry_on_conflict=3, **write_kwargs):
+    """
+    Apply a partial document with ``_update`` and write the merged result
+    through to the cache. With ``if_match`` the update only succeeds
+    against that exact version (ConflictError otherwise); without it the
+    cluster retries internal version conflicts itself.
+    """
+    kwargs = {"index": index, "id": pk, "doc": partial, "source": True, **write_kwargs}
+    if if_match:
+        kwargs.update(if_match)
+    else:
+        kwargs["retry_on_conflict"] = retry_on_conflict
+    res = es.update(**kwargs)
+    return remember_document(index, pk, entry_from_update(res))
+
+
+def write_response(entry, pk, code=status.HTTP_200_OK):
+    """Response for a successful write: the stored document plus its new ETag."""
+    doc = dict(entry["source"])
+    doc["id"] = pk
+    response = Response(doc, status=code)
+    etag = document_etag(entry)
+    if etag:
+        response["ETag"] = etag
+    return response
+
+
+def precondition_failed(detail="document was modified; fetch it again and retry"):
+    return Response({"detail": detail}, status=status.HTTP_412_PRECONDITION_FAILED)
+
+
+def invalidate_document(index, pk):
+    cache = get_document_cache()
+    if cache is not None:
+        cache.delete(_cache_key(index, pk))
+
+
+def _etag_matches(header, etag):
+    if not header or not etag:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [c.strip() for c in header.split(",")]
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+def document_payload(request, entry, pk):
+    """Return (status, body, etag) for a GET of ``entry``; 304 when the client's copy is current."""
+    etag = document_etag(entry)
+    if _etag_matches(request.headers.get("If-None-Match"), etag):
+        return status.HTTP_304_NOT_MODIFIED, None, etag
+    doc = dict(entry["source"])
+    doc["id"] = pk
+    return status.HTTP_200_OK, doc, etag
+
+
+def document_response(request, entry, pk):
+    code, doc, etag = document_payload(request, entry, pk)
+    response = Response(doc, status=code)
+    if etag:
+        response["ETag"] = etag
+    return response
+
+
+def mget_payload(ids, entries):
+    docs = []
+    for pk, entry in zip(ids, entries):
+        if entry is None:
+            docs.append({"id": pk, "found": False})
+            continue
+        doc = dict(entry["source"])
+        doc["id"] = pk
+        docs.append({"id": pk, "found": True, "doc": doc})
+    return {"docs": docs}
+
+
+def mget_response(es, index, data):
+    """Shared handler body for the ``_mget`` endpoints."""
+    ids = data["ids"]
+    entries = fetch_documents(es, index, ids, data.get("fields") or None)
+    return Response(mget_payload(ids, entries))
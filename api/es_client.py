@@ -1,8 +1,204 @@
-from elasticsearch import Elasticsearch
+import asyncio
+import os
+import threading
+import time
+import weakref
+from elasticsearch import ApiError, AsyncElasticsearch, Elasticsearch
 from django.conf import settings
+from django.utils.module_loading import import_string
+from .metrics import record_es_call
 
-def get_es_client():
-    es_args = {"hosts": [settings.ELASTICSEARCH_HOST]}
+# One client (and therefore one HTTP connection pool) per worker process.
+# The client is created lazily on first use and dropped in forked children,
+# since sockets inherited from the parent must never be shared.
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+_stats = {"clients_created": 0, "client_reuses": 0}
+
+
+def _took(response):
+    body = getattr(response, "body", None)
+    return body.get("took") if isinstance(body, dict) else None
+
+
+class InstrumentedElasticsearch(Elasticsearch):
+    """Elasticsearch client that records wall time and ``took`` for every call."""
+
+    def perform_request(self, method, path, *, params=None, headers=None, body=None, endpoint_id=None, path_parts=None):
+        index = (path_parts or {}).get("index")
+        start = time.perf_counter()
+        try:
+            response = super().perform_request(
+                method, path, params=params, headers=headers, body=body, endpoint_id=endpoint_id, path_parts=path_parts
+            )
+        except ApiError as exc:
+            record_es_call(endpoint_id, time.perf_counter() - start, exc.meta.status, body=body, index=index)
+            raise
+        except Exception:
+            record_es_call(endpoint_id, time.perf_counter() - start, "error", body=body, index=index)
+            raise
+        record_es_call(endpoint_id, time.perf_counter() - start, response.meta.status, _took(response), body, index)
+        return response
+
+
+class InstrumentedAsyncElasticsearch(AsyncElasticsearch):
+    async def perform_request(self, method, path, *, params=None, headers=None, body=None, endpoint_id=None, path_parts=None):
+        index = (path_parts or {}).get("index")
+        start = time.perf_counter()
+        try:
+            response = await super().perform_request(
+                method, path, params=params, headers=headers, body=body, endpoint_id=endpoint_id, path_parts=path_parts
+            )
+        except ApiError as exc:
+            record_es_call(endpoint_id, time.perf_counter() - start, exc.meta.status, body=body, index=index)
+            raise
+        except Exception:
+            record_es_call(endpoint_id, time.perf_counter() - start, "error", body=body, index=index)
+            raise
+        record_es_call(endpoint_id, time.perf_counter() - start, response.meta.status, _took(response), body, index)
+        return response
+
+
+def _build_client_kwargs():
+    es_args = {
+        "hosts": [settings.ELASTICSEARCH_HOST],
+        "connections_per_node": settings.ELASTICSEARCH_POOL_MAXSIZE,
+        "request_timeout": settings.ELASTICSEARCH_REQUEST_TIMEOUT,
+        "max_retries": settings.ELASTICSEARCH_MAX_RETRIES,
+        "retry_on_timeout": settings.ELASTICSEARCH_RETRY_ON_TIMEOUT,
+        "http_compress": settings.ELASTICSEARCH_HTTP_COMPRESS,
+    }
     if settings.ELASTICSEARCH_USER and settings.ELASTICSEARCH_PASSWORD:
         es_args["basic_auth"] = (settings.ELASTICSEARCH_USER, settings.ELASTICSEARCH_PASSWORD)
-    return Elasticsearch(**es_args)
+    if not settings.ELASTICSEARCH_KEEP_ALIVE:
+        es_args["headers"] = {"connection": "close"}
+    if settings.ELASTICSEARCH_SNIFF_ON_START:
+        es_args["sniff_on_start"] = True
+    if settings.ELASTICSEARCH_SNIFF_ON_NODE_FAILURE:
+        es_args["sniff_on_node_failure"] = True
+    if settings.ELASTICSEARCH_SNIFF_INTERVAL:
+        es_args["min_delay_between_sniffing"] = settings.ELASTICSEARCH_SNIFF_INTERVAL
+    return es_args
+
+
+def _new_client():
+    # ELASTICSEARCH_CLIENT_FACTORY swaps in another client (a local stand-in
+    # or a test double for benchmarks) without touching the call sites. No
+    # factory ships with the app; SEARCH_BACKEND=memory is its own stand-in.
+    factory = settings.ELASTICSEARCH_CLIENT_FACTORY
+    if factory:
+        return import_string(factory)()
+    if settings.SEARCH_BACKEND == "memory":
+        from .memory_client import MemoryElasticsearch
+
+        return MemoryElasticsearch()
+    return InstrumentedElasticsearch(**_build_client_kwargs())
+
+
+def get_es_client():
+    global _client, _client_pid
+    pid = os.getpid()
+    client = _client
+    if client is not None and _client_pid == pid:
+        _stats["client_reuses"] += 1
+        return client
+    with _client_lock:
+        if _client is None or _client_pid != pid:
+            _client = _new_client()
+            _client_pid = pid
+            _stats["clients_created"] += 1
+        else:
+            _stats["client_reuses"] += 1
+        return _client
+
+
+# AsyncElasticsearch connections belong to the event loop that opened them,
+# so async clients are kept per loop (normally one per ASGI worker).
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_es_client():
+    """Return the shared AsyncElasticsearch client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        if settings.SEARCH_BACKEND == "memory":
+            from .memory_client import AsyncMemoryElasticsearch
+
+            client = AsyncMemoryElasticsearch()
+        else:
+            client = InstrumentedAsyncElasticsearch(**_build_client_kwargs())
+        _async_clients[loop] = client
+        _stats["clients_created"] += 1
+    else:
+        _stats["client_reuses"] += 1
+    return client
+
+
+async def close_async_es_client():
+    """Close the async client of the running event loop, if it opened one."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+
+
+def close_es_client():
+    global _client, _client_pid
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+        _client_pid = None
+
+
+def _reset_after_fork():
+    # Do not close the inherited client: its sockets belong to the parent.
+    global _client, _client_pid, _client_lock
+    _client = None
+    _client_pid = None
+    _client_lock = threading.Lock()
+    _async_clients.clear()
+    _stats["clients_created"] = 0
+    _stats["client_reuses"] = 0
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_es_pool_stats():
+    """
+    Report connection pool utilization for the current process's client.
+    Connection reuse is derived from urllib3's per-pool counters: every
+    request that did not need a new connection reused a kept-alive one.
+    """
+    stats = {
+        "pid": os.getpid(),
+        "initialized": _client is not None and _client_pid == os.getpid(),
+        "clients_created": _stats["clients_created"],
+        "client_reuses": _stats["client_reuses"],
+        "pool_maxsize": settings.ELASTICSEARCH_POOL_MAXSIZE,
+        "nodes": [],
+    }
+    if not stats["initialized"]:
+        return stats
+    for node in _client.transport.node_pool.all():
+        pool = getattr(node, "pool", None)
+        node_stats = {"base_url": node.base_url}
+        if pool is not None and hasattr(pool, "num_connections"):
+            queue = getattr(pool, "pool", None)
+            maxsize = getattr(queue, "maxsize", 0) if queue is not None else 0
+            available = queue.qsize() if queue is not None else 0
+            idle = sum(1 for conn in list(getattr(queue, "queue", [])) if conn is not None)
+            node_stats.update({
+                "maxsize": maxsize,
+                "in_use": max(maxsize - available, 0),
+                "idle": idle,
+                "utilization": round((maxsize - available) / maxsize, 3) if maxsize else 0.0,
+                "connections_opened": pool.num_connections,
+                "requests": pool.num_requests,
+                "connections_reused": max(pool.num_requests - pool.num_connections, 0),
+            })
+        stats["nodes"].append(node_stats)
+    return stats
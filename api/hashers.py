@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    BCryptSHA256PasswordHasher,
+    PBKDF2PasswordHasher,
+)
+
+# Hashers whose cost is read from settings.PASSWORD_HASH_COST. They keep the
+# stock algorithm names, so hashes stay interchangeable with Django's own
+# hashers and a cost change is picked up by must_update() on the next login.
+
+
+def _cost(name, default):
+    value = settings.PASSWORD_HASH_COST.get(name)
+    return default if value in (None, 0) else value
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return _cost("PBKDF2_ITERATIONS", PBKDF2PasswordHasher.iterations)
+
+
+class TunableArgon2PasswordHasher(Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return _cost("ARGON2_TIME_COST", Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return _cost("ARGON2_MEMORY_COST", Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return _cost("ARGON2_PARALLELISM", Argon2PasswordHasher.parallelism)
+
+
+class TunableBCryptSHA256PasswordHasher(BCryptSHA256PasswordHasher):
+    @property
+    def rounds(self):
+        return _cost("BCRYPT_ROUNDS", BCryptSHA256PasswordHasher.rounds)
@@ -0,0 +1,344 @@
+# Single registry of index definitions. Every logical index ("products")
+# is an alias pointing at a versioned concrete index ("products_v1") with
+# is_write_index set, so reads and writes keep using the plain name while a
+# rebuilt index can be swapped in atomically.
+import time
+from elasticsearch import NotFoundError
+
+
+class IndexMigrationError(Exception):
+    pass
+
+
+INDEX_DEFINITIONS = {
+    "users": {
+        "version": 1,
+        "settings": {},
+        "mappings": {
+            "properties": {
+                "id": {"type": "keyword"},
+                "username": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
+                "email": {"type": "keyword"},
+                "password": {"type": "keyword"},
+                "created_at": {"type": "date"},
+                "updated_at": {"type": "date"}
+            }
+        },
+        # Date fields used by the reindex catch-up pass to find documents
+        # written while the bulk copy was running.
+        "changed_fields": ["created_at", "updated_at"],
+    },
+    "articles": {
+        "version": 1,
+        "settings": {},
+        "mappings": {
+            "properties": {
+                "title": {"type": "text"},
+                "content": {"type": "text"},
+                "author": {"type": "keyword"},
+                "created_at": {"type": "date"},
+                "updated_at": {"type": "date"}
+            }
+        },
+        "changed_fields": ["created_at", "updated_at"],
+    },
+    "products": {
+        # v3: search_as_you_type fields for GET /api/products/suggest/. They
+        # are top-level fields filled by copy_to; search_as_you_type cannot be
+        # declared as a multi-field of name/sku.
+        "version": 3,
+        "settings": {},
+        "mappings": {
+            "properties": {
+                "id": {"type": "keyword"},
+                "sku": {"type": "keyword", "copy_to": "sku_suggest"},
+                "sku_suggest": {"type": "search_as_you_type", "max_shingle_size": 2},
+                "name": {
+                    "type": "text",
+                    "fields": {
+                        "keyword": {"type": "keyword"}
+                    },
+                    "copy_to": "name_suggest"
+                },
+                "name_suggest": {"type": "search_as_you_type"},
+                "description": {"type": "text"},
+                "price": {"type": "double"},
+                "category": {"type": "keyword"},
+                "in_stock": {"type": "boolean"},
+                "stock": {"type": "integer"},
+                "tags": {"type": "keyword"},
+                "created_at": {"type": "date"},
+                "updated_at": {"type": "date"}
+            }
+        },
+        "changed_fields": ["created_at", "updated_at"],
+    },
+    "tokens": {
+        # Refresh-token state for api.token_store.ElasticsearchTokenStore;
+        # one document per jti, revoked once revoked_at is set.
+        "version": 1,
+        "settings": {},
+        "mappings": {
+            "properties": {
+                "user_id": {"type": "keyword"},
+                "issued_at": {"type": "date"},
+                "expires_at": {"type": "date"},
+                "revoked_at": {"type": "date"}
+            }
+        },
+        "changed_fields": ["issued_at", "revoked_at"],
+    },
+}
+
+
+def get_definition(name):
+    try:
+        return INDEX_DEFINITIONS[name]
+    except KeyError:
+        raise IndexMigrationError(f"unknown index {name!r}; choose from {', '.join(INDEX_DEFINITIONS)}")
+
+
+def versioned_name(name, version=None):
+    if version is None:
+        version = get_definition(name)["version"]
+    return f"{name}_v{version}"
+
+
+def index_body(name):
+    definition = get_definition(name)
+    body = {"mappings": definition["mappings"]}
+    if definition.get("settings"):
+        body["settings"] = definition["settings"]
+    return body
+
+
+def alias_targets(es, name):
+    """Concrete indices behind the alias ``name`` ([] when the alias does not exist)."""
+    try:
+        return sorted(es.indices.get_alias(name=name).keys())
+    except NotFoundError:
+        return []
+
+
+def is_legacy_index(es, name):
+    """True when ``name`` is a concrete index created before aliases were used."""
+    return not alias_targets(es, name) and bool(es.indices.exists(index=name))
+
+
+def ensure_index(es, name):
+    """
+    Create the current version of ``name`` behind its alias unless the alias
+    (or a legacy concrete index of that name) already exists. Returns the
+    concrete index name when one was created, else None.
+    """
+    if alias_targets(es, name) or es.indices.exists(index=name):
+        return None
+    target = versioned_name(name)
+    body = index_body(name)
+    body["aliases"] = {name: {"is_write_index": True}}
+    es.indices.create(index=target, body=body)
+    return target
+
+
+def is_current(es, name):
+    """True when the alias ``name`` points at the registry's current version only."""
+    return alias_targets(es, name) == [versioned_name(name)]
+
+
+def sync_mapping(es, name):
+    """
+    Add fields that exist in the registry but not yet in the live index.
+    Only additive changes to the current version can be applied in place;
+    an index on an older version is rebuilt with ``reindex`` instead.
+    """
+    if not is_current(es, name):
+        raise IndexMigrationError(f"{name} is not on {versioned_name(name)}; run `manage.py reindex {name}`")
+    es.indices.put_mapping(index=name, properties=get_definition(name)["mappings"]["properties"])
+
+
+def delete_index(es, name):
+    """Delete every concrete index behind ``name``; returns the deleted names."""
+    targets = alias_targets(es, name)
+    if not targets and es.indices.exists(index=name):
+        targets = [name]
+    for target in targets:
+        es.indices.delete(index=target)
+    return targets
+
+
+def _bulk_load_settings(es, index):
+    current = es.indices.get_settings(index=index, flat_settings=True)[index]["settings"]
+    restore = {
+        "index.refresh_interval": current.get("index.refresh_interval"),
+        "index.number_of_replicas": current.get("index.number_of_replicas", "1"),
+    }
+    es.indices.put_settings(index=index, settings={"index.refresh_interval": "-1", "index.number_of_replicas": 0})
+    return restore
+
+
+def _run_reindex(es, source, dest, query=None, slices="auto", requests_per_second=None, poll_interval=2.0, progress=None):
+    src = {"index": source}
+    if query is not None:
+        src["query"] = query
+    kwargs = {"slices": slices, "wait_for_completion": False, "conflicts": "proceed"}
+    if requests_per_second:
+        kwargs["requests_per_second"] = requests_per_second
+    # version_type=external keeps a newer copy already in dest from being
+    # overwritten by an older one during the catch-up pass.
+    task_id = es.reindex(source=src, dest={"index": dest, "version_type": "external"}, **kwargs)["task"]
+    while True:
+        task = es.tasks.get(task_id=task_id)
+        status = task.get("task", {}).get("status", {})
+        if progress is not None:
+            progress(status)
+        if task.get("completed"):
+            break
+        time.sleep(poll_interval)
+    if task.get("error"):
+        raise IndexMigrationError(f"reindex {source} -> {dest} failed: {task['error']}")
+    response = task.get("response", {})
+    if response.get("failures"):
+        raise IndexMigrationError(f"reindex {source} -> {dest} reported {len(response['failures'])} failures")
+    return response
+
+
+def _catch_up(es, definition, source, dest, since, slices, poll_interval, progress):
+    # Copy documents created or updated in ``source`` since ``since``.
+    fields = definition.get("changed_fields") or []
+    if not fields:
+        return {}
+    query = {"bool": {"should": [{"range": {f: {"gte": since}}} for f in fields], "minimum_should_match": 1}}
+    return _run_reindex(es, source, dest, query=query, slices=slices, poll_interval=poll_interval, progress=progress)
+
+
+def _timestamp(seconds_ago=1):
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(time.time() - seconds_ago))
+
+
+def _count(es, indices):
+    return sum(es.count(index=index)["count"] for index in indices)
+
+
+def _remove_deleted(es, sources, dest, batch_size=1000, keep_alive="5m"):
+    """Delete documents from ``dest`` that no longer exist in any of ``sources``; returns how many."""
+    es.indices.refresh(index=dest)
+    pit_id = es.open_point_in_time(index=dest, keep_alive=keep_alive)["id"]
+    removed = 0
+    after = None
+    try:
+        while True:
+            body = {"size": batch_size, "_source": False, "sort": ["_shard_doc"],
+                    "pit": {"id": pit_id, "keep_alive": keep_alive}}
+            if after is not None:
+                body["search_after"] = after
+            res = es.search(body=body)
+            pit_id = res.get("pit_id", pit_id)
+            hits = res["hits"]["hits"]
+            if not hits:
+                break
+            missing = {hit["_id"] for hit in hits}
+            for source in sources:
+                docs = es.mget(index=source, ids=list(missing), source=False)["docs"]
+                missing -= {doc["_id"] for doc in docs if doc.get("found")}
+            if missing:
+                es.bulk(operations=[{"delete": {"_index": dest, "_id": doc_id}} for doc_id in missing])
+                removed += len(missing)
+            if len(hits) < batch_size:
+                break
+            after = hits[-1]["sort"]
+    finally:
+        try:
+            es.close_point_in_time(id=pit_id)
+        except Exception:
+            pass
+    return removed
+
+
+def reindex(es, name, version=None, slices="auto", requests_per_second=None, delete_old=False,
+            poll_interval=2.0, progress=None):
+    """
+    Rebuild ``name`` into a new versioned index from the registry mapping
+    and swap the alias over in one atomic update_aliases call.
+
+    The copy is a server-side ``_reindex`` (sliced, optionally throttled)
+    into an index with refresh disabled and no replicas; both are restored
+    before the swap. Documents written to the old index while the copy ran
+    are picked up by catch-up passes filtered on the definition's
+    ``changed_fields``, and documents deleted from it are removed from the
+    copy. The last catch-up and the swap run with the old index blocked for
+    writes, so nothing written in between is lost; writes made in that
+    window are rejected by Elasticsearch. A legacy concrete index with the
+    alias's name is removed in the same alias update (``remove_index``).
+    """
+    definition = get_definition(name)
+    sources = alias_targets(es, name)
+    legacy = False
+    if not sources:
+        if not es.indices.exists(index=name):
+            raise IndexMigrationError(f"{name} does not exist; run migrate_es to create it")
+        sources = [name]
+        legacy = True
+
+    dest = versioned_name(name, version or definition["version"])
+    if dest in sources:
+        raise IndexMigrationError(f"{name} already points at {dest}; bump the version in INDEX_DEFINITIONS or pass a new version")
+    if es.indices.exists(index=dest):
+        raise IndexMigrationError(f"{dest} already exists; delete it or choose another version")
+
+    es.indices.create(index=dest, body=index_body(name))
+    restore = _bulk_load_settings(es, dest)
+    source = ",".join(sources)
+    started = _timestamp()
+    swapped = False
+    try:
+        copied = _run_reindex(es, source, dest, slices=slices, requests_per_second=requests_per_second,
+                              poll_interval=poll_interval, progress=progress)
+        # Catch up while writes still flow, then block them for a short
+        # final pass over what changed since.
+        last_pass = _timestamp()
+        catch_up = _catch_up(es, definition, source, dest, started, slices, poll_interval, progress)
+        removed = _remove_deleted(es, sources, dest)
+        es.indices.put_settings(index=source, settings={"index.blocks.write": True})
+        try:
+            final = _catch_up(es, definition, source, dest, last_pass, slices, poll_interval, progress)
+            es.indices.refresh(index=source)
+            es.indices.refresh(index=dest)
+            # dest now holds every source document, so equal counts mean no
+            # deletes were missed since the sweep above.
+            if _count(es, [dest]) != _count(es, sources):
+                removed += _remove_deleted(es, sources, dest)
+            es.indices.put_settings(index=dest, settings=restore)
+            es.indices.refresh(index=dest)
+
+            actions = []
+            if legacy:
+                actions.append({"remove_index": {"index": name}})
+            else:
+                actions.extend({"remove": {"index": src, "alias": name}} for src in sources)
+            actions.append({"add": {"index": dest, "alias": name, "is_write_index": True}})
+            es.indices.update_aliases(actions=actions)
+            swapped = True
+        finally:
+            if not (swapped and legacy):
+                es.indices.put_settings(index=source, settings={"index.blocks.write": None})
+    except Exception:
+        if not swapped:
+            es.indices.delete(index=dest)
+        raise
+
+    deleted = []
+    if delete_old and not legacy:
+        for src in sources:
+            es.indices.delete(index=src)
+            deleted.append(src)
+    return {
+        "alias": name,
+        "source": sources,
+        "dest": dest,
+        "copied": copied.get("total", 0),
+        "caught_up": catch_up.get("total", 0) + final.get("total", 0),
+        "removed": removed,
+        "took_ms": copied.get("took", 0) + catch_up.get("took", 0) + final.get("took", 0),
+        "legacy_removed": legacy,
+        "deleted": deleted,
+    }
@@ -0,0 +1,105 @@
+# Stock changes applied inside Elasticsearch with a painless script, so
+# concurrent decrements never read-modify-write from the application and
+# only the affected fields travel over the wire.
+from datetime import datetime
+from elasticsearch import helpers
+from .documents import entry_from_update, invalidate_document, remember_document
+from .scripts import painless
+
+STOCK_SCRIPT = """
+long current = ctx._source.stock == null ? 0 : ctx._source.stock;
+long next = params.containsKey('set') ? params.set : current + params.delta;
+if (next < 0 && !params.allow_negative) {
+  ctx.op = 'noop';
+} else {
+  ctx._source.stock = next;
+  ctx._source.in_stock = next > 0;
+  ctx._source.updated_at = params.now;
+}
+"""
+
+
+@painless(STOCK_SCRIPT)
+def _stock_script(source, params):
+    current = source.get("stock") or 0
+    next_stock = params["set"] if "set" in params else current + params["delta"]
+    if next_stock < 0 and not params.get("allow_negative"):
+        return False
+    source["stock"] = next_stock
+    source["in_stock"] = next_stock > 0
+    source["updated_at"] = params["now"]
+    return True
+
+
+class InsufficientStock(Exception):
+    pass
+
+
+def stock_script(delta=None, set_to=None, allow_negative=False):
+    params = {"allow_negative": allow_negative, "now": datetime.utcnow().isoformat()}
+    if set_to is not None:
+        params["set"] = set_to
+    else:
+        params["delta"] = delta
+    return {"source": STOCK_SCRIPT, "lang": "painless", "params": params}
+
+
+def apply_stock_change(es, index, pk, delta=None, set_to=None, allow_negative=False, retry_on_conflict=5, **write_kwargs):
+    """
+    Change one product's stock atomically and return the updated cache
+    entry. Raises InsufficientStock when a decrement would go below zero
+    (the script turns it into a noop) and NotFoundError for unknown ids.
+    """
+    res = es.update(
+        index=index,
+        id=pk,
+        script=stock_script(delta, set_to, allow_negative),
+        retry_on_conflict=retry_on_conflict,
+        source=True,
+        **write_kwargs,
+    )
+    if res.get("result") == "noop":
+        invalidate_document(index, pk)
+        raise InsufficientStock(pk)
+    return remember_document(index, pk, entry_from_update(res))
+
+
+def bulk_stock_changes(es, index, changes, chunk_size=500, retry_on_conflict=5, **write_kwargs):
+    """
+    Apply many stock changes through ``_bulk`` scripted updates. ``changes``
+    is an iterable of dicts with ``id`` and either ``delta`` or ``set``.
+    Returns a summary with per-id errors; ids whose decrement would go
+    negative are reported as ``insufficient``.
+    """
+    summary = {"updated": 0, "insufficient": [], "not_found": [], "failed": 0, "errors": []}
+
+    def actions():
+        for change in changes:
+            yield {
+                "_op_type": "update",
+                "_index": index,
+                "_id": change["id"],
+                "retry_on_conflict": retry_on_conflict,
+                "script": stock_script(change.get("delta"), change.get("set"), change.get("allow_negative", False)),
+            }
+
+    for ok, item in helpers.streaming_bulk(
+        es, actions(), chunk_size=chunk_size, raise_on_error=False, raise_on_exception=False, **write_kwargs
+    ):
+        info = item.get("update", {})
+        pk = info.get("_id")
+        invalidate_document(index, pk)
+        if ok:
+            if info.get("result") == "noop":
+                summary["insufficient"].append(pk)
+            else:
+                summary["updated"] += 1
+        elif info.get("status") == 404:
+            summary["not_found"].append(pk)
+        else:
+            error = info.get("error")
+            if isinstance(error, dict):
+                error = f"{error.get('type')}: {error.get('reason')}"
+            summary["failed"] += 1
+            summary["errors"].append({"id": pk, "error": str(error)})
+    return summary
@@ -0,0 +1,211 @@
+import http.client
+import itertools
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from api.bench import summarize, write_results
+from api.synthetic import CATEGORIES, SEARCH_TERMS, synthetic_products
+
+SCENARIOS = ("login", "search", "detail", "bulk")
+
+
+class TestClientTransport:
+    """In-process requests through Django's test client (one client per thread)."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, content_type="application/json", token=None):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = Client(raise_request_exception=False)
+        extra = {"HTTP_AUTHORIZATION": f"Bearer {token}"} if token else {}
+        if method == "GET":
+            response = client.get(path, **extra)
+        else:
+            response = client.generic(method, path, body or b"", content_type=content_type, **extra)
+        return response.status_code, response.content
+
+
+class LiveServerTransport:
+    """Requests to a running server over one keep-alive connection per thread."""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        if parts.scheme != "http":
+            raise CommandError("only plain http:// URLs are supported")
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, content_type="application/json", token=None):
+        headers = {"Content-Type": content_type}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        for attempt in (0, 1):
+            conn = getattr(self._local, "conn", None)
+            if conn is None:
+                conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            try:
+                conn.request(method, self.prefix + path, body=body, headers=headers)
+                response = conn.getresponse()
+                return response.status, response.read()
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the API end to end: login, product search, product detail and bulk writes. "
+        "Runs in-process through the Django test client by default, or against a running server "
+        "with --url. Point ELASTICSEARCH_CLIENT_FACTORY at a stand-in to run without Elasticsearch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", help="Base URL of a running server (e.g. http://127.0.0.1:8000); in-process if omitted")
+        parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma separated subset of {', '.join(SCENARIOS)}")
+        parser.add_argument("--requests", type=int, default=200, help="Measured requests per scenario")
+        parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests per scenario")
+        parser.add_argument("--concurrency", type=int, default=4, help="Concurrent client threads")
+        parser.add_argument("--bulk-size", type=int, default=500, help="Products per bulk request")
+        parser.add_argument("--page-size", type=int, default=20, help="size= for search requests")
+        parser.add_argument("--username", default="bench_user")
+        parser.add_argument("--password", default="bench-password")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Write JSON results to this file")
+
+    def handle(self, *args, **options):
+        scenarios = [s.strip() for s in options["scenarios"].split(",") if s.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"unknown scenarios: {', '.join(sorted(unknown))}")
+        transport = LiveServerTransport(options["url"]) if options["url"] else TestClientTransport()
+        token = self._login_token(transport, options)
+        ops = {
+            "login": self._login_op(transport, options),
+            "search": self._search_op(transport, token, options),
+            "detail": self._detail_op(transport, token, options),
+            "bulk": self._bulk_op(transport, token, options),
+        }
+
+        results = {}
+        for name in scenarios:
+            op = ops[name]
+            if op is None:
+                self.stderr.write(f"{name}: skipped (no products to read; seed some or run bulk first)")
+                continue
+            result = self._run(op, options)
+            if name == "bulk" and result["elapsed_seconds"]:
+                docs = result["summary"]["count"] * options["bulk_size"]
+                result["docs_per_sec"] = round(docs / result["elapsed_seconds"], 1)
+            results[name] = result
+            summary = result["summary"]
+            self.stdout.write(
+                f"{name:>7}: {summary['ops_per_sec']} req/s, p50 {summary['p50_ms']} ms, "
+                f"p90 {summary['p90_ms']} ms, p99 {summary['p99_ms']} ms, status {result['status_counts']}"
+            )
+        if options["output"]:
+            meta = {
+                "target": options["url"] or "test-client",
+                "concurrency": options["concurrency"],
+                "requests": options["requests"],
+            }
+            write_results(options["output"], "bench_api", {"config": meta, "scenarios": results})
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+    def _run(self, op, options):
+        warmup = options["warmup"]
+        warmup_errors = 0
+        for i in range(warmup):
+            # Like measured requests, a failing warmup request is counted
+            # rather than aborting the run.
+            try:
+                op(i)
+            except Exception as exc:
+                warmup_errors += 1
+                if warmup_errors == 1:
+                    self.stderr.write(f"warmup request failed: {exc!r}")
+        # Measured requests continue the sequence so bulk batches stay unique.
+        counter = itertools.count(warmup)
+        total = warmup + options["requests"]
+        lock = threading.Lock()
+        status_counts = Counter()
+
+        def worker():
+            latencies = []
+            while True:
+                i = next(counter)
+                if i >= total:
+                    return latencies
+                start = time.perf_counter()
+                try:
+                    status = op(i)
+                except Exception:
+                    status = "error"
+                latencies.append(time.perf_counter() - start)
+                with lock:
+                    status_counts[str(status)] += 1
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            chunks = list(pool.map(lambda _: worker(), range(options["concurrency"])))
+        elapsed = time.perf_counter() - start
+        return {
+            "summary": summarize([l for chunk in chunks for l in chunk], elapsed),
+            "status_counts": dict(status_counts),
+            "elapsed_seconds": round(elapsed, 3),
+            "warmup_errors": warmup_errors,
+        }
+
+    def _login_token(self, transport, options):
+        credentials = {"username": options["username"], "password": options["password"]}
+        transport.request("POST", "/api/auth/register/", json.dumps(
+            dict(credentials, email=f"{options['username']}@example.com")
+        ))
+        status, body = transport.request("POST", "/api/auth/login/", json.dumps(credentials))
+        if status != 200:
+            raise CommandError(f"could not log in as {options['username']}: {status} {body[:200]!r}")
+        return json.loads(body)["access"]
+
+    def _login_op(self, transport, options):
+        payload = json.dumps({"username": options["username"], "password": options["password"]})
+        return lambda i: transport.request("POST", "/api/auth/login/", payload)[0]
+
+    def _search_op(self, transport, token, options):
+        size = options["page_size"]
+        paths = []
+        for i, term in enumerate(SEARCH_TERMS):
+            # Alternate plain full-text searches with filtered, sorted ones.
+            if i % 2:
+                paths.append(f"/api/products/?q={term}&category={CATEGORIES[i % len(CATEGORIES)]}&sort=-price&size={size}")
+            else:
+                paths.append(f"/api/products/?q={term}&size={size}")
+        return lambda i: transport.request("GET", paths[i % len(paths)], token=token)[0]
+
+    def _detail_op(self, transport, token, options):
+        ids = []
+        for term in SEARCH_TERMS[:5]:
+            status, body = transport.request("GET", f"/api/products/?q={term}&size=100&fields=id", token=token)
+            if status == 200:
+                ids.extend(item["id"] for item in json.loads(body).get("items", []))
+        if not ids:
+            return None
+        return lambda i: transport.request("GET", f"/api/products/{ids[i % len(ids)]}/", token=token)[0]
+
+    def _bulk_op(self, transport, token, options):
+        bulk_size = options["bulk_size"]
+
+        def op(i):
+            docs = synthetic_products(bulk_size, seed=options["seed"] + 1000 + i, start=i * bulk_size)
+            body = "\n".join(json.dumps(doc) for doc in docs).encode("utf-8")
+            return transport.request("POST", "/api/products/bulk/", body, content_type="application/x-ndjson", token=token)[0]
+        return op
@@ -0,0 +1,79 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    BCryptSHA256PasswordHasher,
+    PBKDF2PasswordHasher,
+)
+from django.core.management.base import BaseCommand, CommandError
+from api.bench import summarize, timed, write_results
+
+def _int_list(value):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+class Command(BaseCommand):
+    help = "Benchmark password hashing cost: hashes/sec and latency per hasher configuration"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pbkdf2-iterations", type=_int_list, default=[260000, 600000, PBKDF2PasswordHasher.iterations])
+        parser.add_argument("--argon2-time-cost", type=_int_list, default=[1, Argon2PasswordHasher.time_cost, 3])
+        parser.add_argument("--argon2-memory-cost", type=int, default=Argon2PasswordHasher.memory_cost)
+        parser.add_argument("--bcrypt-rounds", type=_int_list, default=[10, BCryptSHA256PasswordHasher.rounds])
+        parser.add_argument("--duration", type=float, default=2.0, help="Seconds to spend on each configuration")
+        parser.add_argument("--threads", type=int, default=settings.PASSWORD_HASH_WORKERS or 1,
+                            help="Concurrent hashing threads (defaults to PASSWORD_HASH_WORKERS)")
+        parser.add_argument("--output", help="Write JSON results to this file")
+
+    def _configurations(self, options):
+        for n in options["pbkdf2_iterations"]:
+            hasher = PBKDF2PasswordHasher()
+            hasher.iterations = n
+            yield f"pbkdf2_sha256 iterations={n}", hasher
+        for t in options["argon2_time_cost"]:
+            hasher = Argon2PasswordHasher()
+            hasher.time_cost = t
+            hasher.memory_cost = options["argon2_memory_cost"]
+            yield f"argon2 time_cost={t} memory_cost={hasher.memory_cost}", hasher
+        for r in options["bcrypt_rounds"]:
+            hasher = BCryptSHA256PasswordHasher()
+            hasher.rounds = r
+            yield f"bcrypt_sha256 rounds={r}", hasher
+
+    def _run(self, hasher, duration, threads):
+        encoded = hasher.encode("correct horse battery staple", hasher.salt())
+
+        def worker():
+            latencies = []
+            deadline = time.perf_counter() + duration
+            while time.perf_counter() < deadline:
+                seconds, ok = timed(hasher.verify, "correct horse battery staple", encoded)
+                if not ok:
+                    raise CommandError(f"{hasher.algorithm} did not verify its own hash")
+                latencies.append(seconds)
+            return latencies
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(lambda _: worker(), range(threads)))
+        elapsed = time.perf_counter() - start
+        return summarize([l for chunk in results for l in chunk], elapsed)
+
+    def handle(self, *args, **options):
+        results = {}
+        threads = max(options["threads"], 1)
+        self.stdout.write(f"{'configuration':45} {'threads':>7} {'hashes/s':>10} {'p50 ms':>9} {'p99 ms':>9}")
+        for name, hasher in self._configurations(options):
+            try:
+                summary = self._run(hasher, options["duration"], threads)
+            except ValueError as exc:
+                # argon2-cffi / bcrypt are optional dependencies
+                self.stdout.write(f"{name:45} skipped: {exc}")
+                continue
+            results[name] = dict(summary, threads=threads)
+            self.stdout.write(
+                f"{name:45} {threads:>7} {summary['ops_per_sec']:>10} {summary['p50_ms']:>9} {summary['p99_ms']:>9}"
+            )
+        if options["output"]:
+            write_results(options["output"], "bench_auth", results)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
@@ -0,0 +1,115 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+from django.core.management.base import BaseCommand, CommandError
+from api.bench import summarize, write_results
+
+
+async def _read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(int(headers.get("content-length", 0)))
+    return status, headers
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test a running server over keep-alive HTTP/1.1 connections and report req/s and "
+        "latency percentiles. Run it once against the WSGI server and once against backend.asgi "
+        "to compare the two stacks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("url", help="Full URL to request, e.g. http://127.0.0.1:8000/api/async/products/?q=phone")
+        parser.add_argument("--token", help="Bearer access token")
+        parser.add_argument("--concurrency", type=int, default=64, help="Concurrent connections")
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+        parser.add_argument("--warmup", type=float, default=1.0, help="Seconds of warm-up excluded from results")
+        parser.add_argument("--label", default="", help="Name stored with the results (e.g. wsgi, asgi)")
+        parser.add_argument("--output", help="Write JSON results to this file")
+
+    def handle(self, *args, **options):
+        parts = urlsplit(options["url"])
+        if parts.scheme != "http":
+            raise CommandError("only plain http:// URLs are supported")
+        result = asyncio.run(self._run(parts, options))
+        summary = result["summary"]
+        self.stdout.write(
+            f"{options['label'] or options['url']}: {summary['count']} requests, "
+            f"{summary['ops_per_sec']} req/s, p50 {summary['p50_ms']} ms, p99 {summary['p99_ms']} ms, "
+            f"{result['errors']} errors, status {result['status_counts']}"
+        )
+        if options["output"]:
+            write_results(options["output"], "bench_load", {options["label"] or options["url"]: result})
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+    async def _run(self, parts, options):
+        host = parts.hostname
+        port = parts.port or 80
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+        request = f"GET {target} HTTP/1.1\r\nHost: {parts.netloc}\r\nConnection: keep-alive\r\n"
+        if options["token"]:
+            request += f"Authorization: Bearer {options['token']}\r\n"
+        request = (request + "\r\n").encode("latin-1")
+
+        latencies = []
+        status_counts = {}
+        errors = 0
+        start = time.perf_counter()
+        measure_from = start + options["warmup"]
+        deadline = measure_from + options["duration"]
+
+        async def client():
+            nonlocal errors
+            reader = writer = None
+            while time.perf_counter() < deadline:
+                try:
+                    if writer is None:
+                        reader, writer = await asyncio.open_connection(host, port)
+                    sent = time.perf_counter()
+                    writer.write(request)
+                    await writer.drain()
+                    status, headers = await _read_response(reader)
+                    done = time.perf_counter()
+                    if sent >= measure_from:
+                        latencies.append(done - sent)
+                        status_counts[status] = status_counts.get(status, 0) + 1
+                    if headers.get("connection", "").lower() == "close":
+                        writer.close()
+                        writer = None
+                except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError):
+                    errors += 1
+                    if writer is not None:
+                        writer.close()
+                    writer = None
+                    await asyncio.sleep(0.01)
+            if writer is not None:
+                writer.close()
+
+        await asyncio.gather(*(client() for _ in range(options["concurrency"])))
+        elapsed = min(time.perf_counter(), deadline) - measure_from
+        return {
+            "url": options["url"],
+            "concurrency": options["concurrency"],
+            "summary": summarize(latencies, elapsed),
+            "errors": errors,
+            "status_counts": {str(k): v for k, v in status_counts.items()},
+        }
@@ -0,0 +1,88 @@
+import itertools
+import random
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.bench import summarize, write_results
+from api.indices import index_body, versioned_name
+from api.memory_client import MemorySearchBackend
+from api.query_builder import build_product_search_body, build_product_suggest_body
+from api.synthetic import CATEGORIES, SEARCH_TERMS, TAGS, synthetic_products
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the in-memory search backend (SEARCH_BACKEND=memory) on a synthetic catalog: "
+        "indexing rate, then latency of document gets and of the product listing, search, facet "
+        "and suggest bodies the views build. Requests go straight to the backend, without HTTP."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=100_000)
+        parser.add_argument("--iterations", type=int, default=200, help="Measured requests per scenario")
+        parser.add_argument("--page-size", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Write JSON results to this file")
+
+    def handle(self, *args, **options):
+        backend = MemorySearchBackend()
+        index = versioned_name("products")
+        body = index_body("products")
+        body["aliases"] = {"products": {"is_write_index": True}}
+        backend.handle("PUT", "indices.create", {"index": index}, {}, body)
+
+        ids = []
+        start = time.perf_counter()
+        for doc in synthetic_products(options["products"], seed=options["seed"]):
+            ids.append(doc["id"])
+            backend.handle("PUT", "index", {"index": "products", "id": doc["id"]}, {}, doc)
+        load_seconds = time.perf_counter() - start
+        self.stdout.write(
+            f"indexed {len(ids)} products in {load_seconds:.1f} s "
+            f"({len(ids) / load_seconds if load_seconds else 0:.0f} docs/s)"
+        )
+
+        rng = random.Random(options["seed"])
+        size = options["page_size"]
+        track_total = settings.PRODUCT_TRACK_TOTAL_HITS
+
+        def search(params):
+            def op():
+                return backend.handle("POST", "search", {"index": "products"}, {}, dict(
+                    build_product_search_body(params(), track_total), size=size
+                ))
+            return op
+
+        scenarios = {
+            "get": lambda: backend.handle("GET", "get", {"index": "products", "id": rng.choice(ids)}, {}, None),
+            "mget": lambda: backend.handle("POST", "mget", {"index": "products"}, {}, {"ids": rng.sample(ids, size)}),
+            "category_filter": search(lambda: {"category": rng.choice(CATEGORIES), "in_stock": "true"}),
+            "tag_filter": search(lambda: {"tags": rng.choice(TAGS)}),
+            "price_range": search(lambda: {"min_price": (low := rng.randint(5, 200)), "max_price": low + 10}),
+            "sorted_by_price": search(lambda: {"sort": rng.choice(["price", "-price"])}),
+            "text": search(lambda: {"q": rng.choice(SEARCH_TERMS)}),
+            "text_filtered_sorted": search(lambda: {
+                "q": rng.choice(SEARCH_TERMS), "category": rng.choice(CATEGORIES), "sort": "-price",
+            }),
+            "facets": search(lambda: {"facets": "category,tags,in_stock,price", "category": rng.choice(CATEGORIES)}),
+            "suggest": lambda: backend.handle("POST", "search", {"index": "products"}, {}, build_product_suggest_body(
+                f"{rng.choice(SEARCH_TERMS)} {rng.choice(SEARCH_TERMS)[:2]}", 10
+            )),
+        }
+
+        results = {}
+        for name, op in scenarios.items():
+            latencies = []
+            for _ in itertools.repeat(None, options["iterations"]):
+                t = time.perf_counter()
+                op()
+                latencies.append(time.perf_counter() - t)
+            results[name] = summarize(latencies)
+            r = results[name]
+            self.stdout.write(f"{name:>20}: p50 {r['p50_ms']} ms, p90 {r['p90_ms']} ms, p99 {r['p99_ms']} ms")
+
+        if options["output"]:
+            meta = {"products": len(ids), "iterations": options["iterations"], "page_size": size,
+                    "load_seconds": round(load_seconds, 3)}
+            write_results(options["output"], "bench_memory_search", {"config": meta, "scenarios": results})
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
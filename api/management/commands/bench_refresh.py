@@ -0,0 +1,103 @@
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from api.bench import summarize, write_results
+from api.management.commands.bench_api import LiveServerTransport, TestClientTransport
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark token refresh under concurrency: every client thread follows its own refresh "
+        "chain (rotating when ROTATE_REFRESH_TOKENS is on), then replays a used token to check "
+        "that revocation holds. In-process by default, or against a running server with --url."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", help="Base URL of a running server (e.g. http://127.0.0.1:8000); in-process if omitted")
+        parser.add_argument("--requests", type=int, default=500, help="Measured refreshes in total")
+        parser.add_argument("--concurrency", type=int, default=8, help="Concurrent client threads")
+        parser.add_argument("--username", default="bench_user")
+        parser.add_argument("--password", default="bench-password")
+        parser.add_argument("--output", help="Write JSON results to this file")
+
+    def handle(self, *args, **options):
+        transport = LiveServerTransport(options["url"]) if options["url"] else TestClientTransport()
+        concurrency = max(1, options["concurrency"])
+        rotate = settings.SIMPLE_JWT.get("ROTATE_REFRESH_TOKENS", False)
+        per_thread = [options["requests"] // concurrency] * concurrency
+        for i in range(options["requests"] % concurrency):
+            per_thread[i] += 1
+        refresh_tokens = [self._login_refresh(transport, options) for _ in range(concurrency)]
+
+        lock = threading.Lock()
+        status_counts = Counter()
+        used = []
+
+        def worker(n):
+            token = refresh_tokens[n]
+            latencies = []
+            for _ in range(per_thread[n]):
+                payload = json.dumps({"refresh": token})
+                start = time.perf_counter()
+                try:
+                    status, body = transport.request("POST", "/api/auth/token/refresh/", payload)
+                except Exception:
+                    status, body = "error", b""
+                latencies.append(time.perf_counter() - start)
+                with lock:
+                    status_counts[str(status)] += 1
+                if status == 200 and rotate:
+                    with lock:
+                        used.append(token)
+                    token = json.loads(body)["refresh"]
+            return latencies
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            chunks = list(pool.map(worker, range(concurrency)))
+        elapsed = time.perf_counter() - start
+        summary = summarize([l for chunk in chunks for l in chunk], elapsed)
+
+        # A rotated-out token must be refused; without rotation nothing is revoked.
+        replay = None
+        if used:
+            replay = Counter(
+                str(transport.request("POST", "/api/auth/token/refresh/", json.dumps({"refresh": t}))[0])
+                for t in used[:50]
+            )
+        self.stdout.write(
+            f"refresh ({'rotating' if rotate else 'non-rotating'}, store {settings.TOKEN_STORE['BACKEND']}): "
+            f"{summary['ops_per_sec']} req/s, p50 {summary['p50_ms']} ms, p90 {summary['p90_ms']} ms, "
+            f"p99 {summary['p99_ms']} ms, status {dict(status_counts)}"
+        )
+        if replay is not None:
+            self.stdout.write(f"replayed rotated tokens: status {dict(replay)}")
+            if set(replay) != {"401"}:
+                self.stderr.write("rotated refresh tokens were accepted again")
+
+        if options["output"]:
+            meta = {
+                "target": options["url"] or "test-client",
+                "concurrency": concurrency,
+                "requests": options["requests"],
+                "rotate": rotate,
+                "store": settings.TOKEN_STORE["BACKEND"],
+            }
+            results = {"summary": summary, "status_counts": dict(status_counts),
+                       "replay_status_counts": dict(replay or {})}
+            write_results(options["output"], "bench_refresh", {"config": meta, "refresh": results})
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+    def _login_refresh(self, transport, options):
+        credentials = {"username": options["username"], "password": options["password"]}
+        transport.request("POST", "/api/auth/register/", json.dumps(
+            dict(credentials, email=f"{options['username']}@example.com")
+        ))
+        status, body = transport.request("POST", "/api/auth/login/", json.dumps(credentials))
+        if status != 200:
+            raise CommandError(f"could not log in as {options['username']}: {status} {body[:200]!r}")
+        return json.loads(body)["refresh"]
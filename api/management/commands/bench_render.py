@@ -0,0 +1,111 @@
+import time
+from django.core.management.base import BaseCommand
+from api.bench import summarize, write_results
+from api.compression import brotli, compress
+from api.products import page_payload
+from api.renderers import ORJSONRenderer, TimedJSONRenderer, orjson
+from api.synthetic import synthetic_articles, synthetic_products
+from api.views import article_page_payload
+
+
+def _search_response(docs, keep_id):
+    hits = []
+    for doc in docs:
+        doc = dict(doc)
+        doc_id = doc["id"] if keep_id else doc.pop("id")
+        hits.append({"_index": "bench", "_id": doc_id, "_score": 1.0, "_source": doc})
+    return {"took": 3, "hits": {"total": {"value": len(hits), "relation": "eq"}, "hits": hits}}
+
+
+def _fresh(res):
+    # Payload builders use the hits' _source dicts in place; give every
+    # iteration its own copy, made outside the timed section.
+    hits = [dict(h, _source=dict(h["_source"])) for h in res["hits"]["hits"]]
+    return dict(res, hits=dict(res["hits"], hits=hits))
+
+
+def _copying_items(res):
+    # The previous listing path: one dict copy per hit.
+    items = []
+    for h in res["hits"]["hits"]:
+        src = h.get("_source", {}).copy()
+        src["id"] = h.get("_id")
+        items.append(src)
+    return items
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark response building, JSON rendering (stdlib vs orjson) and compression "
+        "(gzip vs brotli) for product and article listing pages and a product detail body"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="20,100", help="Comma separated page sizes")
+        parser.add_argument("--iterations", type=int, default=200)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Write JSON results to this file")
+
+    def handle(self, *args, **options):
+        sizes = [int(s) for s in options["sizes"].split(",") if s.strip()]
+        renderers = {"stdlib": TimedJSONRenderer()}
+        if orjson is not None:
+            renderers["orjson"] = ORJSONRenderer()
+        else:
+            self.stderr.write("orjson is not installed; only the stdlib renderer is measured")
+        encodings = ["gzip"] + (["br"] if brotli is not None else [])
+
+        cases = {}
+        for size in sizes:
+            res = _search_response(synthetic_products(size, seed=options["seed"]), keep_id=True)
+            cases[f"products_page_{size}"] = (res, lambda r, s=size: page_payload(r, 1, s))
+            res = _search_response(synthetic_articles(size, seed=options["seed"]), keep_id=False)
+            cases[f"articles_page_{size}"] = (res, lambda r, s=size: article_page_payload(r, 1, s))
+        detail = next(synthetic_products(1, seed=options["seed"]))
+        cases["product_detail"] = (None, lambda r: dict(detail))
+
+        results = {}
+        for name, (res, build) in cases.items():
+            result = {"build": self._time(build, res, options["iterations"])}
+            if res is not None:
+                result["build_copying"] = self._time(_copying_items, res, options["iterations"])
+            payload = build(_fresh(res) if res is not None else None)
+
+            result["render"] = {}
+            for label, renderer in renderers.items():
+                body = renderer.render(payload)
+                timing = self._time(lambda _: renderer.render(payload), None, options["iterations"])
+                result["render"][label] = dict(timing, bytes=len(body))
+            raw = renderers["stdlib"].render(payload)
+
+            result["compression"] = {}
+            for encoding in encodings:
+                compressed = compress(raw, encoding)
+                timing = self._time(lambda _: compress(raw, encoding), None, options["iterations"])
+                result["compression"][encoding] = dict(
+                    timing, bytes=len(compressed), ratio=round(len(compressed) / len(raw), 3)
+                )
+            results[name] = result
+
+            line = [f"{name:>18}: build p50 {result['build']['p50_ms']} ms"]
+            if "build_copying" in result:
+                line.append(f"(copying {result['build_copying']['p50_ms']} ms)")
+            for label, r in result["render"].items():
+                line.append(f"| {label} {r['p50_ms']} ms, {r['bytes']} B")
+            for encoding, r in result["compression"].items():
+                line.append(f"| {encoding} {r['p50_ms']} ms, {r['bytes']} B")
+            self.stdout.write(" ".join(line))
+
+        if options["output"]:
+            meta = {"iterations": options["iterations"], "sizes": sizes}
+            write_results(options["output"], "bench_render", {"config": meta, "cases": results})
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+    def _time(self, fn, res, iterations):
+        latencies = []
+        for _ in range(iterations):
+            arg = _fresh(res) if res is not None else None
+            start = time.perf_counter()
+            fn(arg)
+            latencies.append(time.perf_counter() - start)
+        return summarize(latencies)
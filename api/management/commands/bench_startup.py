@@ -0,0 +1,96 @@
+import json
+import os
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from api.bench import summarize, write_results
+
+PROFILES = ("backend.settings", "backend.settings_api")
+
+# Runs in a fresh interpreter per measurement so every run is a cold start.
+# Boot is what a WSGI worker does before serving; the first response also
+# loads the URLconf and the view modules behind it; the remaining requests
+# hit a view that does no work, so their latency is routing plus middleware.
+CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+boot = time.perf_counter() - start
+boot_modules = len(sys.modules)
+heavy = ("elasticsearch", "rest_framework_simplejwt.tokens", "django.contrib.admin", "django.template.backends.django")
+loaded_at_boot = [m for m in heavy if m in sys.modules]
+
+from django.test import Client
+client = Client()
+t = time.perf_counter()
+status = client.get("/").status_code
+first = time.perf_counter() - t
+loaded_after_first = [m for m in heavy if m in sys.modules]
+
+latencies = []
+for _ in range(int(sys.argv[1])):
+    t = time.perf_counter()
+    client.get("/")
+    latencies.append(time.perf_counter() - t)
+print(json.dumps({
+    "boot": boot, "first_response": first, "status": status, "modules_at_boot": boot_modules,
+    "loaded_at_boot": loaded_at_boot, "loaded_after_first_response": loaded_after_first,
+    "latencies": latencies,
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare settings profiles on cold start: worker boot (import) time, time to first "
+        "response and per-request routing/middleware overhead, each run in a fresh interpreter"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profiles", default=",".join(PROFILES), help="Comma separated settings modules")
+        parser.add_argument("--runs", type=int, default=5, help="Cold starts per profile")
+        parser.add_argument("--requests", type=int, default=500, help="Warm requests per run for the overhead figure")
+        parser.add_argument("--output", help="Write JSON results to this file")
+
+    def handle(self, *args, **options):
+        profiles = [p.strip() for p in options["profiles"].split(",") if p.strip()]
+        results = {}
+        for profile in profiles:
+            runs = [self._run_child(profile, options["requests"]) for _ in range(options["runs"])]
+            result = {
+                "boot": summarize([r["boot"] for r in runs]),
+                "first_response": summarize([r["first_response"] for r in runs]),
+                "request_overhead": summarize([l for r in runs for l in r["latencies"]]),
+                "modules_at_boot": runs[-1]["modules_at_boot"],
+                "loaded_at_boot": runs[-1]["loaded_at_boot"],
+                "loaded_after_first_response": runs[-1]["loaded_after_first_response"],
+            }
+            results[profile] = result
+            self.stdout.write(
+                f"{profile}: boot p50 {result['boot']['p50_ms']} ms ({result['modules_at_boot']} modules), "
+                f"first response p50 {result['first_response']['p50_ms']} ms, "
+                f"per request p50 {result['request_overhead']['p50_ms']} ms / p99 {result['request_overhead']['p99_ms']} ms"
+            )
+            self.stdout.write(
+                f"    heavy modules at boot: {', '.join(result['loaded_at_boot']) or 'none'}; "
+                f"after first response: {', '.join(result['loaded_after_first_response']) or 'none'}"
+            )
+        if options["output"]:
+            meta = {"runs": options["runs"], "requests": options["requests"]}
+            write_results(options["output"], "bench_startup", {"config": meta, "profiles": results})
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+    def _run_child(self, profile, requests):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=profile)
+        proc = subprocess.run(
+            [sys.executable, "-c", CHILD, str(requests)],
+            env=env,
+            cwd=str(settings.BASE_DIR),
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            raise CommandError(f"{profile} failed to start:\n{proc.stderr[-2000:]}")
+        return json.loads(proc.stdout.strip().splitlines()[-1])
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.es_client import get_es_client
+from api.product_bulk import BULK_FORMATS, bulk_index_products, detect_format, iter_rows
+from api.products import PRODUCT_INDEX
+
+class Command(BaseCommand):
+    help = "Stream products from an NDJSON or CSV file into Elasticsearch via the _bulk API"
+
+    def add_arguments(self, parser):
+        parser.add_argument("file", help="Path to an .ndjson/.jsonl or .csv file")
+        parser.add_argument("--format", choices=BULK_FORMATS, help="Input format (guessed from the file name by default)")
+        parser.add_argument("--index", default=PRODUCT_INDEX)
+        parser.add_argument("--chunk-size", type=int, help="Documents per _bulk request")
+        parser.add_argument("--max-chunk-bytes", type=int, help="Maximum bytes per _bulk request")
+        parser.add_argument("--threads", type=int, help="Parallel in-flight _bulk requests")
+        parser.add_argument("--show-errors", type=int, default=20, help="Number of row errors to print")
+
+    def handle(self, *args, **options):
+        fmt = detect_format(options["format"], filename=options["file"])
+        es = get_es_client()
+        try:
+            fh = open(options["file"], "r", encoding="utf-8", newline="")
+        except OSError as exc:
+            raise CommandError(str(exc))
+        with fh:
+            report = bulk_index_products(
+                es,
+                iter_rows(fh, fmt),
+                options["index"],
+                chunk_size=options["chunk_size"],
+                max_chunk_bytes=options["max_chunk_bytes"],
+                thread_count=options["threads"],
+            )
+
+        for entry in report.errors[:options["show_errors"]]:
+            self.stderr.write(f"row {entry['row']}: {entry['errors']}")
+        if report.failed > options["show_errors"]:
+            self.stderr.write(f"... {report.failed - options['show_errors']} more failed rows")
+        summary = (
+            f"Indexed {report.indexed}/{report.total_rows} rows into {options['index']} "
+            f"in {report.elapsed:.2f}s ({report.docs_per_sec} docs/sec), {report.failed} failed"
+        )
+        if report.failed:
+            self.stdout.write(self.style.WARNING(summary))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
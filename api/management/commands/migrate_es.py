@@ -1,68 +1,63 @@
 from django.core.management.base import BaseCommand
+from api.cache import invalidate_product_search
 from api.es_client import get_es_client
-
-USER_INDEX = "users"
-ARTICLE_INDEX = "articles"
-PRODUCT_INDEX = "products"
-
-user_mapping = {
-    "mappings": {
-        "properties": {
-            "id": {"type": "keyword"},
-            "username": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
-            "email": {"type": "keyword"},
-            "password": {"type": "keyword"},
-            "created_at": {"type": "date"}
-        }
-    }
-}
-
-article_mapping = {
-    "mappings": {
-        "properties": {
-            "title": {"type": "text"},
-            "content": {"type": "text"},
-            "author": {"type": "keyword"},
-            "created_at": {"type": "date"},
-            "updated_at": {"type": "date"}
-        }
-    }
-}
-
-product_mapping = {
-    "mappings": {
-        "properties": {
-            "id": {"type": "keyword"},
-            "sku": {"type": "keyword"},
-            "name": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
-            "description": {"type": "text"},
-            "price": {"type": "double"},
-            "category": {"type": "keyword"},
-            "in_stock": {"type": "boolean"},
-            "tags": {"type": "keyword"},
-            "created_at": {"type": "date"},
-            "updated_at": {"type": "date"}
-        }
-    }
-}
+from elasticsearch import BadRequestError
+from api.indices import (
+    INDEX_DEFINITIONS,
+    IndexMigrationError,
+    alias_targets,
+    ensure_index,
+    is_current,
+    is_legacy_index,
+    reindex,
+    sync_mapping,
+    versioned_name,
+)
 
 class Command(BaseCommand):
-    help = "Create indices with mappings in Elasticsearch (users, articles, products)"
+    help = (
+        "Create versioned indices behind aliases from the registry in api/indices.py (users, articles, products, tokens); "
+        "indices on an older version are reported (rebuilt with --reindex)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reindex", action="store_true",
+                            help="Rebuild indices on an older version (copy, write block on the live index "
+                                 "for the final pass, alias swap) instead of only reporting them")
 
     def handle(self, *args, **options):
         es = get_es_client()
-        if not es.indices.exists(index=USER_INDEX):
-            es.indices.create(index=USER_INDEX, body=user_mapping)
-            self.stdout.write(self.style.SUCCESS(f"Created index {USER_INDEX}"))
-        else:
-            self.stdout.write(f"{USER_INDEX} already exists")
-        if not es.indices.exists(index=ARTICLE_INDEX):
-            es.indices.create(index=ARTICLE_INDEX, body=article_mapping)
-            self.stdout.write(self.style.SUCCESS(f"Created index {ARTICLE_INDEX}"))
-        else:
-            self.stdout.write(f"{ARTICLE_INDEX} already exists")
-        if not es.indices.exists(index=PRODUCT_INDEX):
-            es.indices.create(index=PRODUCT_INDEX, body=product_mapping)
-            self.stdout.write(self.style.SUCCESS(f"Created index {PRODUCT_INDEX}"))
-        else:
-            self.stdout.write(f"{PRODUCT_INDEX} already exists")
+        for name in INDEX_DEFINITIONS:
+            target = ensure_index(es, name)
+            if target:
+                self.stdout.write(self.style.SUCCESS(f"Created index {target} (alias {name})"))
+            elif is_legacy_index(es, name):
+                self.stdout.write(self.style.WARNING(
+                    f"{name} is a concrete index without an alias; run `manage.py reindex {name}` to move it behind one"
+                ))
+            elif not is_current(es, name):
+                # New fields of a newer version are not pushed into the old
+                # index: it is rebuilt and the alias swapped instead.
+                current = ", ".join(alias_targets(es, name))
+                if not options["reindex"]:
+                    self.stdout.write(self.style.WARNING(
+                        f"{name} is on {current}, the registry has {versioned_name(name)}; "
+                        f"run `manage.py reindex {name}` or `migrate_es --reindex`"
+                    ))
+                    continue
+                try:
+                    result = reindex(es, name)
+                except IndexMigrationError as exc:
+                    self.stderr.write(f"{name}: {exc}")
+                    continue
+                if name == "products":
+                    invalidate_product_search(searchable=True)
+                self.stdout.write(self.style.SUCCESS(
+                    f"Reindexed {name}: {current} -> {result['dest']} ({result['copied']} copied)"
+                ))
+            else:
+                try:
+                    sync_mapping(es, name)
+                except BadRequestError as exc:
+                    self.stderr.write(f"{name}: mapping differs in a way that needs `manage.py reindex {name}`: {exc}")
+                self.stdout.write(f"{name} already exists ({', '.join(alias_targets(es, name))})")
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from api.token_store import get_token_store
+
+
+class Command(BaseCommand):
+    help = "Remove issued/revoked refresh-token state for tokens that have expired"
+
+    def handle(self, *args, **options):
+        removed = get_token_store().purge_expired()
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} expired tokens"))
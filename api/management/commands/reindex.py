@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.cache import invalidate_product_search
+from api.es_client import get_es_client
+from api.indices import INDEX_DEFINITIONS, IndexMigrationError, reindex
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild an index into a new version with the registry mapping (server-side _reindex) "
+        "and atomically swap its alias"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("name", choices=list(INDEX_DEFINITIONS))
+        parser.add_argument("--to-version", dest="index_version", type=int,
+                            help="Target version (defaults to the registry version)")
+        parser.add_argument("--slices", default="auto", help="Parallel reindex slices (number or 'auto')")
+        parser.add_argument("--requests-per-second", type=float, help="Throttle the copy (documents per second)")
+        parser.add_argument("--delete-old", action="store_true", help="Delete the previous index after the swap")
+        parser.add_argument("--poll-interval", type=float, default=2.0)
+
+    def handle(self, *args, **options):
+        slices = options["slices"]
+        if slices != "auto":
+            try:
+                slices = int(slices)
+            except ValueError:
+                raise CommandError("--slices must be an integer or 'auto'")
+
+        def progress(status):
+            total = status.get("total") or 0
+            done = status.get("created", 0) + status.get("updated", 0) + status.get("version_conflicts", 0)
+            if total:
+                self.stdout.write(f"  {done}/{total} documents")
+
+        es = get_es_client()
+        try:
+            result = reindex(
+                es,
+                options["name"],
+                version=options["index_version"],
+                slices=slices,
+                requests_per_second=options["requests_per_second"],
+                delete_old=options["delete_old"],
+                poll_interval=options["poll_interval"],
+                progress=progress,
+            )
+        except IndexMigrationError as exc:
+            raise CommandError(str(exc))
+        if options["name"] == "products":
+            invalidate_product_search(searchable=True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['alias']} -> {result['dest']} (was {', '.join(result['source'])}): "
+            f"{result['copied']} copied, {result['caught_up']} caught up, {result['removed']} removed "
+            f"in {result['took_ms']} ms"
+        ))
+        if result["legacy_removed"]:
+            self.stdout.write(f"Removed legacy concrete index {options['name']}")
+        for name in result["deleted"]:
+            self.stdout.write(f"Deleted {name}")
@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand
+from elasticsearch import helpers
+from api.es_client import get_es_client
+from api.utils import user_id_for
+from api.views import USER_INDEX
+
+class Command(BaseCommand):
+    help = (
+        "Re-key existing user documents to the deterministic id derived from their normalized "
+        "username, so login can use a realtime GET and registration an atomic create"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--index", default=USER_INDEX)
+        parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        es = get_es_client()
+        index = options["index"]
+        if not es.indices.exists(index=index):
+            self.stdout.write(f"{index} does not exist, nothing to do")
+            return
+
+        moves = []
+        claimed = {}
+        conflicts = []
+        unchanged = 0
+        for hit in helpers.scan(es, index=index, query={"query": {"match_all": {}}}):
+            src = hit["_source"]
+            new_id = user_id_for(src["username"])
+            if hit["_id"] == new_id:
+                unchanged += 1
+                claimed[new_id] = hit["_id"]
+                continue
+            if new_id in claimed:
+                # Two usernames that only differ by case/whitespace.
+                conflicts.append((hit["_id"], src["username"], claimed[new_id]))
+                continue
+            claimed[new_id] = hit["_id"]
+            moves.append((hit["_id"], new_id, src))
+
+        for old_id, username, other in conflicts:
+            self.stderr.write(f"conflict: {old_id} ({username}) normalizes to the same id as {other}; left in place")
+        if options["dry_run"]:
+            self.stdout.write(f"{len(moves)} users would be re-keyed, {unchanged} already keyed, {len(conflicts)} conflicts")
+            return
+
+        def create_actions():
+            for old_id, new_id, src in moves:
+                doc = dict(src, id=new_id, legacy_id=old_id)
+                yield {"_op_type": "create", "_index": index, "_id": new_id, "_source": doc}
+
+        created = set()
+        failed = 0
+        new_to_old = {new_id: old_id for old_id, new_id, _ in moves}
+        for ok, item in helpers.streaming_bulk(
+            es, create_actions(), chunk_size=options["chunk_size"], raise_on_error=False, refresh="wait_for"
+        ):
+            info = item["create"]
+            if ok:
+                created.add(new_to_old[info["_id"]])
+            else:
+                failed += 1
+                self.stderr.write(f"could not create {info['_id']}: {info.get('error')}")
+
+        # Old documents are only removed once their replacement exists.
+        deleted = 0
+        if created:
+            delete_actions = ({"_op_type": "delete", "_index": index, "_id": old_id} for old_id in created)
+            deleted, _ = helpers.bulk(es, delete_actions, chunk_size=options["chunk_size"], raise_on_error=False, refresh=True)
+        self.stdout.write(self.style.SUCCESS(
+            f"Re-keyed {len(created)} users ({deleted} old documents removed), {unchanged} already keyed, "
+            f"{failed} failed, {len(conflicts)} conflicts"
+        ))
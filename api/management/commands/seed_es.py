@@ -1,16 +1,32 @@
+from django.conf import settings
 from django.core.management.base import BaseCommand
+from elasticsearch import helpers
+from api.cache import invalidate_product_search
 from api.es_client import get_es_client
-from api.utils import hash_password
+from api.indices import ensure_index
+from api.synthetic import synthetic_articles, synthetic_products
+from api.utils import hash_password, user_id_for
+import time
 import uuid
 from datetime import datetime
 
 class Command(BaseCommand):
-    help = "Seed Elasticsearch with sample data"
+    help = "Seed Elasticsearch with sample data, or with a synthetic catalog (--products/--articles)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=0, help="Generate this many synthetic products")
+        parser.add_argument("--articles", type=int, default=0, help="Generate this many synthetic articles")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed; the same seed yields the same data")
+        parser.add_argument("--chunk-size", type=int, default=settings.PRODUCT_BULK_CHUNK_SIZE)
+        parser.add_argument("--threads", type=int, default=settings.PRODUCT_BULK_THREADS)
 
     def handle(self, *args, **options):
         es = get_es_client()
+        for name in ("users", "articles", "products"):
+            ensure_index(es, name)
+
         # seed admin user
-        user_id = str(uuid.uuid4())
+        user_id = user_id_for("admin")
         es.index(index="users", id=user_id, document={
             "id": user_id,
             "username": "admin",
@@ -20,6 +36,16 @@ class Command(BaseCommand):
         })
         self.stdout.write(self.style.SUCCESS("Seeded user admin/password123"))
 
+        if options["products"] or options["articles"]:
+            if options["products"]:
+                docs = synthetic_products(options["products"], seed=options["seed"])
+                self._bulk_load(es, "products", docs, options, keep_id=True)
+                invalidate_product_search(searchable=True)
+            if options["articles"]:
+                docs = synthetic_articles(options["articles"], seed=options["seed"])
+                self._bulk_load(es, "articles", docs, options, keep_id=False)
+            return
+
         # sample article
         article_id = str(uuid.uuid4())
         es.index(index="articles", id=article_id, document={
@@ -44,3 +70,33 @@ class Command(BaseCommand):
             "created_at": datetime.utcnow().isoformat()
         })
         self.stdout.write(self.style.SUCCESS("Seeded sample product PRD-001"))
+
+    def _bulk_load(self, es, index, docs, options, keep_id):
+        def actions():
+            for doc in docs:
+                doc_id = doc["id"] if keep_id else doc.pop("id")
+                yield {"_index": index, "_id": doc_id, "_source": doc}
+
+        indexed = failed = 0
+        start = time.perf_counter()
+        for ok, item in helpers.parallel_bulk(
+            es,
+            actions(),
+            thread_count=options["threads"],
+            chunk_size=options["chunk_size"],
+            max_chunk_bytes=settings.PRODUCT_BULK_MAX_CHUNK_BYTES,
+            raise_on_error=False,
+            raise_on_exception=False,
+        ):
+            if ok:
+                indexed += 1
+            else:
+                failed += 1
+                if failed <= 5:
+                    self.stderr.write(f"{index}: {item}")
+        es.indices.refresh(index=index)
+        elapsed = time.perf_counter() - start
+        rate = round(indexed / elapsed, 1) if elapsed > 0 else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {indexed} synthetic {index} ({failed} failed) in {elapsed:.1f}s, {rate} docs/sec"
+        ))
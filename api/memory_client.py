@@ -0,0 +1,768 @@
+# Elasticsearch client for SEARCH_BACKEND=memory. It is the regular
+# client class, so every call site, the bulk/scan helpers and .options()
+# work unchanged, but perform_request answers each endpoint in process from
+# api.memory_engine instead of sending it to a cluster. Data lives in the
+# worker process: it is empty on start (apart from MEMORY_SEARCH seeding),
+# is not shared between workers and is lost on exit. Writes are searchable
+# immediately, so refresh is a no-op, and point-in-time ids keep their
+# keep-alive semantics but search the live index.
+import copy
+import fnmatch
+import itertools
+import json
+import threading
+import time
+import uuid
+from urllib.parse import unquote
+from django.conf import settings
+from elastic_transport import ApiResponseMeta, HeadApiResponse, HttpHeaders, NodeConfig, ObjectApiResponse
+from elastic_transport.client_utils import DEFAULT
+from elasticsearch import Elasticsearch
+from elasticsearch.exceptions import HTTP_EXCEPTIONS, ApiError
+from .indices import INDEX_DEFINITIONS, index_body, versioned_name
+from .memory_engine import (
+    DEFAULT_TRACK_TOTAL_HITS,
+    MappingError,
+    MemoryIndex,
+    UnsupportedQuery,
+    VersionConflict,
+    filter_source,
+    query_terms,
+    _and,
+)
+from .metrics import record_es_call
+from .scripts import python_equivalent
+# Imported for the painless equivalents they register.
+from . import inventory, token_store  # noqa: F401
+
+NODE = NodeConfig("http", "memory", 9200)
+SHARDS = {"total": 1, "successful": 1, "skipped": 0, "failed": 0}
+WRITE_SHARDS = {"total": 1, "successful": 1, "failed": 0}
+TIME_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+class SearchError(Exception):
+    """An error response: HTTP status, Elasticsearch error type and reason."""
+
+    def __init__(self, status, error_type, reason, **extra):
+        super().__init__(reason)
+        self.status = status
+        self.body = {
+            "error": {"root_cause": [{"type": error_type, "reason": reason}], "type": error_type, "reason": reason},
+            "status": status,
+            **extra,
+        }
+
+
+def _seconds(value, default=60.0):
+    if value in (None, ""):
+        return default
+    text = str(value).strip()
+    for unit in ("ms", "s", "m", "h", "d"):
+        if text.endswith(unit) and text[: -len(unit)].replace(".", "", 1).isdigit():
+            return float(text[: -len(unit)]) * TIME_UNITS[unit]
+    raise SearchError(400, "illegal_argument_exception", f"failed to parse time value [{value}]")
+
+
+def _truthy(value):
+    return value is True or str(value).lower() in ("true", "1")
+
+
+def _merge(current, partial):
+    merged = dict(current)
+    for key, value in partial.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def _source_spec(params, default=None):
+    if str(params.get("_source")).lower() == "false":
+        return False
+    includes = params.get("_source_includes")
+    excludes = params.get("_source_excludes")
+    if includes is None and excludes is None:
+        return default
+    return {"includes": _list(includes), "excludes": _list(excludes)}
+
+
+def _list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [v for v in value.split(",") if v]
+    return list(value)
+
+
+def _bulk_lines(body):
+    if isinstance(body, (bytes, str)):
+        body = body.splitlines()
+    for line in body:
+        if isinstance(line, dict):
+            yield copy.deepcopy(line)
+            continue
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if line.strip():
+            yield json.loads(line)
+
+
+class MemorySearchBackend:
+    """Indices, aliases and search contexts of one process, addressed through REST endpoint ids."""
+
+    def __init__(self):
+        self.indices = {}
+        self.aliases = {}
+        self.pits = {}
+        self.scrolls = {}
+        self.tasks = {}
+        self.lock = threading.RLock()
+        self._task_ids = itertools.count(1)
+
+    def handle(self, method, endpoint_id, path_parts, params, body):
+        """Answer one request; returns (status, body)."""
+        parts = {k: unquote(str(v)) for k, v in (path_parts or {}).items()}
+        handler = getattr(self, "_" + (endpoint_id or "").replace(".", "_"), None)
+        if handler is None:
+            raise SearchError(400, "illegal_argument_exception", f"[{endpoint_id}] is not supported by the in-memory search backend")
+        try:
+            return handler(parts, dict(params or {}), body)
+        except UnsupportedQuery as exc:
+            raise SearchError(400, "illegal_argument_exception", str(exc))
+        except MappingError as exc:
+            raise SearchError(400, "document_parsing_exception", str(exc))
+        except VersionConflict as exc:
+            raise SearchError(409, "version_conflict_engine_exception", str(exc))
+
+    # Index resolution
+
+    def _resolve(self, expression, ignore_unavailable=False):
+        names = []
+        for name in _list(expression or "_all"):
+            if name in ("_all", "*"):
+                names.extend(self.indices)
+            elif "*" in name:
+                names.extend(n for n in self.indices if fnmatch.fnmatchcase(n, name))
+                for alias, targets in self.aliases.items():
+                    if fnmatch.fnmatchcase(alias, name):
+                        names.extend(targets)
+            elif name in self.aliases:
+                names.extend(self.aliases[name])
+            elif name in self.indices:
+                names.append(name)
+            elif not _truthy(ignore_unavailable):
+                raise SearchError(404, "index_not_found_exception", f"no such index [{name}]", index=name)
+        return [self.indices[n] for n in dict.fromkeys(names) if n in self.indices]
+
+    def _single(self, expression, ignore_unavailable=False):
+        indices = self._resolve(expression, ignore_unavailable)
+        if len(indices) > 1:
+            raise SearchError(400, "illegal_argument_exception", "the in-memory search backend searches one index at a time")
+        return indices[0] if indices else None
+
+    def _write_index(self, name):
+        with self.lock:
+            if name in self.aliases:
+                targets = self.aliases[name]
+                writable = [t for t, options in targets.items() if options.get("is_write_index")] or list(targets)
+                if len(writable) != 1:
+                    raise SearchError(400, "illegal_argument_exception", f"no write index is defined for alias [{name}]")
+                return self.indices[writable[0]]
+            if name not in self.indices:
+                # Like action.auto_create_index: the first write creates it.
+                self.indices[name] = MemoryIndex(name)
+            return self.indices[name]
+
+    # Cluster
+
+    def _ping(self, parts, params, body):
+        return 200, None
+
+    def _info(self, parts, params, body):
+        return 200, {
+            "name": "memory", "cluster_name": "memory", "tagline": "You Know, for Search",
+            "version": {"number": "9.0.0", "build_flavor": "memory"},
+        }
+
+    def _cluster_health(self, parts, params, body):
+        return 200, {"cluster_name": "memory", "status": "green", "number_of_nodes": 1, "active_shards": len(self.indices)}
+
+    # Indices
+
+    def _indices_create(self, parts, params, body):
+        name = parts["index"]
+        body = body or {}
+        with self.lock:
+            if name in self.indices or name in self.aliases:
+                raise SearchError(400, "resource_already_exists_exception", f"index [{name}] already exists", index=name)
+            self.indices[name] = MemoryIndex(name, body.get("mappings"), body.get("settings"))
+            for alias, options in (body.get("aliases") or {}).items():
+                self.aliases.setdefault(alias, {})[name] = dict(options or {})
+        return 200, {"acknowledged": True, "shards_acknowledged": True, "index": name}
+
+    def _indices_delete(self, parts, params, body):
+        with self.lock:
+            for index in self._resolve(parts["index"], params.get("ignore_unavailable")):
+                del self.indices[index.name]
+                for alias in list(self.aliases):
+                    self.aliases[alias].pop(index.name, None)
+                    if not self.aliases[alias]:
+                        del self.aliases[alias]
+        return 200, {"acknowledged": True}
+
+    def _indices_exists(self, parts, params, body):
+        names = _list(parts["index"])
+        found = all(n in self.indices or n in self.aliases for n in names)
+        return (200 if found else 404), None
+
+    def _indices_get_alias(self, parts, params, body):
+        names = _list(parts.get("name"))
+        indices = {i.name for i in self._resolve(parts.get("index"), True)} if parts.get("index") else set(self.indices)
+        result = {}
+        for alias, targets in self.aliases.items():
+            if names and alias not in names:
+                continue
+            for target, options in targets.items():
+                if target in indices:
+                    result.setdefault(target, {"aliases": {}})["aliases"][alias] = dict(options)
+        if names and not result:
+            raise SearchError(404, "aliases_not_found_exception", f"aliases [{','.join(names)}] missing")
+        if not names:
+            for name in indices:
+                result.setdefault(name, {"aliases": {}})
+        return 200, result
+
+    def _indices_exists_alias(self, parts, params, body):
+        return (200 if all(n in self.aliases for n in _list(parts["name"])) else 404), None
+
+    def _indices_update_aliases(self, parts, params, body):
+        with self.lock:
+            for action in (body or {}).get("actions", []):
+                kind, options = next(iter(action.items()))
+                index = options.get("index")
+                if index not in self.indices:
+                    raise SearchError(404, "index_not_found_exception", f"no such index [{index}]", index=index)
+                if kind == "add":
+                    extra = {k: v for k, v in options.items() if k not in ("index", "alias")}
+                    self.aliases.setdefault(options["alias"], {})[index] = extra
+                elif kind == "remove":
+                    self.aliases.get(options["alias"], {}).pop(index, None)
+                    if not self.aliases.get(options["alias"], True):
+                        del self.aliases[options["alias"]]
+                elif kind == "remove_index":
+                    self._indices_delete({"index": index}, {}, None)
+                else:
+                    raise SearchError(400, "illegal_argument_exception", f"unsupported alias action [{kind}]")
+        return 200, {"acknowledged": True}
+
+    def _indices_put_mapping(self, parts, params, body):
+        for index in self._resolve(parts["index"]):
+            with index.lock:
+                index.mapping.merge((body or {}).get("properties", {}))
+        return 200, {"acknowledged": True}
+
+    def _indices_get_mapping(self, parts, params, body):
+        return 200, {
+            index.name: {"mappings": {"properties": index.mapping.as_properties()}}
+            for index in self._resolve(parts.get("index"), params.get("ignore_unavailable"))
+        }
+
+    def _indices_get_settings(self, parts, params, body):
+        result = {}
+        for index in self._resolve(parts.get("index"), params.get("ignore_unavailable")):
+            flat = dict(index.settings, **{"index.creation_date": str(index.created), "index.provided_name": index.name})
+            if _truthy(params.get("flat_settings")):
+                result[index.name] = {"settings": flat}
+            else:
+                nested = {}
+                for key, value in flat.items():
+                    node = nested
+                    *path, leaf = key.split(".")
+                    for part in path:
+                        node = node.setdefault(part, {})
+                    node[leaf] = value
+                result[index.name] = {"settings": nested}
+        return 200, result
+
+    def _indices_put_settings(self, parts, params, body):
+        settings_body = (body or {}).get("settings", body or {})
+        for index in self._resolve(parts.get("index")):
+            with index.lock:
+                for key, value in settings_body.items():
+                    key = key if key.startswith("index.") else f"index.{key}"
+                    if value is None:
+                        index.settings.pop(key, None)
+                    else:
+                        index.settings[key] = str(value)
+        return 200, {"acknowledged": True}
+
+    def _indices_refresh(self, parts, params, body):
+        self._resolve(parts.get("index"), params.get("ignore_unavailable"))
+        return 200, {"_shards": SHARDS}
+
+    # Documents
+
+    def _write_result(self, index, doc, result):
+        return {
+            "_index": index.name, "_id": doc.id, "_version": doc.version, "result": result,
+            "_shards": WRITE_SHARDS, "_seq_no": doc.seq_no, "_primary_term": 1,
+        }
+
+    def _put(self, name, doc_id, source, options):
+        index = self._write_index(name)
+        if doc_id is None:
+            doc_id = uuid.uuid4().hex
+        with index.lock:
+            existing = index.get(doc_id)
+            if options.get("version_type") == "external" and options.get("version") is not None:
+                version = int(options["version"])
+                if existing is not None and existing.version >= version:
+                    raise VersionConflict(f"[{doc_id}]: version conflict, current version [{existing.version}] is higher or equal to the one provided [{version}]")
+            result, doc = index.put(
+                doc_id, source, op_type=options.get("op_type", "index"),
+                if_seq_no=options.get("if_seq_no"), if_primary_term=options.get("if_primary_term"),
+            )
+            if options.get("version_type") == "external" and options.get("version") is not None:
+                doc.version = int(options["version"])
+        return 201 if result == "created" else 200, self._write_result(index, doc, result)
+
+    def _index(self, parts, params, body):
+        return self._put(parts["index"], parts.get("id"), copy.deepcopy(body), params)
+
+    def _create(self, parts, params, body):
+        return self._put(parts["index"], parts["id"], copy.deepcopy(body), dict(params, op_type="create"))
+
+    def _update_doc(self, name, doc_id, body, options):
+        index = self._write_index(name)
+        with index.lock:
+            existing = index.get(doc_id)
+            index._check_version(existing, options.get("if_seq_no"), options.get("if_primary_term"))
+            script = body.get("script")
+            if existing is None:
+                if "upsert" in body:
+                    source = copy.deepcopy(body["upsert"])
+                    if script is not None and body.get("scripted_upsert"):
+                        self._run_script(script, source)
+                elif body.get("doc_as_upsert") and "doc" in body:
+                    source = copy.deepcopy(body["doc"])
+                else:
+                    raise SearchError(404, "document_missing_exception", f"[{doc_id}]: document missing", index=index.name)
+                result, doc = index.put(doc_id, source)
+            else:
+                if script is not None:
+                    source = copy.deepcopy(existing.source)
+                    changed = self._run_script(script, source)
+                elif "doc" in body:
+                    source = _merge(existing.source, body["doc"])
+                    changed = source != existing.source or body.get("detect_noop") is False
+                else:
+                    raise SearchError(400, "action_request_validation_exception", "script or doc is missing")
+                if changed:
+                    result, doc = index.put(doc_id, source)
+                else:
+                    result, doc = "noop", existing
+            response = self._write_result(index, doc, result)
+            if _truthy(body.get("_source")) or _truthy(options.get("_source")):
+                response["get"] = {
+                    "_seq_no": doc.seq_no, "_primary_term": 1, "found": True, "_source": dict(doc.source),
+                }
+        return 200 if result != "created" else 201, response
+
+    def _run_script(self, script, source):
+        if isinstance(script, str):
+            script = {"source": script}
+        fn = python_equivalent(script.get("source") or "")
+        if fn is None:
+            raise SearchError(400, "illegal_argument_exception", "script is not supported by the in-memory search backend")
+        return fn(source, script.get("params") or {})
+
+    def _update(self, parts, params, body):
+        return self._update_doc(parts["index"], parts["id"], body or {}, params)
+
+    def _delete_doc(self, name, doc_id, options):
+        index = self._write_index(name)
+        doc = index.remove(doc_id, options.get("if_seq_no"), options.get("if_primary_term"))
+        if doc is None:
+            body = {
+                "_index": index.name, "_id": doc_id, "_version": 1, "result": "not_found",
+                "_shards": WRITE_SHARDS, "_seq_no": index.seq_no, "_primary_term": 1,
+            }
+            return 404, body
+        return 200, self._write_result(index, doc, "deleted")
+
+    def _delete(self, parts, params, body):
+        status, response = self._delete_doc(parts["index"], parts["id"], params)
+        if status == 404:
+            raise SearchError(404, "not_found", f"[{parts['id']}]: document missing", **response)
+        return status, response
+
+    def _doc_body(self, index, doc_id, spec):
+        doc = index.get(doc_id) if index is not None else None
+        if doc is None:
+            return {"_index": index.name if index is not None else None, "_id": doc_id, "found": False}
+        body = {
+            "_index": index.name, "_id": doc.id, "_version": doc.version,
+            "_seq_no": doc.seq_no, "_primary_term": 1, "found": True,
+        }
+        if spec is not False:
+            body["_source"] = filter_source(doc.source, spec)
+        return body
+
+    def _get(self, parts, params, body):
+        index = self._single(parts["index"])
+        with index.lock:
+            response = self._doc_body(index, parts["id"], _source_spec(params))
+        if not response["found"]:
+            raise SearchError(404, "not_found", f"[{parts['id']}]: document missing", **response)
+        return 200, response
+
+    def _mget(self, parts, params, body):
+        spec = _source_spec(params)
+        requests = [{"_id": i, "_index": parts.get("index")} for i in (body or {}).get("ids", [])]
+        requests.extend((body or {}).get("docs", []))
+        docs = []
+        for request in requests:
+            index = self._single(request.get("_index") or parts.get("index"), ignore_unavailable=True)
+            if index is None:
+                docs.append({"_index": request.get("_index") or parts.get("index"), "_id": request["_id"], "found": False})
+                continue
+            with index.lock:
+                docs.append(self._doc_body(index, request["_id"], request.get("_source", spec)))
+        return 200, {"docs": docs}
+
+    def _bulk(self, parts, params, body):
+        start = time.perf_counter()
+        items = []
+        lines = _bulk_lines(body)
+        for header in lines:
+            op, meta = next(iter(header.items()))
+            name = meta.get("_index") or parts.get("index")
+            doc_id = meta.get("_id")
+            options = {k.lstrip("_"): v for k, v in meta.items() if k not in ("_index", "_id")}
+            try:
+                if op in ("index", "create"):
+                    source = next(lines)
+                    if op == "create":
+                        options["op_type"] = "create"
+                    status, result = self._put(name, doc_id, source, options)
+                elif op == "update":
+                    status, result = self._update_doc(name, doc_id, next(lines), options)
+                elif op == "delete":
+                    status, result = self._delete_doc(name, doc_id, options)
+                else:
+                    raise SearchError(400, "illegal_argument_exception", f"unknown bulk action [{op}]")
+                result = dict(result, status=status)
+            except (SearchError, UnsupportedQuery, MappingError, VersionConflict) as exc:
+                if isinstance(exc, SearchError):
+                    status, error = exc.status, exc.body["error"]
+                else:
+                    status, error_type = {
+                        UnsupportedQuery: (400, "illegal_argument_exception"),
+                        MappingError: (400, "document_parsing_exception"),
+                        VersionConflict: (409, "version_conflict_engine_exception"),
+                    }[type(exc)]
+                    error = {"type": error_type, "reason": str(exc)}
+                result = {"_index": name, "_id": doc_id, "status": status, "error": error}
+            items.append({op: result})
+        took = int((time.perf_counter() - start) * 1000)
+        errors = any(not 200 <= item[next(iter(item))]["status"] < 300 for item in items)
+        return 200, {"took": took, "errors": errors, "items": items}
+
+    # Search
+
+    def _search(self, parts, params, body):
+        start = time.perf_counter()
+        body = dict(body or {})
+        for key in ("from", "size", "track_total_hits"):
+            if key in params and key not in body:
+                body[key] = params[key]
+        pit = body.get("pit")
+        if pit:
+            index = self._pit_index(pit["id"], pit.get("keep_alive"))
+        else:
+            index = self._single(parts.get("index"), params.get("ignore_unavailable"))
+        scroll = params.get("scroll")
+        if index is None:
+            response = {"took": 0, "timed_out": False, "_shards": SHARDS,
+                        "hits": {"total": {"value": 0, "relation": "eq"}, "max_score": None, "hits": []}}
+        else:
+            with index.lock:
+                response = self._run_search(index, body, everything=scroll is not None, pit=bool(pit))
+        if pit:
+            response["pit_id"] = pit["id"]
+        if scroll is not None:
+            hits = response["hits"]["hits"]
+            size = int(body.get("size", 10))
+            scroll_id = uuid.uuid4().hex
+            with self.lock:
+                self.scrolls[scroll_id] = [hits[size:], time.monotonic() + _seconds(scroll), size]
+            response["hits"]["hits"] = hits[:size]
+            response["_scroll_id"] = scroll_id
+        response["took"] = int((time.perf_counter() - start) * 1000)
+        return 200, response
+
+    def _run_search(self, index, body, everything=False, pit=False):
+        query = body.get("query")
+        ids, scores = index.query(query)
+        slice_spec = body.get("slice")
+        if slice_spec:
+            slice_id, max_slices = int(slice_spec["id"]), int(slice_spec["max"])
+            ids = {o for o in (index.by_ord if ids is None else ids) if o % max_slices == slice_id}
+        aggs = body.get("aggs") or body.get("aggregations")
+        aggregations = index.aggregate(aggs, ids) if aggs else None
+        if body.get("post_filter"):
+            ids = _and(ids, index.matching(body["post_filter"]))
+        total = index._count(ids)
+        specs = index.sort_specs(body.get("sort"), implicit_tiebreaker=pit)
+        from_ = int(body.get("from", 0))
+        size = int(body.get("size", 10))
+        if everything:
+            from_, size = 0, total
+        else:
+            window = int(index.settings.get("index.max_result_window", 10_000))
+            if from_ + size > window:
+                raise SearchError(400, "illegal_argument_exception",
+                                  f"Result window is too large, from + size must be less than or equal to: [{window}]")
+        chosen = index.select(ids, scores, specs, from_ + size, body.get("search_after"))[from_:]
+
+        source_spec = body.get("_source")
+        highlight = body.get("highlight")
+        terms = query_terms(query) if highlight else None
+        hits = []
+        for o in chosen:
+            doc = index.by_ord[o]
+            score = None if specs is not None else (scores if isinstance(scores, float) else scores.get(o, 0.0))
+            hit = {"_index": index.name, "_id": doc.id, "_score": score}
+            if source_spec is not False:
+                hit["_source"] = filter_source(doc.source, source_spec)
+            if specs is not None:
+                hit["sort"] = index.sort_values(o, specs, scores)
+            if highlight:
+                fragments = index.highlight(doc, highlight, terms)
+                if fragments:
+                    hit["highlight"] = fragments
+            hits.append(hit)
+        scored = [h["_score"] for h in hits if h["_score"] is not None]
+        hits_body = {"max_score": max(scored) if scored else None, "hits": hits}
+        track = body.get("track_total_hits", DEFAULT_TRACK_TOTAL_HITS)
+        if track is True or str(track).lower() == "true":
+            hits_body["total"] = {"value": total, "relation": "eq"}
+        elif track is not False and str(track).lower() != "false":
+            limit = int(track)
+            hits_body["total"] = {"value": min(total, limit), "relation": "gte" if total > limit else "eq"}
+        response = {"took": 0, "timed_out": False, "_shards": SHARDS, "hits": hits_body}
+        if aggregations is not None:
+            response["aggregations"] = aggregations
+        return response
+
+    def _count(self, parts, params, body):
+        index = self._single(parts.get("index"), params.get("ignore_unavailable"))
+        if index is None:
+            return 200, {"count": 0, "_shards": SHARDS}
+        with index.lock:
+            count = index._count(index.matching((body or {}).get("query")))
+        return 200, {"count": count, "_shards": SHARDS}
+
+    def _scroll(self, parts, params, body):
+        scroll_id = (body or {}).get("scroll_id") or params.get("scroll_id")
+        with self.lock:
+            context = self.scrolls.get(scroll_id)
+            if context is None or context[1] < time.monotonic():
+                self.scrolls.pop(scroll_id, None)
+                raise SearchError(404, "search_context_missing_exception", f"No search context found for id [{scroll_id}]")
+            remaining, _, size = context
+            context[0] = remaining[size:]
+            context[1] = time.monotonic() + _seconds((body or {}).get("scroll") or params.get("scroll"))
+        return 200, {"_scroll_id": scroll_id, "took": 0, "timed_out": False, "_shards": SHARDS,
+                     "hits": {"hits": remaining[:size]}}
+
+    def _clear_scroll(self, parts, params, body):
+        ids = _list((body or {}).get("scroll_id") or parts.get("scroll_id"))
+        with self.lock:
+            freed = sum(1 for i in ids if self.scrolls.pop(i, None) is not None)
+        return 200, {"succeeded": True, "num_freed": freed}
+
+    def _open_point_in_time(self, parts, params, body):
+        index = self._single(parts["index"], params.get("ignore_unavailable"))
+        if index is None:
+            raise SearchError(404, "index_not_found_exception", f"no such index [{parts['index']}]")
+        pit_id = uuid.uuid4().hex
+        with self.lock:
+            self.pits[pit_id] = [index.name, time.monotonic() + _seconds(params.get("keep_alive"))]
+        return 200, {"id": pit_id}
+
+    def _pit_index(self, pit_id, keep_alive):
+        with self.lock:
+            context = self.pits.get(pit_id)
+            if context is None or context[1] < time.monotonic() or context[0] not in self.indices:
+                self.pits.pop(pit_id, None)
+                raise SearchError(404, "search_context_missing_exception", f"No search context found for id [{pit_id}]")
+            if keep_alive:
+                context[1] = time.monotonic() + _seconds(keep_alive)
+            return self.indices[context[0]]
+
+    def _close_point_in_time(self, parts, params, body):
+        with self.lock:
+            freed = 1 if self.pits.pop((body or {}).get("id"), None) is not None else 0
+        return 200, {"succeeded": True, "num_freed": freed}
+
+    # Background-style operations, run synchronously and reported as finished tasks
+
+    def _task(self, action, description, response):
+        task_id = f"memory:{next(self._task_ids)}"
+        with self.lock:
+            self.tasks[task_id] = {
+                "completed": True,
+                "task": {
+                    "node": "memory", "id": int(task_id.split(":")[1]), "action": action,
+                    "description": description, "running_time_in_nanos": response.get("took", 0) * 1_000_000,
+                    "status": {k: response[k] for k in ("total", "created", "updated", "deleted", "version_conflicts") if k in response},
+                },
+                "response": response,
+            }
+        return task_id
+
+    def _delete_by_query(self, parts, params, body):
+        start = time.perf_counter()
+        query = (body or {}).get("query")
+        deleted = 0
+        for index in self._resolve(parts["index"], params.get("ignore_unavailable")):
+            with index.lock:
+                ids = index.matching(query)
+                for doc in [index.by_ord[o] for o in (list(index.by_ord) if ids is None else ids)]:
+                    index.remove(doc.id)
+                    deleted += 1
+        response = {
+            "took": int((time.perf_counter() - start) * 1000), "timed_out": False, "total": deleted,
+            "deleted": deleted, "batches": 1, "version_conflicts": 0, "noops": 0, "failures": [],
+        }
+        if params.get("wait_for_completion") is False or str(params.get("wait_for_completion")).lower() == "false":
+            return 200, {"task": self._task("indices:data/write/delete/byquery", f"delete-by-query [{parts['index']}]", response)}
+        return 200, response
+
+    def _reindex(self, parts, params, body):
+        start = time.perf_counter()
+        source, dest = body["source"], body["dest"]
+        counts = {"created": 0, "updated": 0, "version_conflicts": 0}
+        external = dest.get("version_type") == "external"
+        for index in self._resolve(source["index"]):
+            with index.lock:
+                ids = index.matching(source.get("query"))
+                docs = [index.by_ord[o] for o in (list(index.by_ord) if ids is None else sorted(ids))]
+            for doc in docs:
+                options = {"version_type": "external", "version": doc.version} if external else {}
+                try:
+                    status, result = self._put(dest["index"], doc.id, copy.deepcopy(doc.source), options)
+                except VersionConflict:
+                    counts["version_conflicts"] += 1
+                    continue
+                counts[result["result"]] += 1
+        response = {
+            "took": int((time.perf_counter() - start) * 1000), "timed_out": False,
+            "total": sum(counts.values()), **counts, "deleted": 0, "batches": 1, "noops": 0, "failures": [],
+        }
+        if str(params.get("wait_for_completion")).lower() == "false":
+            return 200, {"task": self._task("indices:data/write/reindex", f"reindex from [{source['index']}] to [{dest['index']}]", response)}
+        return 200, response
+
+    def _tasks_get(self, parts, params, body):
+        task = self.tasks.get(parts["task_id"])
+        if task is None:
+            raise SearchError(404, "resource_not_found_exception", f"task [{parts['task_id']}] isn't running and hasn't stored its results")
+        return 200, task
+
+    def _tasks_cancel(self, parts, params, body):
+        if parts.get("task_id") and parts["task_id"] not in self.tasks:
+            raise SearchError(404, "resource_not_found_exception", f"task [{parts['task_id']}] is not found")
+        return 200, {"nodes": {}}
+
+    # Seeding
+
+    def seed(self, products=0, articles=0, seed=0):
+        """Create the registry indices behind their aliases and load synthetic documents."""
+        from .synthetic import synthetic_articles, synthetic_products
+
+        for name in INDEX_DEFINITIONS:
+            target = versioned_name(name)
+            if target not in self.indices and name not in self.aliases:
+                body = index_body(name)
+                body["aliases"] = {name: {"is_write_index": True}}
+                self._indices_create({"index": target}, {}, body)
+        for doc in synthetic_products(products, seed=seed):
+            self._put("products", doc["id"], doc, {})
+        for doc in synthetic_articles(articles, seed=seed):
+            self._put("articles", doc.pop("id"), doc, {})
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_memory_backend():
+    """The process-wide in-memory backend, created (and seeded per MEMORY_SEARCH) on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend = MemorySearchBackend()
+                config = settings.MEMORY_SEARCH
+                if config["CREATE_INDICES"]:
+                    backend.seed(config["SEED_PRODUCTS"], config["SEED_ARTICLES"], config["SEED"])
+                _backend = backend
+    return _backend
+
+
+class MemoryElasticsearch(Elasticsearch):
+    """The Elasticsearch client with every request answered by the in-memory backend."""
+
+    def __init__(self, *args, **kwargs):
+        if not args and "_transport" not in kwargs:
+            kwargs.setdefault("hosts", [NODE.scheme + "://" + NODE.host + ":" + str(NODE.port)])
+        super().__init__(*args, **kwargs)
+
+    def perform_request(self, method, path, *, params=None, headers=None, body=None, endpoint_id=None, path_parts=None):
+        start = time.perf_counter()
+        try:
+            status, response = get_memory_backend().handle(method, endpoint_id, path_parts, params, body)
+        except SearchError as exc:
+            status, response = exc.status, exc.body
+        elapsed = time.perf_counter() - start
+        took = response.get("took") if isinstance(response, dict) else None
+        record_es_call(endpoint_id, elapsed, status, took, body, (path_parts or {}).get("index"))
+        meta = ApiResponseMeta(
+            status=status, http_version="1.1", headers=HttpHeaders({"x-elastic-product": "Elasticsearch"}),
+            duration=elapsed, node=NODE,
+        )
+        if method == "HEAD":
+            return HeadApiResponse(meta=meta)
+        ignore = () if self._ignore_status in (DEFAULT, None) else self._ignore_status
+        if not 200 <= status < 300 and status not in ignore:
+            error = response.get("error", {}) if isinstance(response, dict) else {}
+            raise HTTP_EXCEPTIONS.get(status, ApiError)(
+                message=error.get("type", str(status)) if isinstance(error, dict) else str(error), meta=meta, body=response
+            )
+        return ObjectApiResponse(body=response, meta=meta)
+
+
+class AsyncMemoryElasticsearch:
+    """Awaitable facade over MemoryElasticsearch for the ASGI views; requests still run inline."""
+
+    def __init__(self, client=None):
+        self._client = client or MemoryElasticsearch()
+
+    def options(self, **kwargs):
+        return AsyncMemoryElasticsearch(self._client.options(**kwargs))
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            return attr(*args, **kwargs)
+        return call
+
+    async def close(self):
+        self._client.close()
@@ -0,0 +1,1056 @@
+# In-process search engine behind SEARCH_BACKEND=memory (see
+# api/memory_client.py). Every index keeps the same kinds of structures
+# Elasticsearch builds from the mappings in api/indices.py:
+#
+# - text fields: an inverted index of token -> {ordinal: term frequency}
+#   plus field lengths, scored with BM25;
+# - keyword and boolean fields: value -> set of ordinals;
+# - numeric and date fields: a sorted list of (value, ordinal) that answers
+#   range filters with two bisections and sorted listings by walking it.
+#
+# Documents are addressed internally by an integer ordinal assigned on first
+# insert, which also serves as index order (_doc/_shard_doc). Only the query,
+# sort and aggregation shapes the API builds are implemented; anything else
+# raises UnsupportedQuery rather than returning a wrong answer.
+import bisect
+import fnmatch
+import heapq
+import itertools
+import math
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+TOKEN_RE = re.compile(r"\w+")
+DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?(Z|[+-]\d{2}:?\d{2})?$")
+DATE_MATH_RE = re.compile(r"^now(?:([+-]\d+)([smhdw]))?(?:/[smhdw])?$")
+DATE_MATH_UNITS = {"s": 1000, "m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Prefix expansions per query term, as Elasticsearch's max_expansions.
+MAX_EXPANSIONS = 50
+DEFAULT_TRACK_TOTAL_HITS = 10_000
+MAX_BUCKETS = 65_536
+
+TEXT_TYPES = {"text", "search_as_you_type", "match_only_text"}
+KEYWORD_TYPES = {"keyword", "constant_keyword", "wildcard"}
+INTEGER_TYPES = {"long", "integer", "short", "byte", "unsigned_long"}
+NUMERIC_TYPES = INTEGER_TYPES | {"double", "float", "half_float", "scaled_float"}
+DATE_TYPES = {"date", "date_nanos"}
+SAYT_SUFFIXES = ("._2gram", "._3gram", "._4gram", "._index_prefix")
+
+
+class UnsupportedQuery(ValueError):
+    """A query, sort or aggregation shape the in-memory engine does not implement."""
+
+
+class MappingError(ValueError):
+    """A field value that cannot be indexed with its mapped type."""
+
+
+class VersionConflict(Exception):
+    pass
+
+
+def analyze(value):
+    """Lower-cased word tokens, roughly the standard analyzer."""
+    if isinstance(value, (list, tuple)):
+        return [t for v in value if v is not None for t in analyze(v)]
+    return TOKEN_RE.findall(str(value).lower())
+
+
+def parse_date(value):
+    """Epoch milliseconds for an ISO-8601 string, epoch millis or ``now`` date math."""
+    if isinstance(value, bool):
+        raise MappingError(f"failed to parse date field [{value}]")
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = str(value).strip()
+    math_match = DATE_MATH_RE.match(text)
+    if math_match:
+        millis = int(time.time() * 1000)
+        if math_match.group(1):
+            millis += int(math_match.group(1)) * DATE_MATH_UNITS[math_match.group(2)]
+        return millis
+    try:
+        parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        raise MappingError(f"failed to parse date field [{value}]")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+
+def _normalize(ftype, value):
+    if ftype in KEYWORD_TYPES:
+        if isinstance(value, bool):
+            return "true" if value else "false"
+        if isinstance(value, (dict, list)):
+            raise MappingError(f"cannot index {type(value).__name__} in keyword field")
+        return str(value)
+    if ftype == "boolean":
+        if isinstance(value, bool):
+            return value
+        if value in ("true", "false"):
+            return value == "true"
+        raise MappingError(f"failed to parse boolean field [{value}]")
+    if ftype in NUMERIC_TYPES:
+        if isinstance(value, bool):
+            raise MappingError(f"failed to parse numeric field [{value}]")
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            raise MappingError(f"failed to parse numeric field [{value}]")
+        return int(number) if ftype in INTEGER_TYPES else number
+    if ftype in DATE_TYPES:
+        return parse_date(value)
+    return value
+
+
+def get_path(source, path):
+    if path in source:
+        return source[path]
+    value = source
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def _descending_runs(ordered):
+    """(value, ordinal) pairs by descending value, ascending ordinal within a value."""
+    end = len(ordered)
+    while end:
+        start = bisect.bisect_left(ordered, (ordered[end - 1][0],), 0, end)
+        for i in range(start, end):
+            yield ordered[i]
+        end = start
+
+
+def _values(raw):
+    if raw is None:
+        return []
+    if isinstance(raw, list):
+        return [v for v in raw if v is not None]
+    return [raw]
+
+
+def filter_source(source, spec):
+    """A shallow copy of ``source`` limited by a ``_source`` spec (None: everything)."""
+    if spec is None or spec is True:
+        return dict(source)
+    if isinstance(spec, str):
+        spec = [spec]
+    if isinstance(spec, list):
+        spec = {"includes": spec}
+    includes = spec.get("includes") or spec.get("include") or []
+    excludes = spec.get("excludes") or spec.get("exclude") or []
+    if isinstance(includes, str):
+        includes = [includes]
+    if isinstance(excludes, str):
+        excludes = [excludes]
+    return {
+        k: v for k, v in source.items()
+        if (not includes or any(fnmatch.fnmatchcase(k, p) for p in includes))
+        and not any(fnmatch.fnmatchcase(k, p) for p in excludes)
+    }
+
+
+def _and(a, b):
+    # None stands for "every document". Result sets are never mutated in
+    # place, so returning an operand (possibly an index posting) is safe.
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return a & b if len(a) <= len(b) else b & a
+
+
+def _clauses(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _field_and_spec(spec, what):
+    fields = [k for k in spec if k not in ("boost", "_name")]
+    if len(fields) != 1:
+        raise UnsupportedQuery(f"[{what}] expects exactly one field")
+    return fields[0], spec[fields[0]]
+
+
+class _Desc:
+    """Inverts the ordering of a non-numeric sort value."""
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __gt__(self, other):
+        return other.value > self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+class Mapping:
+    """Field name -> type, including multi-fields (``name.keyword``) and dynamic fields."""
+
+    def __init__(self, properties=None):
+        self.types = {}
+        self.paths = {}
+        self.properties = {}
+        # copy_to target path -> source paths whose values it indexes
+        self.copies = {}
+        self.merge(properties or {})
+
+    def merge(self, properties, prefix=""):
+        for name, spec in properties.items():
+            if prefix == "":
+                self.properties[name] = spec
+            path = prefix + name
+            if "properties" in spec:
+                self.merge(spec["properties"], path + ".")
+                continue
+            self._add(path, path, spec.get("type", "object"))
+            for target in _values(spec.get("copy_to")):
+                sources = self.copies.setdefault(target, [])
+                if path not in sources:
+                    sources.append(path)
+            for sub, subspec in (spec.get("fields") or {}).items():
+                self._add(f"{path}.{sub}", path, subspec.get("type", "keyword"))
+
+    def _add(self, field, path, ftype):
+        if field not in self.types:
+            self.types[field] = ftype
+            self.paths[field] = path
+
+    def add_dynamic(self, source, prefix=""):
+        """Map fields seen for the first time the way dynamic mapping would."""
+        added = {}
+        for key, value in source.items():
+            path = prefix + key
+            if isinstance(value, dict):
+                if path not in self.types:
+                    added.update(self.add_dynamic(value, path + "."))
+                continue
+            if path in self.types:
+                continue
+            sample = next(iter(_values(value)), None)
+            if sample is None:
+                continue
+            if isinstance(sample, bool):
+                spec = {"type": "boolean"}
+            elif isinstance(sample, int):
+                spec = {"type": "long"}
+            elif isinstance(sample, float):
+                spec = {"type": "float"}
+            elif isinstance(sample, str) and DATE_RE.match(sample):
+                spec = {"type": "date"}
+            elif isinstance(sample, str):
+                spec = {"type": "text", "fields": {"keyword": {"type": "keyword", "ignore_above": 256}}}
+            else:
+                continue
+            added[path] = spec
+        if added and not prefix:
+            self.merge(added)
+        return added
+
+    def resolve(self, field):
+        """The mapped field a query refers to, or None; search_as_you_type subfields map to their parent."""
+        if field in self.types:
+            return field
+        for suffix in SAYT_SUFFIXES:
+            if field.endswith(suffix) and field[: -len(suffix)] in self.types:
+                return field[: -len(suffix)]
+        return None
+
+    def as_properties(self):
+        return dict(self.properties)
+
+
+class Doc:
+    __slots__ = ("id", "ordinal", "source", "seq_no", "version", "values")
+
+    def __init__(self, doc_id, ordinal, source, seq_no, version, values):
+        self.id = doc_id
+        self.ordinal = ordinal
+        self.source = source
+        self.seq_no = seq_no
+        self.version = version
+        self.values = values
+
+
+class MemoryIndex:
+    def __init__(self, name, mappings=None, settings=None):
+        self.name = name
+        self.mapping = Mapping((mappings or {}).get("properties"))
+        self.settings = {"index.number_of_shards": "1", "index.number_of_replicas": "1", "index.refresh_interval": "1s"}
+        self.settings.update({k if k.startswith("index.") else f"index.{k}": str(v) for k, v in _flat(settings or {}).items()})
+        self.created = int(time.time() * 1000)
+        self.lock = threading.RLock()
+        self.docs = {}
+        self.by_ord = {}
+        self.seq_no = -1
+        self._ordinals = itertools.count()
+        self.postings = {}
+        self.lengths = {}
+        self.total_length = {}
+        self.keywords = {}
+        self.sorted = {}
+        self._vocab = {}
+
+    # Writes
+
+    def _prepare(self, source):
+        self.mapping.add_dynamic(source)
+        values = {}
+        texts = {}
+        for field, ftype in self.mapping.types.items():
+            path = self.mapping.paths[field]
+            raw = get_path(source, path)
+            if path in self.mapping.copies:
+                copied = [v for src in self.mapping.copies[path] for v in _values(get_path(source, src))]
+                raw = _values(raw) + copied or None
+            if raw is None or isinstance(raw, dict):
+                continue
+            if ftype in TEXT_TYPES:
+                texts[path] = raw
+                continue
+            if ftype not in KEYWORD_TYPES and ftype != "boolean" and ftype not in NUMERIC_TYPES and ftype not in DATE_TYPES:
+                continue
+            normalized = [_normalize(ftype, v) for v in _values(raw)]
+            if normalized:
+                values[field] = normalized if isinstance(raw, list) else normalized[0]
+        return values, texts
+
+    def _index(self, doc, texts):
+        o = doc.ordinal
+        for path, raw in texts.items():
+            tokens = analyze(raw)
+            postings = self.postings.setdefault(path, {})
+            for token, tf in Counter(tokens).items():
+                plist = postings.get(token)
+                if plist is None:
+                    plist = postings[token] = {}
+                    self._vocab.pop(path, None)
+                plist[o] = tf
+            self.lengths.setdefault(path, {})[o] = len(tokens)
+            self.total_length[path] = self.total_length.get(path, 0) + len(tokens)
+        for field, value in doc.values.items():
+            if self.mapping.paths[field] != field:
+                continue
+            ftype = self.mapping.types[field]
+            if ftype in KEYWORD_TYPES or ftype == "boolean":
+                index = self.keywords.setdefault(field, {})
+                for v in _values(value):
+                    index.setdefault(v, set()).add(o)
+            elif ftype in NUMERIC_TYPES or ftype in DATE_TYPES:
+                ordered = self.sorted.setdefault(field, [])
+                for v in set(_values(value)):
+                    bisect.insort(ordered, (v, o))
+
+    def _unindex(self, doc):
+        o = doc.ordinal
+        _, texts = self._prepare(doc.source)
+        for path, raw in texts.items():
+            postings = self.postings.get(path, {})
+            for token in set(analyze(raw)):
+                plist = postings.get(token)
+                if plist is not None:
+                    plist.pop(o, None)
+                    if not plist:
+                        del postings[token]
+                        self._vocab.pop(path, None)
+            length = self.lengths.get(path, {}).pop(o, 0)
+            self.total_length[path] = self.total_length.get(path, 0) - length
+        for field, value in doc.values.items():
+            if field in self.keywords:
+                index = self.keywords[field]
+                for v in _values(value):
+                    members = index.get(v)
+                    if members is not None:
+                        members.discard(o)
+                        if not members:
+                            del index[v]
+            elif field in self.sorted:
+                ordered = self.sorted[field]
+                for v in set(_values(value)):
+                    i = bisect.bisect_left(ordered, (v, o))
+                    if i < len(ordered) and ordered[i] == (v, o):
+                        del ordered[i]
+
+    def _check_version(self, existing, if_seq_no, if_primary_term):
+        if if_seq_no is None and if_primary_term is None:
+            return
+        if existing is None or existing.seq_no != int(if_seq_no) or int(if_primary_term) != 1:
+            current = "document does not exist" if existing is None else f"current document has seqNo [{existing.seq_no}] and primary term [1]"
+            raise VersionConflict(f"required seqNo [{if_seq_no}], primary term [{if_primary_term}]. {current}")
+
+    def put(self, doc_id, source, op_type="index", if_seq_no=None, if_primary_term=None):
+        """Store ``source`` (owned by the index from now on); returns (result, doc)."""
+        with self.lock:
+            existing = self.docs.get(doc_id)
+            if op_type == "create" and existing is not None:
+                raise VersionConflict(f"[{doc_id}]: version conflict, document already exists (current version [{existing.version}])")
+            self._check_version(existing, if_seq_no, if_primary_term)
+            values, texts = self._prepare(source)
+            if existing is not None:
+                self._unindex(existing)
+                ordinal, version = existing.ordinal, existing.version + 1
+            else:
+                ordinal, version = next(self._ordinals), 1
+            self.seq_no += 1
+            doc = Doc(doc_id, ordinal, source, self.seq_no, version, values)
+            self.docs[doc_id] = doc
+            self.by_ord[ordinal] = doc
+            self._index(doc, texts)
+            return ("updated" if existing is not None else "created"), doc
+
+    def remove(self, doc_id, if_seq_no=None, if_primary_term=None):
+        """Delete ``doc_id``; returns the deleted doc or None when it did not exist."""
+        with self.lock:
+            existing = self.docs.get(doc_id)
+            self._check_version(existing, if_seq_no, if_primary_term)
+            if existing is None:
+                return None
+            self._unindex(existing)
+            del self.docs[doc_id]
+            del self.by_ord[existing.ordinal]
+            self.seq_no += 1
+            existing.seq_no = self.seq_no
+            existing.version += 1
+            return existing
+
+    def get(self, doc_id):
+        return self.docs.get(doc_id)
+
+    # Queries
+
+    def _all(self):
+        return set(self.by_ord)
+
+    def _count(self, ids):
+        return len(self.by_ord) if ids is None else len(ids)
+
+    def query(self, query, scoring=True):
+        """Return (ordinals, scores) for a query clause; ordinals None means every document, scores a float or a dict."""
+        if query is None:
+            return None, 1.0
+        if not isinstance(query, dict) or len(query) != 1:
+            raise UnsupportedQuery(f"expected a single query clause, got {query!r}")
+        kind, spec = next(iter(query.items()))
+        handler = getattr(self, f"_q_{kind}", None)
+        if handler is None:
+            raise UnsupportedQuery(f"query [{kind}] is not supported by the in-memory search backend")
+        return handler(spec, scoring)
+
+    def matching(self, query):
+        return self.query(query, scoring=False)[0]
+
+    def _q_match_all(self, spec, scoring):
+        return None, float(spec.get("boost", 1.0))
+
+    def _q_match_none(self, spec, scoring):
+        return set(), 0.0
+
+    def _q_constant_score(self, spec, scoring):
+        return self.matching(spec["filter"]), float(spec.get("boost", 1.0))
+
+    def _q_ids(self, spec, scoring):
+        return {self.docs[i].ordinal for i in spec.get("values", []) if i in self.docs}, float(spec.get("boost", 1.0))
+
+    def _q_exists(self, spec, scoring):
+        path = self.mapping.paths.get(spec["field"], spec["field"])
+        return {o for o, doc in self.by_ord.items() if get_path(doc.source, path) not in (None, [])}, 1.0
+
+    def _q_term(self, spec, scoring):
+        field, value = _field_and_spec(spec, "term")
+        boost = 1.0
+        if isinstance(value, dict):
+            boost = float(value.get("boost", 1.0))
+            value = value["value"]
+        return self._term_ids(field, value), boost
+
+    def _q_terms(self, spec, scoring):
+        field, values = _field_and_spec(spec, "terms")
+        ids = set()
+        for value in values:
+            ids |= self._term_ids(field, value)
+        return ids, float(spec.get("boost", 1.0))
+
+    def _q_range(self, spec, scoring):
+        field, bounds = _field_and_spec(spec, "range")
+        return self._range_ids(field, bounds), float(bounds.get("boost", 1.0))
+
+    def _q_bool(self, spec, scoring):
+        ids = None
+        must_scores = []
+        must = _clauses(spec.get("must"))
+        for clause in must:
+            clause_ids, clause_scores = self.query(clause, scoring)
+            ids = _and(ids, clause_ids)
+            must_scores.append(clause_scores)
+        filters = _clauses(spec.get("filter"))
+        for clause in filters:
+            ids = _and(ids, self.matching(clause))
+        should = [self.query(clause, scoring) for clause in _clauses(spec.get("should"))]
+        if should:
+            required = spec.get("minimum_should_match", 0 if (must or filters) else 1)
+            if str(required) not in ("0", "0%"):
+                if str(required) not in ("1", "100%") and len(should) > 1:
+                    raise UnsupportedQuery("minimum_should_match other than 1 is not supported")
+                matched = set()
+                for clause_ids, _ in should:
+                    if clause_ids is None:
+                        matched = None
+                        break
+                    matched |= clause_ids
+                ids = _and(ids, matched)
+        for clause in _clauses(spec.get("must_not")):
+            excluded = self.matching(clause)
+            ids = set() if excluded is None else (self._all() if ids is None else ids) - excluded
+        boost = float(spec.get("boost", 1.0))
+        if not scoring or (not must and not should):
+            return ids, 0.0
+        if not should and all(isinstance(s, float) for s in must_scores):
+            return ids, sum(must_scores) * boost
+        if not should and len(must_scores) == 1 and boost == 1.0:
+            # Filters only narrow ``ids``; scores outside them are never read.
+            return ids, must_scores[0]
+        scores = {}
+        for o in (self.by_ord if ids is None else ids):
+            total = 0.0
+            for s in must_scores:
+                total += s if isinstance(s, float) else s.get(o, 0.0)
+            for clause_ids, s in should:
+                if isinstance(s, float):
+                    if clause_ids is None or o in clause_ids:
+                        total += s
+                else:
+                    total += s.get(o, 0.0)
+            scores[o] = total * boost
+        return ids, scores
+
+    def _q_match(self, spec, scoring):
+        field, value = _field_and_spec(spec, "match")
+        if isinstance(value, dict):
+            return self._text_query(
+                [field], value["query"], "best_fields", value.get("operator", "or"), float(value.get("boost", 1.0)), scoring
+            )
+        return self._text_query([field], value, "best_fields", "or", 1.0, scoring)
+
+    def _q_multi_match(self, spec, scoring):
+        kind = spec.get("type", "best_fields")
+        if kind not in ("best_fields", "most_fields", "bool_prefix"):
+            raise UnsupportedQuery(f"multi_match type [{kind}] is not supported by the in-memory search backend")
+        fields = spec.get("fields")
+        if not fields:
+            raise UnsupportedQuery("multi_match needs explicit fields in the in-memory search backend")
+        return self._text_query(fields, spec["query"], kind, spec.get("operator", "or"), float(spec.get("boost", 1.0)), scoring)
+
+    def _text_path(self, field):
+        resolved = self.mapping.resolve(field)
+        if resolved is None or self.mapping.types[resolved] not in TEXT_TYPES:
+            return None
+        return self.mapping.paths[resolved]
+
+    def _text_query(self, fields, text, kind, operator, boost, scoring):
+        tokens = analyze(text)
+        prefix = tokens.pop() if kind == "bool_prefix" and tokens else None
+        boosts = {}
+        for entry in fields:
+            name, _, field_boost = entry.partition("^")
+            path = self._text_path(name)
+            if path is not None:
+                boosts[path] = max(boosts.get(path, 0.0), float(field_boost) if field_boost else 1.0)
+        best = kind == "best_fields"
+        scores = None
+        for path, field_boost in boosts.items():
+            field_scores = self._bm25(path, tokens, operator == "and" and prefix is None)
+            if prefix is not None:
+                for o in self._prefix_ordinals(path, prefix):
+                    field_scores[o] = field_scores.get(o, 0.0) + 1.0
+            if field_boost != 1.0:
+                field_scores = {o: s * field_boost for o, s in field_scores.items()}
+            if scores is None:
+                scores = field_scores
+                continue
+            if len(field_scores) > len(scores):
+                scores, field_scores = field_scores, scores
+            get = scores.get
+            if best:
+                scores.update({o: s for o, s in field_scores.items() if s > get(o, -1.0)})
+            else:
+                scores.update({o: s + get(o, 0.0) for o, s in field_scores.items()})
+        if scores is None:
+            scores = {}
+        if not scoring:
+            return set(scores), 0.0
+        if boost != 1.0:
+            scores = {o: s * boost for o, s in scores.items()}
+        return set(scores), scores
+
+    def _bm25(self, path, tokens, require_all):
+        postings = self.postings.get(path)
+        lengths = self.lengths.get(path)
+        if not postings or not lengths or not tokens:
+            return {}
+        n_docs = len(lengths)
+        avgdl = self.total_length[path] / n_docs
+        scores = {}
+        required = None
+        for token, qtf in Counter(tokens).items():
+            plist = postings.get(token)
+            if not plist:
+                if require_all:
+                    return {}
+                continue
+            if require_all:
+                required = set(plist) if required is None else required & plist.keys()
+            weight = math.log(1 + (n_docs - len(plist) + 0.5) / (len(plist) + 0.5)) * qtf * (BM25_K1 + 1)
+            norm = BM25_K1 * (1 - BM25_B)
+            scale = BM25_K1 * BM25_B / avgdl
+            term_scores = {o: weight * tf / (tf + norm + scale * lengths[o]) for o, tf in plist.items()}
+            if not scores:
+                scores = term_scores
+            else:
+                if len(term_scores) > len(scores):
+                    scores, term_scores = term_scores, scores
+                get = scores.get
+                scores.update({o: s + get(o, 0.0) for o, s in term_scores.items()})
+        if required is not None:
+            scores = {o: s for o, s in scores.items() if o in required}
+        return scores
+
+    def _prefix_ordinals(self, path, prefix):
+        postings = self.postings.get(path)
+        if not postings:
+            return set()
+        vocab = self._vocab.get(path)
+        if vocab is None:
+            vocab = self._vocab[path] = sorted(postings)
+        ids = set()
+        start = bisect.bisect_left(vocab, prefix)
+        for token in itertools.islice(vocab, start, start + MAX_EXPANSIONS):
+            if not token.startswith(prefix):
+                break
+            plist = postings.get(token)
+            if plist:
+                ids.update(plist)
+        return ids
+
+    def _term_ids(self, field, value):
+        resolved = self.mapping.resolve(field)
+        if resolved is None:
+            return set()
+        ftype = self.mapping.types[resolved]
+        if ftype in TEXT_TYPES:
+            plist = self.postings.get(self.mapping.paths[resolved], {}).get(str(value))
+            return set(plist) if plist else set()
+        try:
+            value = _normalize(ftype, value)
+        except MappingError as exc:
+            raise UnsupportedQuery(str(exc))
+        if resolved in self.keywords:
+            return self.keywords[resolved].get(value, set())
+        if resolved in self.sorted:
+            ordered = self.sorted[resolved]
+            lo = bisect.bisect_left(ordered, (value,))
+            hi = bisect.bisect_left(ordered, (value, math.inf))
+            return {o for _, o in ordered[lo:hi]}
+        return {o for o, doc in self.by_ord.items() if value in _values(doc.values.get(resolved))}
+
+    def _range_ids(self, field, bounds):
+        resolved = self.mapping.resolve(field)
+        if resolved is None:
+            return set()
+        ftype = self.mapping.types[resolved]
+        limits = {}
+        for op in ("gt", "gte", "lt", "lte"):
+            if bounds.get(op) is not None:
+                try:
+                    limits[op] = _normalize(ftype, bounds[op])
+                except MappingError as exc:
+                    raise UnsupportedQuery(str(exc))
+        if resolved in self.sorted:
+            ordered = self.sorted[resolved]
+            lo, hi = 0, len(ordered)
+            if "gte" in limits:
+                lo = max(lo, bisect.bisect_left(ordered, (limits["gte"],)))
+            if "gt" in limits:
+                lo = max(lo, bisect.bisect_left(ordered, (limits["gt"], math.inf)))
+            if "lte" in limits:
+                hi = min(hi, bisect.bisect_left(ordered, (limits["lte"], math.inf)))
+            if "lt" in limits:
+                hi = min(hi, bisect.bisect_left(ordered, (limits["lt"],)))
+            return {o for _, o in ordered[lo:hi]} if lo < hi else set()
+
+        def within(v):
+            return (
+                ("gt" not in limits or v > limits["gt"]) and ("gte" not in limits or v >= limits["gte"])
+                and ("lt" not in limits or v < limits["lt"]) and ("lte" not in limits or v <= limits["lte"])
+            )
+
+        if resolved in self.keywords:
+            ids = set()
+            for value, members in self.keywords[resolved].items():
+                if within(value):
+                    ids |= members
+            return ids
+        return {o for o, doc in self.by_ord.items() if any(within(v) for v in _values(doc.values.get(resolved)))}
+
+    # Sorting
+
+    def sort_specs(self, sort, implicit_tiebreaker=False):
+        """Normalize a sort clause into (field, descending, missing_first) tuples; None for relevance order."""
+        if not sort:
+            specs = []
+        else:
+            specs = []
+            for item in _clauses(sort):
+                if isinstance(item, str):
+                    field, options = item, {}
+                else:
+                    field, options = next(iter(item.items()))
+                    if isinstance(options, str):
+                        options = {"order": options}
+                default = "desc" if field == "_score" else "asc"
+                order = options.get("order", default)
+                missing = options.get("missing", "_last")
+                if missing not in ("_last", "_first"):
+                    raise UnsupportedQuery("only _last and _first are supported for missing")
+                if field not in ("_score", "_doc", "_shard_doc"):
+                    resolved = self.mapping.resolve(field)
+                    if resolved is not None and self.mapping.types[resolved] in TEXT_TYPES:
+                        raise UnsupportedQuery(f"cannot sort on text field [{field}]; use a keyword subfield")
+                    field = resolved or field
+                specs.append((field, order == "desc", missing == "_first"))
+        if implicit_tiebreaker and not any(f in ("_doc", "_shard_doc") for f, _, _ in specs):
+            specs.append(("_shard_doc", False, False))
+        if not specs or specs == [("_score", True, False)]:
+            return None
+        return specs
+
+    def _sort_value(self, o, field, descending, scores):
+        if field == "_score":
+            return scores if isinstance(scores, float) else scores.get(o, 0.0)
+        if field in ("_doc", "_shard_doc"):
+            return o
+        value = self.by_ord[o].values.get(field)
+        if isinstance(value, list):
+            if not value:
+                return None
+            return max(value) if descending else min(value)
+        if isinstance(value, bool):
+            return int(value)
+        return value
+
+    def _sort_key(self, specs, scores):
+        def key(o):
+            parts = []
+            for field, descending, missing_first in specs:
+                v = self._sort_value(o, field, descending, scores)
+                parts.append(_key_part(v, descending, missing_first))
+            return tuple(parts)
+        return key
+
+    def _after_key(self, specs, after):
+        if not isinstance(after, list) or len(after) != len(specs):
+            raise UnsupportedQuery(f"search_after has {len(after) if isinstance(after, list) else 0} values but sort has {len(specs)}")
+        return tuple(_key_part(v, descending, missing_first) for v, (_, descending, missing_first) in zip(after, specs))
+
+    def _in_index_order(self, ids, k):
+        if ids is None:
+            return list(itertools.islice(self.by_ord, k))
+        if k * len(self.by_ord) < len(ids) ** 2:
+            return list(itertools.islice((o for o in self.by_ord if o in ids), k))
+        return heapq.nsmallest(k, ids)
+
+    def _walk_sorted(self, field, descending, ids, k, key, by_ordinal=False):
+        # Walk the sorted (value, ordinal) list for the primary sort field.
+        # Ties are visited in ascending ordinal, so when the rest of the sort
+        # is index order (``by_ordinal``) the walk stops at the k-th
+        # document; otherwise ties on the k-th value are collected too and
+        # then ordered by the full key. Documents without the field sort last.
+        ordered = self.sorted[field]
+        seen = set()
+        picked = []
+        boundary = None
+        for value, o in (_descending_runs(ordered) if descending else ordered):
+            if o in seen or (ids is not None and o not in ids):
+                continue
+            if len(picked) >= k and value != boundary:
+                break
+            seen.add(o)
+            picked.append(o)
+            if len(picked) == k:
+                if by_ordinal:
+                    return picked
+                boundary = value
+        if len(picked) < k:
+            rest = (o for o in (self.by_ord if ids is None else ids) if o not in seen)
+            picked.extend(heapq.nsmallest(k - len(picked), rest, key=key))
+        return heapq.nsmallest(k, picked, key=key)
+
+    def select(self, ids, scores, specs, k, search_after=None):
+        """The first ``k`` ordinals of ``ids`` in sort order (relevance, then index order, when ``specs`` is None)."""
+        if k <= 0 or self._count(ids) == 0:
+            return []
+        if specs is None:
+            if search_after is not None:
+                raise UnsupportedQuery("search_after needs an explicit sort")
+            if isinstance(scores, float):
+                return self._in_index_order(ids, k)
+            pool = scores if ids is None else {o: scores.get(o, 0.0) for o in ids}
+            if len(pool) > k:
+                # The k-th best score bounds the candidates; only they need the full (score, ordinal) sort.
+                threshold = heapq.nlargest(k, pool.values())[-1]
+                pool = [o for o, score in pool.items() if score >= threshold]
+            return sorted(pool, key=lambda o: (-scores.get(o, 0.0), o))[:k]
+        key = self._sort_key(specs, scores)
+        candidates = self.by_ord if ids is None else ids
+        if search_after is not None:
+            after = self._after_key(specs, search_after)
+            keyed = ((key(o), o) for o in candidates)
+            return [o for _, o in heapq.nsmallest(k, ((kv, o) for kv, o in keyed if kv > after), key=lambda pair: pair[0])]
+        field, descending, missing_first = specs[0]
+        if field in self.sorted and not missing_first and (ids is None or k * len(self.by_ord) < len(ids) ** 2):
+            by_ordinal = all(f in ("_doc", "_shard_doc") and not d for f, d, _ in specs[1:])
+            return self._walk_sorted(field, descending, ids, k, key, by_ordinal)
+        return heapq.nsmallest(k, candidates, key=key)
+
+    def sort_values(self, o, specs, scores):
+        return [self._sort_value(o, field, descending, scores) for field, descending, _ in specs]
+
+    # Aggregations
+
+    def aggregate(self, aggs, ids):
+        results = {}
+        for name, spec in aggs.items():
+            sub = spec.get("aggs") or spec.get("aggregations")
+            kinds = [k for k in spec if k not in ("aggs", "aggregations", "meta")]
+            if len(kinds) != 1:
+                raise UnsupportedQuery(f"aggregation [{name}] must have exactly one type")
+            kind = kinds[0]
+            handler = getattr(self, f"_agg_{kind}", None)
+            if handler is None:
+                raise UnsupportedQuery(f"aggregation [{kind}] is not supported by the in-memory search backend")
+            results[name] = handler(spec[kind], ids, sub)
+        return results
+
+    def _bucket(self, bucket, ids, sub):
+        bucket["doc_count"] = self._count(ids)
+        if sub:
+            bucket.update(self.aggregate(sub, ids))
+        return bucket
+
+    def _field_values(self, field, ids):
+        resolved = self.mapping.resolve(field) or field
+        for o in (self.by_ord if ids is None else ids):
+            value = self.by_ord[o].values.get(resolved)
+            if value is None:
+                continue
+            if isinstance(value, list):
+                for v in value:
+                    yield o, v
+            else:
+                yield o, value
+
+    def _agg_filter(self, spec, ids, sub):
+        return self._bucket({}, _and(ids, self.matching(spec)), sub)
+
+    def _agg_terms(self, spec, ids, sub):
+        field = self.mapping.resolve(spec["field"]) or spec["field"]
+        size = int(spec.get("size", 10))
+        members = {}
+        if field in self.keywords:
+            for value, postings in self.keywords[field].items():
+                matched = postings if ids is None else _and(ids, postings)
+                if matched:
+                    members[value] = matched
+        else:
+            for o, value in self._field_values(field, ids):
+                members.setdefault(value, set()).add(o)
+        ranked = sorted(members.items(), key=lambda item: (-len(item[1]), item[0]))
+        buckets = []
+        for value, matched in ranked[:size]:
+            if isinstance(value, bool):
+                bucket = {"key": int(value), "key_as_string": "true" if value else "false"}
+            else:
+                bucket = {"key": value}
+            buckets.append(self._bucket(bucket, matched, sub))
+        other = sum(len(matched) for _, matched in ranked[size:])
+        return {"doc_count_error_upper_bound": 0, "sum_other_doc_count": other, "buckets": buckets}
+
+    def _agg_range(self, spec, ids, sub):
+        ranges = spec.get("ranges", [])
+        field = self.mapping.resolve(spec["field"]) or spec["field"]
+        if ids is None and field in self.sorted:
+            # Over every document each bucket is just a slice of the sorted index.
+            members = [self._range_ids(field, {"gte": r.get("from"), "lt": r.get("to")}) for r in ranges]
+        else:
+            pairs = list(self._field_values(field, ids))
+            members = [
+                {o for o, v in pairs if (low is None or v >= low) and (high is None or v < high)}
+                for low, high in ((r.get("from"), r.get("to")) for r in ranges)
+            ]
+        buckets = []
+        for r, matched in zip(ranges, members):
+            low = "*" if r.get("from") is None else float(r["from"])
+            high = "*" if r.get("to") is None else float(r["to"])
+            bucket = {"key": r.get("key", f"{low}-{high}")}
+            if r.get("from") is not None:
+                bucket["from"] = float(r["from"])
+            if r.get("to") is not None:
+                bucket["to"] = float(r["to"])
+            buckets.append(self._bucket(bucket, matched, sub))
+        return {"buckets": buckets}
+
+    def _agg_histogram(self, spec, ids, sub):
+        interval = float(spec["interval"])
+        if interval <= 0:
+            raise UnsupportedQuery("histogram interval must be positive")
+        offset = float(spec.get("offset", 0))
+        min_doc_count = int(spec.get("min_doc_count", 0))
+        members = {}
+        for o, value in self._field_values(spec["field"], ids):
+            key = math.floor((value - offset) / interval) * interval + offset
+            members.setdefault(key, set()).add(o)
+        if min_doc_count == 0 and members:
+            if (max(members) - min(members)) / interval > MAX_BUCKETS:
+                raise UnsupportedQuery(f"histogram would create more than {MAX_BUCKETS} buckets")
+            key = min(members)
+            while key < max(members):
+                key += interval
+                members.setdefault(key, set())
+        return {"buckets": [
+            self._bucket({"key": key}, matched, sub)
+            for key, matched in sorted(members.items())
+            if len(matched) >= min_doc_count
+        ]}
+
+    def _metric(self, spec, ids):
+        return [v for _, v in self._field_values(spec["field"], ids) if not isinstance(v, str)]
+
+    def _agg_min(self, spec, ids, sub):
+        values = self._metric(spec, ids)
+        return {"value": float(min(values)) if values else None}
+
+    def _agg_max(self, spec, ids, sub):
+        values = self._metric(spec, ids)
+        return {"value": float(max(values)) if values else None}
+
+    def _agg_sum(self, spec, ids, sub):
+        return {"value": float(sum(self._metric(spec, ids)))}
+
+    def _agg_avg(self, spec, ids, sub):
+        values = self._metric(spec, ids)
+        return {"value": sum(values) / len(values) if values else None}
+
+    def _agg_value_count(self, spec, ids, sub):
+        return {"value": sum(1 for _ in self._field_values(spec["field"], ids))}
+
+    # Highlighting
+
+    def highlight(self, doc, spec, terms):
+        pre = (spec.get("pre_tags") or ["<em>"])[0]
+        post = (spec.get("post_tags") or ["</em>"])[0]
+        result = {}
+        for field, options in (spec.get("fields") or {}).items():
+            options = dict(spec, **(options or {}))
+            raw = get_path(doc.source, self.mapping.paths.get(field, field))
+            if not isinstance(raw, str):
+                continue
+            fragments = _fragments(
+                raw, terms, int(options.get("fragment_size", 100)), int(options.get("number_of_fragments", 5)),
+                int(options.get("no_match_size", 0)), pre, post,
+            )
+            if fragments:
+                result[field] = fragments
+        return result
+
+
+def _key_part(value, descending, missing_first):
+    if value is None:
+        return (0 if missing_first else 2, 0)
+    if descending:
+        value = -value if isinstance(value, (int, float)) else _Desc(value)
+    return (1, value)
+
+
+def _flat(settings, prefix=""):
+    flat = {}
+    for key, value in settings.items():
+        if isinstance(value, dict):
+            flat.update(_flat(value, f"{prefix}{key}."))
+        else:
+            flat[prefix + key] = value
+    return flat
+
+
+def query_terms(query):
+    """Analyzed tokens of every full-text clause in ``query``, for highlighting."""
+    terms = set()
+    if isinstance(query, dict):
+        for kind, spec in query.items():
+            if kind == "multi_match" and isinstance(spec, dict):
+                terms.update(analyze(spec.get("query", "")))
+            elif kind == "match" and isinstance(spec, dict):
+                for value in spec.values():
+                    terms.update(analyze(value.get("query", "") if isinstance(value, dict) else value))
+            else:
+                terms.update(query_terms(spec))
+    elif isinstance(query, list):
+        for clause in query:
+            terms.update(query_terms(clause))
+    return terms
+
+
+def _fragments(text, terms, fragment_size, number_of_fragments, no_match_size, pre, post):
+    matches = [m for m in TOKEN_RE.finditer(text) if m.group().lower() in terms] if terms else []
+    if not matches:
+        if no_match_size <= 0:
+            return []
+        excerpt = text[:no_match_size]
+        if len(text) > no_match_size and " " in excerpt:
+            excerpt = excerpt[: excerpt.rfind(" ")]
+        return [excerpt]
+    if number_of_fragments == 0:
+        return [_tag(text, 0, len(text), matches, pre, post)]
+    fragments = []
+    end = -1
+    for match in matches:
+        if match.start() < end:
+            continue
+        start = text.rfind(" ", 0, max(match.start() - fragment_size // 4, 0)) + 1
+        end = start + fragment_size
+        if end < len(text):
+            space = text.rfind(" ", match.end(), end)
+            end = space if space > match.end() else max(end, match.end())
+        else:
+            end = len(text)
+        fragments.append(_tag(text, start, end, matches, pre, post))
+        if len(fragments) >= number_of_fragments:
+            break
+    return fragments
+
+
+def _tag(text, start, end, matches, pre, post):
+    parts = []
+    position = start
+    for match in matches:
+        if match.start() < start or match.end() > end:
+            continue
+        parts.append(text[position:match.start()])
+        parts.append(f"{pre}{match.group()}{post}")
+        position = match.end()
+    parts.append(text[position:end])
+    return "".join(parts).strip()
@@ -0,0 +1,232 @@
+# In-process request metrics: per-endpoint latency histograms, per-request
+# phase timings (JWT, validation, Elasticsearch, rendering) reported in a
+# Server-Timing header, a Prometheus text endpoint and an opt-in slow
+# request log. Timings for the current request live in a ContextVar so the
+# same code works for sync and async views.
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+
+slow_logger = logging.getLogger("api.slow_requests")
+
+_current = ContextVar("api_request_timings", default=None)
+
+# The slow log keeps query bodies only. Document bodies (index, update,
+# bulk, ...) can carry password hashes or whole catalogs, and nothing sent
+# to the users or tokens indices is logged at all; the call is listed with
+# its endpoint and no body.
+LOGGED_BODY_ENDPOINTS = frozenset({"search", "count", "msearch", "delete_by_query", "update_by_query", "explain"})
+PRIVATE_INDICES = ("users", "tokens")
+SENSITIVE_KEYS = frozenset({"password", "password_hash", "token", "access", "refresh", "jti"})
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels, in the Prometheus data model."""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: dict(s, counts=list(s["counts"])) for key, s in self._series.items()}
+        for key, s in sorted(series.items()):
+            labels = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(self.label_names, key))
+            sep = "," if labels else ""
+            for bound, count in zip(self.buckets, s["counts"]):
+                lines.append(f'{self.name}_bucket{{{labels}{sep}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{labels}{sep}le="+Inf"}} {s["count"]}')
+            lines.append(f"{self.name}_sum{{{labels}}} {s['sum']:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {s['count']}")
+        return lines
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_buckets = settings.METRICS_BUCKETS
+
+REQUEST_DURATION = Histogram(
+    "api_request_duration_seconds", "Wall time per API request.", ("method", "route", "status"), _buckets
+)
+REQUEST_ES_CALLS = Histogram(
+    "api_request_es_calls", "Elasticsearch calls made per API request.", ("route",), (0, 1, 2, 3, 5, 10, 25)
+)
+PHASE_DURATION = Histogram(
+    "api_request_phase_seconds", "Time spent per request phase (jwt, validate, es, render, compress).", ("route", "phase"), _buckets
+)
+ES_DURATION = Histogram(
+    "es_request_duration_seconds", "Client-side wall time per Elasticsearch call.", ("endpoint", "status"), _buckets
+)
+ES_TOOK = Histogram(
+    "es_request_took_seconds", "Server-side 'took' reported by Elasticsearch.", ("endpoint",), _buckets
+)
+
+HISTOGRAMS = [REQUEST_DURATION, REQUEST_ES_CALLS, PHASE_DURATION, ES_DURATION, ES_TOOK]
+
+
+class RequestTimings:
+    __slots__ = ("started", "phases", "es_calls", "es_wall", "es_took", "es_bodies")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.es_calls = 0
+        self.es_wall = 0.0
+        self.es_took = 0.0
+        self.es_bodies = []
+
+    def add_phase(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+
+def current_timings():
+    return _current.get()
+
+
+@contextmanager
+def phase(name):
+    """Attribute the enclosed block's wall time to ``name`` for the current request."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add_phase(name, time.perf_counter() - start)
+
+
+def _private_index(index):
+    private = set(PRIVATE_INDICES) | {settings.TOKEN_STORE["INDEX"]}
+    names = index.split(",") if isinstance(index, str) else list(index or ())
+    return any(n == p or n.startswith(f"{p}_v") for n in names for p in private)
+
+
+def _loggable_body(endpoint, index, body):
+    if body is None or endpoint not in LOGGED_BODY_ENDPOINTS or _private_index(index):
+        return None
+    return body
+
+
+def _redact(value):
+    if isinstance(value, dict):
+        return {k: "[redacted]" if k in SENSITIVE_KEYS else _redact(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_redact(v) for v in value]
+    return value
+
+
+def record_es_call(endpoint, seconds, status, took_ms=None, body=None, index=None):
+    ES_DURATION.observe(seconds, endpoint=endpoint or "unknown", status=status)
+    if took_ms is not None:
+        ES_TOOK.observe(took_ms / 1000.0, endpoint=endpoint or "unknown")
+    timings = _current.get()
+    if timings is None:
+        return
+    timings.es_calls += 1
+    timings.es_wall += seconds
+    if took_ms is not None:
+        timings.es_took += took_ms / 1000.0
+    if settings.SLOW_REQUEST_LOG_MS and len(timings.es_bodies) < 20:
+        # Keep a reference only; it is serialized if the request turns out slow.
+        timings.es_bodies.append((endpoint, _loggable_body(endpoint, index, body)))
+
+
+def start_request():
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def finish_request(request, response, timings, token):
+    _current.reset(token)
+    elapsed = time.perf_counter() - timings.started
+    match = getattr(request, "resolver_match", None)
+    route = match.route if match is not None and match.route else "unmatched"
+    REQUEST_DURATION.observe(elapsed, method=request.method, route=route, status=response.status_code)
+    REQUEST_ES_CALLS.observe(timings.es_calls, route=route)
+    if timings.es_calls:
+        PHASE_DURATION.observe(timings.es_wall, route=route, phase="es")
+    for name, seconds in timings.phases.items():
+        PHASE_DURATION.observe(seconds, route=route, phase=name)
+
+    if settings.METRICS_SERVER_TIMING:
+        response["Server-Timing"] = server_timing_header(elapsed, timings)
+    threshold = settings.SLOW_REQUEST_LOG_MS
+    if threshold and elapsed * 1000 >= threshold:
+        log_slow_request(request, response, route, elapsed, timings)
+    return response
+
+
+def server_timing_header(elapsed, timings):
+    entries = [f"total;dur={elapsed * 1000:.1f}"]
+    if timings.es_calls:
+        entries.append(f'es;dur={timings.es_wall * 1000:.1f};desc="{timings.es_calls} calls"')
+        entries.append(f"es_took;dur={timings.es_took * 1000:.1f}")
+    for name, seconds in timings.phases.items():
+        entries.append(f"{name};dur={seconds * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def log_slow_request(request, response, route, elapsed, timings):
+    queries = []
+    for endpoint, body in timings.es_bodies:
+        if body is None:
+            queries.append({"endpoint": endpoint})
+            continue
+        try:
+            text = json.dumps(_redact(body), default=str)
+        except (TypeError, ValueError):
+            text = "[unserializable body]"
+        queries.append({"endpoint": endpoint, "body": text[:settings.SLOW_REQUEST_LOG_BODY_CHARS]})
+    slow_logger.warning("slow request %s", json.dumps({
+        "method": request.method,
+        "path": request.get_full_path(),
+        "route": route,
+        "status": response.status_code,
+        "duration_ms": round(elapsed * 1000, 1),
+        "es_calls": timings.es_calls,
+        "es_ms": round(timings.es_wall * 1000, 1),
+        "es_took_ms": round(timings.es_took * 1000, 1),
+        "phases_ms": {k: round(v * 1000, 1) for k, v in timings.phases.items()},
+        "es_queries": queries,
+    }))
+
+
+def render_prometheus():
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.expose())
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics():
+    for histogram in HISTOGRAMS:
+        histogram.clear()
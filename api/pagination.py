@@ -0,0 +1,127 @@
+import base64
+import hashlib
+import json
+from elasticsearch import BadRequestError, NotFoundError
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def parse_page_params(params, default_size=10):
+    try:
+        page = int(params.get("page", 1))
+    except Exception:
+        page = 1
+    try:
+        size = int(params.get("size", default_size))
+    except Exception:
+        size = default_size
+    if page < 1:
+        page = 1
+    if size < 1:
+        size = default_size
+    return page, size
+
+
+def parse_track_total(value, default=True):
+    """
+    Map the ``track_total`` query parameter onto ``track_total_hits``:
+    ``true`` counts exactly, ``false`` skips counting and an integer caps the
+    count (Elasticsearch then reports ``gte`` once the cap is reached).
+    """
+    if value is None or value == "":
+        return default
+    value = str(value).lower()
+    if value in ("1", "true", "yes"):
+        return True
+    if value in ("0", "false", "no"):
+        return False
+    try:
+        cap = int(value)
+    except ValueError:
+        return default
+    return cap if cap > 0 else False
+
+
+def read_total(res):
+    """Return (total, relation) from a search response; (None, None) when not tracked."""
+    total = res.get("hits", {}).get("total")
+    if total is None:
+        return None, None
+    if isinstance(total, int):
+        return total, "eq"
+    return total.get("value", 0), total.get("relation", "eq")
+
+
+def encode_cursor(state):
+    raw = json.dumps(state, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception as exc:
+        raise InvalidCursor("invalid cursor") from exc
+    if not isinstance(state, dict) or "pit" not in state:
+        raise InvalidCursor("invalid cursor")
+    return state
+
+
+def is_cursor_start(token):
+    return token in ("", "*", "start")
+
+
+def query_fingerprint(body):
+    """Digest of the query and sort a cursor was issued for."""
+    raw = json.dumps({"query": body.get("query"), "sort": body.get("sort")}, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def search_pit_page(es, index, body, cursor, size, keep_alive):
+    """
+    Run one page of a point-in-time + search_after walk over ``index``.
+    A start token opens the point-in-time; later tokens carry its id, the
+    last hit's sort values and a fingerprint of the query and sort, since
+    the sort values only make sense for the search that produced them.
+    Returns (response, next_cursor), or (None, None) when the index does not
+    exist; raises InvalidCursor for malformed or expired cursors and for
+    cursors replayed with another query or sort.
+    """
+    body = dict(body, size=size)
+    fingerprint = query_fingerprint(body)
+    if is_cursor_start(cursor):
+        try:
+            pit_id = es.open_point_in_time(index=index, keep_alive=keep_alive)["id"]
+        except NotFoundError:
+            return None, None
+    else:
+        state = decode_cursor(cursor)
+        if state.get("query") != fingerprint:
+            raise InvalidCursor("cursor was issued for a different query or sort; start again with cursor=*")
+        pit_id = state["pit"]
+        if state.get("after"):
+            body["search_after"] = state["after"]
+        # Counting is only worth doing once, on the first page.
+        body["track_total_hits"] = False
+    body["pit"] = {"id": pit_id, "keep_alive": keep_alive}
+    try:
+        res = es.search(body=body)
+    except NotFoundError as exc:
+        raise InvalidCursor("cursor expired") from exc
+    except BadRequestError as exc:
+        if "search_after" not in body:
+            raise
+        raise InvalidCursor("invalid cursor") from exc
+
+    hits = res.get("hits", {}).get("hits", [])
+    pit_id = res.get("pit_id", pit_id)
+    if len(hits) == size:
+        return res, encode_cursor({"pit": pit_id, "after": hits[-1]["sort"], "query": fingerprint})
+    try:
+        es.close_point_in_time(id=pit_id)
+    except Exception:
+        pass
+    return res, None
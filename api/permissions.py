@@ -1,16 +1,29 @@
 from rest_framework.permissions import BasePermission
 from rest_framework.request import Request
+from .metrics import phase
 from .simplejwt_auth import decode_and_validate_token
 
+def jwt_payload_from_request(request):
+    """
+    Return the verified JWT payload for ``request`` (DRF or plain Django), or
+    None. The payload is attached to the underlying HttpRequest, so repeated
+    checks within one request reuse the first decode.
+    """
+    payload = getattr(request, "user_payload", None)
+    if payload is not None:
+        return payload
+    auth = request.headers.get("Authorization")
+    if not auth or not auth.startswith("Bearer "):
+        return None
+    token = auth.split(" ", 1)[1]
+    try:
+        with phase("jwt"):
+            payload = decode_and_validate_token(token)
+    except Exception:
+        return None
+    getattr(request, "_request", request).user_payload = payload
+    return payload
+
 class IsAuthenticatedFromJWT(BasePermission):
     def has_permission(self, request: Request, view):
-        auth = request.headers.get("Authorization")
-        if not auth or not auth.startswith("Bearer "):
-            return False
-        token = auth.split(" ", 1)[1]
-        try:
-            payload = decode_and_validate_token(token)
-            request.user_payload = payload
-            return True
-        except Exception:
-            return False
+        return jwt_payload_from_request(request) is not None
@@ -0,0 +1,215 @@
+import csv
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from django.conf import settings
+from elasticsearch import helpers
+from .product_serializers import ProductSerializer
+
+BULK_FORMATS = ("ndjson", "csv")
+
+
+def detect_format(fmt=None, content_type=None, filename=None):
+    if fmt:
+        fmt = fmt.lower()
+        return "ndjson" if fmt in ("json", "jsonl") else fmt
+    if content_type and "csv" in content_type:
+        return "csv"
+    if filename and filename.lower().endswith(".csv"):
+        return "csv"
+    return "ndjson"
+
+
+def _decode_lines(lines):
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        yield line
+
+
+def iter_ndjson_rows(lines):
+    """Yield (row_number, data, error) for every non-blank NDJSON line."""
+    row = 0
+    for line in _decode_lines(lines):
+        line = line.strip()
+        if not line:
+            continue
+        row += 1
+        try:
+            data = json.loads(line)
+        except ValueError as exc:
+            yield row, None, {"non_field_errors": [f"invalid JSON: {exc}"]}
+            continue
+        if not isinstance(data, dict):
+            yield row, None, {"non_field_errors": ["expected a JSON object"]}
+            continue
+        yield row, data, None
+
+
+def iter_csv_rows(lines):
+    """Yield (row_number, data, error) for every CSV record after the header."""
+    reader = csv.DictReader(_decode_lines(lines))
+    for row, record in enumerate(reader, start=1):
+        # Empty cells mean "not provided"; tags are pipe separated.
+        data = {k: v for k, v in record.items() if k and v not in (None, "")}
+        if "tags" in data:
+            data["tags"] = [t.strip() for t in data["tags"].split("|") if t.strip()]
+        yield row, data, None
+
+
+def iter_rows(lines, fmt):
+    if fmt == "csv":
+        return iter_csv_rows(lines)
+    return iter_ndjson_rows(lines)
+
+
+class BulkReport:
+    def __init__(self, max_errors=None):
+        self.max_errors = settings.PRODUCT_BULK_MAX_ERRORS if max_errors is None else max_errors
+        self.total_rows = 0
+        self.indexed = 0
+        self.failed = 0
+        self.errors = []
+        self.errors_truncated = False
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        # Validation errors are recorded from the bulk helper's feeder thread.
+        self._lock = threading.Lock()
+
+    def add_error(self, row, errors, doc_id=None):
+        with self._lock:
+            self.failed += 1
+            if len(self.errors) >= self.max_errors:
+                self.errors_truncated = True
+                return
+            entry = {"row": row, "errors": errors}
+            if doc_id:
+                entry["id"] = doc_id
+            self.errors.append(entry)
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+        self.errors.sort(key=lambda e: e["row"])
+        return self
+
+    @property
+    def docs_per_sec(self):
+        return round(self.indexed / self.elapsed, 1) if self.elapsed > 0 else 0.0
+
+    def as_dict(self):
+        return {
+            "total_rows": self.total_rows,
+            "indexed": self.indexed,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.errors_truncated,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "docs_per_sec": self.docs_per_sec,
+        }
+
+
+def _validated_actions(rows, index, report, pending, batch_size):
+    """
+    Validate rows with ProductSerializer a batch at a time and yield bulk
+    actions. Only the current batch is held in memory; ``pending`` keeps
+    (id, row) for documents that have been handed to the bulk helper and
+    not yet acknowledged.
+    """
+    batch = []
+
+    def flush():
+        now = datetime.utcnow().isoformat()
+        for row, data in batch:
+            serializer = ProductSerializer(data=data)
+            if not serializer.is_valid():
+                report.add_error(row, serializer.errors)
+                continue
+            doc = dict(serializer.validated_data)
+            doc_id = str(data.get("id") or uuid.uuid4())
+            doc["id"] = doc_id
+            doc.setdefault("created_at", now)
+            # Rows may overwrite existing products; reindex catch-up finds them by updated_at.
+            doc["updated_at"] = now
+            pending.append((doc_id, row))
+            yield {"_index": index, "_id": doc_id, "_source": doc}
+        batch.clear()
+
+    for row, data, error in rows:
+        report.total_rows += 1
+        if error:
+            report.add_error(row, error)
+            continue
+        batch.append((row, data))
+        if len(batch) >= batch_size:
+            yield from flush()
+    yield from flush()
+
+
+def bulk_index_products(es, rows, index, chunk_size=None, max_chunk_bytes=None, thread_count=None, queue_size=None,
+                        **write_kwargs):
+    """
+    Stream validated product rows into Elasticsearch through ``_bulk``.
+    Chunks are cut by document count and byte size and sent from a bounded
+    thread pool, so memory stays proportional to the in-flight chunks rather
+    than to the input size. Returns a finished :class:`BulkReport`.
+    """
+    chunk_size = chunk_size or settings.PRODUCT_BULK_CHUNK_SIZE
+    max_chunk_bytes = max_chunk_bytes or settings.PRODUCT_BULK_MAX_CHUNK_BYTES
+    thread_count = thread_count or settings.PRODUCT_BULK_THREADS
+    queue_size = queue_size or settings.PRODUCT_BULK_QUEUE_SIZE
+
+    report = BulkReport()
+    pending = deque()
+    actions = _validated_actions(rows, index, report, pending, chunk_size)
+    results = helpers.parallel_bulk(
+        es,
+        actions,
+        thread_count=thread_count,
+        chunk_size=chunk_size,
+        max_chunk_bytes=max_chunk_bytes,
+        queue_size=queue_size,
+        raise_on_error=False,
+        raise_on_exception=False,
+        **write_kwargs,
+    )
+    # parallel_bulk yields results in submission order, so the oldest pending
+    # entry always belongs to the result at hand.
+    for ok, item in results:
+        doc_id, row = pending.popleft()
+        if ok:
+            report.indexed += 1
+            continue
+        info = next(iter(item.values()), {})
+        error = info.get("error")
+        if isinstance(error, dict):
+            error = f"{error.get('type')}: {error.get('reason')}"
+        report.add_error(row, {"non_field_errors": [str(error)]}, doc_id=doc_id)
+    return report.finish()
+
+
+def bulk_delete_products(es, ids, index, chunk_size=None, **write_kwargs):
+    """
+    Delete ``ids`` through ``_bulk`` and report what happened to each.
+    Missing documents are listed separately from real failures.
+    """
+    chunk_size = chunk_size or settings.PRODUCT_BULK_CHUNK_SIZE
+    summary = {"deleted": 0, "not_found": [], "failed": 0, "errors": []}
+    actions = ({"_op_type": "delete", "_index": index, "_id": pk} for pk in dict.fromkeys(ids))
+    for ok, item in helpers.streaming_bulk(
+        es, actions, chunk_size=chunk_size, raise_on_error=False, raise_on_exception=False, **write_kwargs
+    ):
+        info = item.get("delete", {})
+        if ok:
+            summary["deleted"] += 1
+        elif info.get("status") == 404:
+            summary["not_found"].append(info.get("_id"))
+        else:
+            error = info.get("error")
+            if isinstance(error, dict):
+                error = f"{error.get('type')}: {error.get('reason')}"
+            summary["failed"] += 1
+            summary["errors"].append({"id": info.get("_id"), "error": str(error)})
+    return summary
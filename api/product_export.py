@@ -0,0 +1,149 @@
+# Full-catalog export. Documents are read through a point-in-time with
+# search_after in _shard_doc order (optionally split into slices that are
+# walked in parallel) and serialized row by row, so memory stays flat
+# whatever the size of the catalog.
+import csv
+import io
+import json
+import zlib
+from django.conf import settings
+from elasticsearch import NotFoundError
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+# Same columns (and pipe-separated tags) as the CSV bulk import accepts.
+CSV_FIELDS = [
+    "id", "sku", "name", "description", "price", "category",
+    "in_stock", "stock", "tags", "created_at", "updated_at",
+]
+
+
+def open_export(es, index, keep_alive=None):
+    """Open a point-in-time over ``index``; None when the index does not exist."""
+    keep_alive = keep_alive or settings.PRODUCT_EXPORT_KEEP_ALIVE
+    try:
+        return es.open_point_in_time(index=index, keep_alive=keep_alive)["id"]
+    except NotFoundError:
+        return None
+
+
+def close_export(es, pit_id):
+    try:
+        es.close_point_in_time(id=pit_id)
+    except Exception:
+        pass
+
+
+def iter_export_docs(es, pit_id, body, page_size=None, keep_alive=None, slice_id=None, max_slices=None):
+    """
+    Yield every matching ``_source`` (with ``id``) from an open point-in-time.
+    With ``max_slices`` > 1 only slice ``slice_id`` is walked; each slice is
+    independent, so slices can run on separate threads.
+    """
+    page_size = page_size or settings.PRODUCT_EXPORT_PAGE_SIZE
+    keep_alive = keep_alive or settings.PRODUCT_EXPORT_KEEP_ALIVE
+    body = dict(body, size=page_size, sort=["_shard_doc"], track_total_hits=False)
+    if max_slices and max_slices > 1:
+        body["slice"] = {"id": slice_id, "max": max_slices}
+    after = None
+    while True:
+        page = dict(body, pit={"id": pit_id, "keep_alive": keep_alive})
+        if after is not None:
+            page["search_after"] = after
+        res = es.search(body=page)
+        pit_id = res.get("pit_id", pit_id)
+        hits = res.get("hits", {}).get("hits", [])
+        for hit in hits:
+            source = hit.get("_source") or {}
+            source.setdefault("id", hit["_id"])
+            yield source
+        if len(hits) < page_size:
+            return
+        after = hits[-1]["sort"]
+
+
+def csv_fields(params):
+    """CSV columns for an export: ``fields=`` in order, else CSV_FIELDS minus ``exclude=``."""
+    fields = [f.strip() for f in (params.get("fields") or "").split(",") if f.strip()]
+    if fields:
+        return fields if "id" in fields else ["id"] + fields
+    excludes = {f.strip() for f in (params.get("exclude") or "").split(",")}
+    return [f for f in CSV_FIELDS if f not in excludes]
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (list, tuple)):
+        return "|".join(str(v) for v in value)
+    if isinstance(value, dict):
+        return json.dumps(value, separators=(",", ":"), default=str)
+    return value
+
+
+def row_formatter(fmt, fields=None):
+    """Return (header, format_row) for ``fmt``; header is "" for NDJSON."""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        def format_row(doc):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerow([_csv_value(doc.get(f)) for f in fields])
+            return buffer.getvalue()
+
+        writer.writerow(fields)
+        header = buffer.getvalue()
+        return header, format_row
+
+    def format_ndjson(doc):
+        return json.dumps(doc, separators=(",", ":"), default=str) + "\n"
+
+    return "", format_ndjson
+
+
+def _chunks(header, rows, chunk_bytes):
+    # Gather rows into chunks of roughly ``chunk_bytes`` so the server (and
+    # the compressor) handles a few large writes instead of one per row.
+    pending = [header] if header else []
+    size = len(header)
+    for row in rows:
+        pending.append(row)
+        size += len(row)
+        if size >= chunk_bytes:
+            yield "".join(pending).encode("utf-8")
+            pending = []
+            size = 0
+    if pending:
+        yield "".join(pending).encode("utf-8")
+
+
+def gzip_chunks(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_chunks(es, pit_id, body, fmt, fields=None, compress=False):
+    """
+    Byte chunks for a streaming response over an open point-in-time, which
+    is closed when the stream ends or the client goes away.
+    """
+    try:
+        header, format_row = row_formatter(fmt, fields)
+        rows = (format_row(doc) for doc in iter_export_docs(es, pit_id, body))
+        chunks = _chunks(header, rows, settings.PRODUCT_EXPORT_CHUNK_BYTES)
+        if compress:
+            chunks = gzip_chunks(chunks)
+        yield from chunks
+    finally:
+        close_export(es, pit_id)
@@ -1,6 +1,8 @@
+from django.conf import settings
 from rest_framework import serializers
+from .serializers import TimedSerializer
 
-class ProductSerializer(serializers.Serializer):
+class ProductSerializer(TimedSerializer):
     id = serializers.CharField(read_only=True)
     sku = serializers.CharField(required=True)
     name = serializers.CharField(required=True)
@@ -11,3 +13,51 @@ class ProductSerializer(serializers.Serializer):
     tags = serializers.ListField(child=serializers.CharField(), required=False)
     created_at = serializers.DateTimeField(required=False)
     updated_at = serializers.DateTimeField(required=False)
+    stock = serializers.IntegerField(required=False, min_value=0)
+
+    def validate(self, attrs):
+        # in_stock follows stock, as in STOCK_SCRIPT, whenever stock is written
+        if "stock" in attrs:
+            attrs["in_stock"] = attrs["stock"] > 0
+        return attrs
+
+class StockChangeSerializer(TimedSerializer):
+    delta = serializers.IntegerField(required=False)
+    set = serializers.IntegerField(required=False, min_value=0)
+    allow_negative = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        if ("delta" in attrs) == ("set" in attrs):
+            raise serializers.ValidationError("provide exactly one of delta or set")
+        return attrs
+
+class StockChangeItemSerializer(StockChangeSerializer):
+    id = serializers.CharField()
+
+class BulkStockSerializer(TimedSerializer):
+    updates = serializers.ListField(
+        child=StockChangeItemSerializer(), allow_empty=False, max_length=settings.PRODUCT_STOCK_BULK_MAX
+    )
+
+class DeleteIdsSerializer(TimedSerializer):
+    ids = serializers.ListField(
+        child=serializers.CharField(), allow_empty=False, max_length=settings.PRODUCT_BULK_DELETE_MAX
+    )
+
+class DeleteByQuerySerializer(TimedSerializer):
+    q = serializers.CharField(required=False)
+    category = serializers.CharField(required=False)
+    in_stock = serializers.BooleanField(required=False, allow_null=True, default=None)
+    tags = serializers.CharField(required=False)
+    min_price = serializers.FloatField(required=False)
+    max_price = serializers.FloatField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+    updated_before = serializers.DateTimeField(required=False)
+    slices = serializers.CharField(required=False, default="auto")
+    requests_per_second = serializers.FloatField(required=False, min_value=0)
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate_slices(self, value):
+        if value != "auto" and not (value.isdigit() and int(value) > 0):
+            raise serializers.ValidationError("slices must be a positive integer or 'auto'")
+        return value if value == "auto" else int(value)
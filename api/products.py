@@ -1,157 +1,547 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .product_serializers import ProductSerializer
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from elasticsearch import ConflictError, ConnectionTimeout, NotFoundError
+from .product_serializers import (
+    BulkStockSerializer,
+    DeleteByQuerySerializer,
+    DeleteIdsSerializer,
+    ProductSerializer,
+    StockChangeSerializer,
+)
+from .serializers import MGetSerializer
 from .es_client import get_es_client
+from .compression import accepted_encodings
+from .cache import get_product_search_cache, get_product_suggest_cache, invalidate_product_search
+from .documents import (
+    document_response,
+    fetch_document,
+    invalid_refresh,
+    invalidate_document,
+    mget_response,
+    parse_if_match,
+    precondition_failed,
+    refresh_kwargs,
+    store_document,
+    update_document,
+    write_response,
+)
+from .inventory import InsufficientStock, apply_stock_change, bulk_stock_changes
+from .indices import delete_index, ensure_index
 from .permissions import IsAuthenticatedFromJWT
+from .pagination import InvalidCursor, parse_page_params, parse_track_total, read_total, search_pit_page
+from .product_export import EXPORT_CONTENT_TYPES, EXPORT_FORMATS, csv_fields, export_chunks, open_export
+from .product_bulk import BULK_FORMATS, bulk_delete_products, bulk_index_products, detect_format, iter_rows
+from .tasks import invalidate_when_done, task_handle
+from .write_buffer import WriteBufferFull, get_write_buffer
+from .query_builder import (
+    InvalidQuery,
+    build_product_delete_query,
+    build_product_export_body,
+    build_product_query,
+    build_product_search_body,
+    build_product_suggest_body,
+    product_sort,
+    product_source,
+    read_facets,
+    with_tiebreaker,
+)
+from contextlib import nullcontext
 from datetime import datetime
 import uuid
 import math
 
 PRODUCT_INDEX = "products"
 
-PRODUCT_MAPPING = {
-    "mappings": {
-        "properties": {
-            "id": {"type": "keyword"},
-            "sku": {"type": "keyword"},
-            "name": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
-            "description": {"type": "text"},
-            "price": {"type": "double"},
-            "category": {"type": "keyword"},
-            "in_stock": {"type": "boolean"},
-            "tags": {"type": "keyword"},
-            "created_at": {"type": "date"},
-            "updated_at": {"type": "date"}
-        }
-    }
-}
+# Stable sort for cursor pagination; the point-in-time adds an implicit
+# _shard_doc tiebreaker on top of it.
+PRODUCT_CURSOR_SORT = [
+    {"created_at": {"order": "desc", "missing": "_last"}},
+    {"id": {"order": "asc", "missing": "_last"}},
+]
+
+def _product_writes_flushed(ids):
+    for pk in ids:
+        invalidate_document(PRODUCT_INDEX, pk)
+    invalidate_product_search()
+
+
+def product_write_buffer(write_kwargs, if_match=None):
+    """
+    The product write buffer, when enabled and the request can use it.
+    Writes that must be visible on return (refresh=wait_for) or that are
+    conditional (If-Match) always go straight to the cluster.
+    """
+    if write_kwargs or if_match:
+        return None
+    return get_write_buffer(PRODUCT_INDEX, on_flush=_product_writes_flushed)
+
+
+def buffered_write_response(buffer, pk, source, op="index", code=status.HTTP_202_ACCEPTED):
+    try:
+        buffer.put(pk, source, op=op)
+    except WriteBufferFull:
+        response = Response({"detail": "write buffer is full, retry shortly"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        response["Retry-After"] = "1"
+        return response
+    invalidate_document(PRODUCT_INDEX, pk)
+    return Response({**source, "id": pk}, status=code)
+
 
 class ProductIndexCreateView(APIView):
     permission_classes = [IsAuthenticatedFromJWT]
 
     def post(self, request):
         es = get_es_client()
-        if es.indices.exists(index=PRODUCT_INDEX):
+        target = ensure_index(es, PRODUCT_INDEX)
+        if target is None:
             return Response({"detail": "index already exists"}, status=status.HTTP_400_BAD_REQUEST)
-        es.indices.create(index=PRODUCT_INDEX, body=PRODUCT_MAPPING)
-        return Response({"detail": "index created"}, status=status.HTTP_201_CREATED)
+        invalidate_product_search(searchable=True)
+        return Response({"detail": "index created", "index": target}, status=status.HTTP_201_CREATED)
 
 class ProductIndexDeleteView(APIView):
     permission_classes = [IsAuthenticatedFromJWT]
 
     def delete(self, request):
         es = get_es_client()
-        if not es.indices.exists(index=PRODUCT_INDEX):
+        if not delete_index(es, PRODUCT_INDEX):
             return Response({"detail": "index not found"}, status=status.HTTP_404_NOT_FOUND)
-        es.indices.delete(index=PRODUCT_INDEX)
+        invalidate_product_search(searchable=True)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+def hits_to_items(hits):
+    # Each search response is parsed fresh and the result cache stores the
+    # finished payload, so the hits' _source dicts are used as items as-is
+    # instead of being copied.
+    items = []
+    for h in hits:
+        src = h.get("_source")
+        if src is None:
+            src = {}
+        src["id"] = h.get("_id")
+        items.append(src)
+    return items
+
+def page_payload(res, page, size):
+    hits = res.get("hits", {}).get("hits", [])
+    total_hits, relation = read_total(res)
+    total_pages = math.ceil(total_hits / size) if total_hits is not None and size > 0 else None
+    payload = {
+        "items": hits_to_items(hits),
+        "total": total_hits,
+        "total_relation": relation,
+        "page": page,
+        "size": size,
+        "total_pages": total_pages
+    }
+    if "aggregations" in res:
+        payload["facets"] = read_facets(res)
+    return payload
+
+def search_cache_lookup(body, from_, size):
+    """Return (cache, key) for a page-mode search; (None, None) when caching is off."""
+    cache = get_product_search_cache()
+    if cache is None:
+        return None, None
+    return cache, cache.make_key({"index": PRODUCT_INDEX, "body": body, "from": from_, "size": size})
+
 class ProductListCreateView(APIView):
     permission_classes = [IsAuthenticatedFromJWT]
 
     def get(self, request):
         es = get_es_client()
         params = request.query_params
-        try:
-            page = int(params.get("page", 1))
-        except Exception:
-            page = 1
-        try:
-            size = int(params.get("size", 10))
-        except Exception:
-            size = 10
-        if page < 1:
-            page = 1
-        if size < 1:
-            size = 10
-
-        q_text = params.get("q")
-        category = params.get("category")
-        in_stock = params.get("in_stock")
-
-        must_clauses = []
-        if q_text:
-            must_clauses.append({
-                "multi_match": {
-                    "query": q_text,
-                    "fields": ["name^2", "description"]
-                }
-            })
-        if category:
-            must_clauses.append({"term": {"category": category}})
-        if in_stock is not None:
-            val = str(in_stock).lower() in ("1", "true", "yes")
-            must_clauses.append({"term": {"in_stock": val}})
-
-        if must_clauses:
-            body = {"query": {"bool": {"must": must_clauses}}}
-        else:
-            body = {"query": {"match_all": {}}}
+        track_total = parse_track_total(params.get("track_total"), settings.PRODUCT_TRACK_TOTAL_HITS)
+
+        cursor = params.get("cursor")
+        if cursor is not None:
+            return self._cursor_page(es, cursor, params, track_total)
 
+        page, size = parse_page_params(params)
         from_ = (page - 1) * size
+        if from_ + size > settings.PRODUCT_MAX_RESULT_WINDOW:
+            return Response(
+                {"detail": f"page window exceeds {settings.PRODUCT_MAX_RESULT_WINDOW} results; use cursor pagination (cursor=*)"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            body = build_product_search_body(params, track_total)
+        except InvalidQuery as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        cache, cache_key = search_cache_lookup(body, from_, size)
+        if cache_key is not None:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return Response(cached)
+
         res = es.search(index=PRODUCT_INDEX, body=body, from_=from_, size=size, ignore_unavailable=True)
-        hits = res.get("hits", {}).get("hits", [])
-        total_hits = res.get("hits", {}).get("total", {}).get("value", 0)
-        items = []
-        for h in hits:
-            src = h.get("_source", {}).copy()
-            src["id"] = h.get("_id")
-            items.append(src)
-        total_pages = math.ceil(total_hits / size) if size > 0 else 0
+        payload = page_payload(res, page, size)
+        if cache_key is not None:
+            cache.set(cache_key, payload)
+        return Response(payload)
 
+    def _cursor_page(self, es, cursor, params, track_total):
+        # Deep pagination: a point-in-time keeps a consistent view of the index
+        # while search_after walks it with a stable sort, so the cost per page
+        # stays flat instead of growing with the offset.
+        _, size = parse_page_params(params)
+        try:
+            query = build_product_query(params)
+            sort = with_tiebreaker(product_sort(params), PRODUCT_CURSOR_SORT)
+            source = product_source(params)
+        except InvalidQuery as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        body = {"query": query, "sort": sort, "track_total_hits": track_total}
+        if source:
+            body["_source"] = source
+        try:
+            res, next_cursor = search_pit_page(
+                es, PRODUCT_INDEX, body, cursor, size, settings.PRODUCT_CURSOR_KEEP_ALIVE
+            )
+        except InvalidCursor as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if res is None:
+            return Response({"items": [], "total": 0, "total_relation": "eq", "size": size, "next_cursor": None})
+
+        hits = res.get("hits", {}).get("hits", [])
+        total_hits, relation = read_total(res)
         return Response({
-            "items": items,
+            "items": hits_to_items(hits),
             "total": total_hits,
-            "page": page,
+            "total_relation": relation,
             "size": size,
-            "total_pages": total_pages
+            "next_cursor": next_cursor
         })
 
     def post(self, request):
+        write_kwargs = refresh_kwargs(request)
+        if write_kwargs is None:
+            return invalid_refresh()
         serializer = ProductSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         data = serializer.validated_data
-        es = get_es_client()
         new_id = str(uuid.uuid4())
         data["id"] = new_id
         data["created_at"] = datetime.utcnow().isoformat()
-        es.index(index=PRODUCT_INDEX, id=new_id, document=data)
+        buffer = product_write_buffer(write_kwargs)
+        if buffer is not None:
+            return buffered_write_response(buffer, new_id, data)
+        es = get_es_client()
+        es.index(index=PRODUCT_INDEX, id=new_id, document=data, **write_kwargs)
+        invalidate_product_search(searchable="refresh" in write_kwargs)
         return Response({**data, "id": new_id}, status=status.HTTP_201_CREATED)
 
+class ProductSuggestView(APIView):
+    permission_classes = [IsAuthenticatedFromJWT]
+
+    def get(self, request):
+        prefix = " ".join(request.query_params.get("prefix", "").split())
+        if not prefix:
+            return Response({"detail": "prefix is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(prefix) > 100:
+            return Response({"detail": "prefix is too long"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            size = min(max(int(request.query_params.get("size", settings.PRODUCT_SUGGEST_SIZE)), 1), 20)
+        except ValueError:
+            size = settings.PRODUCT_SUGGEST_SIZE
+
+        cache = get_product_suggest_cache()
+        cache_key = cache.make_key([prefix.casefold(), size]) if cache is not None else None
+        if cache is not None:
+            cached = cache.get(cache_key, None)
+            if cached is not None:
+                return Response({**cached, "prefix": prefix})
+
+        es = get_es_client().options(request_timeout=settings.PRODUCT_SUGGEST_TIMEOUT, max_retries=0)
+        try:
+            res = es.search(index=PRODUCT_INDEX, body=build_product_suggest_body(prefix, size), ignore_unavailable=True)
+        except ConnectionTimeout:
+            return Response({"detail": "suggestions timed out"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        payload = {
+            "prefix": prefix,
+            "suggestions": [
+                {"id": h["_id"], "name": h.get("_source", {}).get("name")}
+                for h in res.get("hits", {}).get("hits", [])
+            ],
+        }
+        if cache is not None:
+            cache.set(cache_key, payload)
+        return Response(payload)
+
+class ProductBulkView(APIView):
+    permission_classes = [IsAuthenticatedFromJWT]
+
+    def post(self, request):
+        # The body is read line by line from the request stream and never
+        # buffered whole, so request.data is deliberately not touched here.
+        fmt = detect_format(request.query_params.get("format"), request.content_type)
+        if fmt not in BULK_FORMATS:
+            return Response({"detail": f"format must be one of {', '.join(BULK_FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        write_kwargs = refresh_kwargs(request)
+        if write_kwargs is None:
+            return invalid_refresh()
+        stream = request.stream
+        if stream is None:
+            return Response({"detail": "empty request body"}, status=status.HTTP_400_BAD_REQUEST)
+        es = get_es_client()
+        report = bulk_index_products(es, iter_rows(stream, fmt), PRODUCT_INDEX, **write_kwargs)
+        if report.indexed:
+            invalidate_product_search(searchable="refresh" in write_kwargs)
+        code = status.HTTP_200_OK if report.failed == 0 else status.HTTP_207_MULTI_STATUS
+        return Response(report.as_dict(), status=code)
+
+class ProductExportView(APIView):
+    """Stream every product matching the listing filters as NDJSON or CSV."""
+    permission_classes = [IsAuthenticatedFromJWT]
+
+    def perform_content_negotiation(self, request, force=False):
+        # ?format= picks the export format here, not a DRF renderer.
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request):
+        fmt = detect_format(request.query_params.get("format"))
+        if fmt not in EXPORT_FORMATS:
+            return Response({"detail": f"format must be one of {', '.join(EXPORT_FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        # Validate before opening the point-in-time, which only the stream closes.
+        try:
+            body = build_product_export_body(request.query_params)
+        except InvalidQuery as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        fields = csv_fields(request.query_params) if fmt == "csv" else None
+        accepted = accepted_encodings(request.headers.get("Accept-Encoding"))
+        compress = "gzip" in accepted or "*" in accepted
+        es = get_es_client()
+        pit_id = open_export(es, PRODUCT_INDEX)
+        if pit_id is None:
+            return Response({"detail": "index not found"}, status=status.HTTP_404_NOT_FOUND)
+        response = StreamingHttpResponse(
+            export_chunks(es, pit_id, body, fmt, fields, compress=compress),
+            content_type=EXPORT_CONTENT_TYPES[fmt],
+        )
+        response["Content-Disposition"] = f'attachment; filename="products.{fmt}"'
+        response["Vary"] = "Accept-Encoding"
+        if compress:
+            response["Content-Encoding"] = "gzip"
+        return response
+
+class ProductMGetView(APIView):
+    permission_classes = [IsAuthenticatedFromJWT]
+
+    def post(self, request):
+        serializer = MGetSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return mget_response(get_es_client(), PRODUCT_INDEX, serializer.validated_data)
+
+class ProductStockView(APIView):
+    permission_classes = [IsAuthenticatedFromJWT]
+
+    def post(self, request, pk):
+        write_kwargs = refresh_kwargs(request)
+        if write_kwargs is None:
+            return invalid_refresh()
+        serializer = StockChangeSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+        es = get_es_client()
+        try:
+            entry = apply_stock_change(
+                es, PRODUCT_INDEX, pk,
+                delta=data.get("delta"),
+                set_to=data.get("set"),
+                allow_negative=data["allow_negative"],
+                retry_on_conflict=settings.PRODUCT_UPDATE_RETRY_ON_CONFLICT,
+                **write_kwargs,
+            )
+        except NotFoundError:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        except InsufficientStock:
+            return Response({"detail": "insufficient stock"}, status=status.HTTP_409_CONFLICT)
+        invalidate_product_search(searchable="refresh" in write_kwargs)
+        return write_response(entry, pk)
+
+class ProductBulkStockView(APIView):
+    permission_classes = [IsAuthenticatedFromJWT]
+
+    def post(self, request):
+        write_kwargs = refresh_kwargs(request)
+        if write_kwargs is None:
+            return invalid_refresh()
+        serializer = BulkStockSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        summary = bulk_stock_changes(
+            get_es_client(),
+            PRODUCT_INDEX,
+            serializer.validated_data["updates"],
+            chunk_size=settings.PRODUCT_BULK_CHUNK_SIZE,
+            retry_on_conflict=settings.PRODUCT_UPDATE_RETRY_ON_CONFLICT,
+            **write_kwargs,
+        )
+        if summary["updated"]:
+            invalidate_product_search(searchable="refresh" in write_kwargs)
+        clean = not (summary["failed"] or summary["not_found"] or summary["insufficient"])
+        return Response(summary, status=status.HTTP_200_OK if clean else status.HTTP_207_MULTI_STATUS)
+
+class ProductBulkDeleteView(APIView):
+    permission_classes = [IsAuthenticatedFromJWT]
+
+    def post(self, request):
+        write_kwargs = refresh_kwargs(request)
+        if write_kwargs is None:
+            return invalid_refresh()
+        serializer = DeleteIdsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        ids = serializer.validated_data["ids"]
+        summary = bulk_delete_products(get_es_client(), ids, PRODUCT_INDEX, **write_kwargs)
+        for pk in ids:
+            invalidate_document(PRODUCT_INDEX, pk)
+        if summary["deleted"]:
+            invalidate_product_search(searchable="refresh" in write_kwargs)
+        code = status.HTTP_200_OK if summary["failed"] == 0 else status.HTTP_207_MULTI_STATUS
+        return Response(summary, status=code)
+
+class ProductDeleteByQueryView(APIView):
+    permission_classes = [IsAuthenticatedFromJWT]
+
+    def post(self, request):
+        serializer = DeleteByQuerySerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+        try:
+            query = build_product_delete_query(data)
+        except InvalidQuery as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        es = get_es_client()
+        if data["dry_run"]:
+            res = es.count(index=PRODUCT_INDEX, query=query, ignore_unavailable=True)
+            return Response({"would_delete": res.get("count", 0), "query": query})
+
+        kwargs = {"slices": data["slices"], "conflicts": "proceed", "wait_for_completion": False, "refresh": True}
+        if data.get("requests_per_second"):
+            kwargs["requests_per_second"] = data["requests_per_second"]
+        try:
+            res = es.delete_by_query(index=PRODUCT_INDEX, query=query, **kwargs)
+        except NotFoundError:
+            return Response({"detail": "index not found"}, status=status.HTTP_404_NOT_FOUND)
+        # Deleted documents may linger in the detail cache for up to its TTL;
+        # search results are invalidated again once the task has finished.
+        invalidate_product_search(searchable=True)
+        invalidate_when_done(res["task"])
+        handle = task_handle(res["task"])
+        return Response(
+            {"task": handle, "status_url": f"/api/tasks/{handle}/"},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
 class ProductDetailView(APIView):
     permission_classes = [IsAuthenticatedFromJWT]
 
     def get(self, request, pk):
         es = get_es_client()
-        try:
-            res = es.get(index=PRODUCT_INDEX, id=pk)
-        except Exception:
+        entry = fetch_document(es, PRODUCT_INDEX, pk)
+        if entry is None:
             return Response(status=status.HTTP_404_NOT_FOUND)
-        doc = res["_source"]
-        doc["id"] = pk
-        return Response(doc)
+        return document_response(request, entry, pk)
 
     def put(self, request, pk):
+        write_kwargs = refresh_kwargs(request)
+        if write_kwargs is None:
+            return invalid_refresh()
         serializer = ProductSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        es = get_es_client()
+        if "stock" not in serializer.validated_data:
+            # PUT replaces the whole document, so leaving stock out would wipe
+            # the count the stock endpoints maintain.
+            return Response(
+                {"stock": ["This field is required on PUT; use PATCH to keep the current stock."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
         try:
-            _ = es.get(index=PRODUCT_INDEX, id=pk)
-        except Exception:
+            if_match = parse_if_match(request.headers.get("If-Match"))
+        except ValueError as exc:
+            return precondition_failed(str(exc))
+        es = get_es_client()
+        buffer = product_write_buffer(write_kwargs, if_match)
+        pending = buffer is not None and buffer.is_pending(pk)
+        if not if_match and not pending and fetch_document(es, PRODUCT_INDEX, pk) is None:
             return Response(status=status.HTTP_404_NOT_FOUND)
         doc = serializer.validated_data
         doc["updated_at"] = datetime.utcnow().isoformat()
         doc["id"] = pk
-        es.index(index=PRODUCT_INDEX, id=pk, document=doc)
-        return Response(doc)
+        if buffer is not None:
+            return buffered_write_response(buffer, pk, doc)
+        try:
+            res = es.index(index=PRODUCT_INDEX, id=pk, document=doc, **if_match, **write_kwargs)
+        except ConflictError:
+            invalidate_document(PRODUCT_INDEX, pk)
+            return precondition_failed()
+        entry = store_document(PRODUCT_INDEX, pk, dict(doc), res)
+        invalidate_product_search(searchable="refresh" in write_kwargs)
+        return write_response(entry, pk)
 
-    def delete(self, request, pk):
+    def patch(self, request, pk):
+        write_kwargs = refresh_kwargs(request)
+        if write_kwargs is None:
+            return invalid_refresh()
+        serializer = ProductSerializer(data=request.data, partial=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if not serializer.validated_data:
+            return Response({"detail": "no fields to update"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            if_match = parse_if_match(request.headers.get("If-Match"))
+        except ValueError as exc:
+            return precondition_failed(str(exc))
+        partial = dict(serializer.validated_data, updated_at=datetime.utcnow().isoformat())
+        buffer = product_write_buffer(write_kwargs, if_match)
+        if buffer is not None:
+            # Buffered partial updates to unknown ids fail at flush time and
+            # are only logged, so check existence up front.
+            if not buffer.is_pending(pk) and fetch_document(get_es_client(), PRODUCT_INDEX, pk) is None:
+                return Response(status=status.HTTP_404_NOT_FOUND)
+            return buffered_write_response(buffer, pk, partial, op="update")
         es = get_es_client()
         try:
-            es.delete(index=PRODUCT_INDEX, id=pk)
-        except Exception:
-            pass
+            entry = update_document(
+                es, PRODUCT_INDEX, pk, partial, if_match,
+                retry_on_conflict=settings.PRODUCT_UPDATE_RETRY_ON_CONFLICT, **write_kwargs
+            )
+        except NotFoundError:
+            invalidate_document(PRODUCT_INDEX, pk)
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        except ConflictError:
+            invalidate_document(PRODUCT_INDEX, pk)
+            return precondition_failed()
+        invalidate_product_search(searchable="refresh" in write_kwargs)
+        return write_response(entry, pk)
+
+    def delete(self, request, pk):
+        write_kwargs = refresh_kwargs(request)
+        if write_kwargs is None:
+            return invalid_refresh()
+        # A write still waiting in the buffer, or in a batch being flushed
+        # right now, must not resurrect the document: drop the pending one and
+        # delete only once no flush is in flight.
+        buffer = product_write_buffer({})
+        es = get_es_client()
+        with buffer.paused() if buffer is not None else nullcontext():
+            discarded = buffer is not None and buffer.discard(pk)
+            try:
+                es.delete(index=PRODUCT_INDEX, id=pk, **write_kwargs)
+            except NotFoundError:
+                invalidate_document(PRODUCT_INDEX, pk)
+                if discarded:
+                    return Response(status=status.HTTP_204_NO_CONTENT)
+                return Response(status=status.HTTP_404_NOT_FOUND)
+        invalidate_document(PRODUCT_INDEX, pk)
+        invalidate_product_search(searchable="refresh" in write_kwargs)
         return Response(status=status.HTTP_204_NO_CONTENT)
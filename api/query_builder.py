@@ -0,0 +1,366 @@
+# Search body builders for the product and article listings. Exact-match
+# constraints always go into filter context: they don't contribute to the
+# score and Elasticsearch can cache them in the node query cache.
+from datetime import datetime
+from django.conf import settings
+
+
+class InvalidQuery(ValueError):
+    pass
+
+
+PRODUCT_TEXT_FIELDS = ["name^2", "description"]
+PRODUCT_SORT_FIELDS = {
+    "name": "name.keyword",
+    "price": "price",
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+}
+FACET_FIELDS = ("category", "tags", "in_stock", "price")
+PRODUCT_SUGGEST_FIELDS = [
+    "name_suggest^2",
+    "name_suggest._2gram",
+    "name_suggest._3gram",
+    "sku_suggest",
+    "sku_suggest._2gram",
+]
+
+ARTICLE_TEXT_FIELDS = ["title^2", "content"]
+ARTICLE_SORT_FIELDS = {
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+    "author": "author",
+}
+ARTICLE_VIEWS = ("full", "excerpt")
+
+
+def _csv(value):
+    if not value:
+        return []
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def _float(params, name):
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise InvalidQuery(f"{name} must be a number")
+
+
+def _date(params, name):
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        datetime.fromisoformat(value)
+    except ValueError:
+        raise InvalidQuery(f"{name} must be an ISO 8601 date or datetime")
+    return value
+
+
+def text_clauses(q_text, fields):
+    if not q_text:
+        return []
+    return [{"multi_match": {"query": q_text, "fields": fields}}]
+
+
+def bool_query(must, filters):
+    if not must and not filters:
+        return {"match_all": {}}
+    query = {}
+    if must:
+        query["must"] = must
+    if filters:
+        query["filter"] = filters
+    return {"bool": query}
+
+
+def parse_sort(value, sort_fields):
+    """
+    Parse ``sort=price,-created_at`` into an Elasticsearch sort list. A
+    leading ``-`` sorts descending; ``relevance`` (or no value) keeps score
+    order and returns None.
+    """
+    sort = []
+    for item in _csv(value):
+        if item in ("relevance", "_score"):
+            sort.append({"_score": {"order": "desc"}})
+            continue
+        order = "desc" if item.startswith("-") else "asc"
+        name = item.lstrip("-+")
+        if name not in sort_fields:
+            raise InvalidQuery(f"cannot sort on {name!r}; choose from {', '.join(sort_fields)}")
+        sort.append({sort_fields[name]: {"order": order, "missing": "_last"}})
+    if not sort or sort == [{"_score": {"order": "desc"}}]:
+        return None
+    return sort
+
+
+def parse_source(params, default_excludes=()):
+    """
+    Map ``fields=`` / ``exclude=`` onto ``_source`` includes/excludes (None:
+    full source). ``default_excludes`` apply unless the client sends its own
+    ``exclude=`` (an empty one asks for everything) or names them in ``fields=``.
+    """
+    includes = _csv(params.get("fields"))
+    requested = params.get("exclude")
+    if requested is not None:
+        excludes = _csv(requested)
+    else:
+        excludes = [f for f in default_excludes if f not in includes]
+    if not includes and not excludes:
+        return None
+    source = {}
+    if includes:
+        source["includes"] = includes
+    if excludes:
+        source["excludes"] = excludes
+    return source
+
+
+def with_tiebreaker(sort, default):
+    """Sort for search_after paging: the requested order plus a unique id tiebreaker."""
+    if not sort:
+        return list(default)
+    if any("id" in s for s in sort):
+        return sort
+    return sort + [{"id": {"order": "asc", "missing": "_last"}}]
+
+
+# Products
+
+def product_filters(params):
+    """Non-scoring filter clauses keyed by the field they constrain."""
+    filters = {}
+    category = params.get("category")
+    if category:
+        filters["category"] = {"term": {"category": category}}
+    in_stock = params.get("in_stock")
+    if in_stock is not None:
+        val = str(in_stock).lower() in ("1", "true", "yes")
+        filters["in_stock"] = {"term": {"in_stock": val}}
+    tags = _csv(params.get("tags"))
+    if tags:
+        filters["tags"] = {"terms": {"tags": tags}}
+    min_price = _float(params, "min_price")
+    max_price = _float(params, "max_price")
+    if min_price is not None or max_price is not None:
+        price_range = {}
+        if min_price is not None:
+            price_range["gte"] = min_price
+        if max_price is not None:
+            price_range["lte"] = max_price
+        filters["price"] = {"range": {"price": price_range}}
+    return filters
+
+
+def build_product_query(params):
+    return bool_query(text_clauses(params.get("q"), PRODUCT_TEXT_FIELDS), list(product_filters(params).values()))
+
+
+def product_sort(params):
+    return parse_sort(params.get("sort"), PRODUCT_SORT_FIELDS)
+
+
+def product_source(params):
+    return parse_source(params, settings.PRODUCT_LIST_SOURCE_EXCLUDES)
+
+
+def build_product_delete_query(params):
+    """
+    Query for filter-based product removal: the listing filters plus
+    ``created_before``/``updated_before``. Raises InvalidQuery when nothing
+    would restrict it, so a stray request cannot empty the catalog.
+    """
+    filters = list(product_filters(params).values())
+    for param, field in (("created_before", "created_at"), ("updated_before", "updated_at")):
+        value = params.get(param)
+        if value:
+            filters.append({"range": {field: {"lt": value}}})
+    must = text_clauses(params.get("q"), PRODUCT_TEXT_FIELDS)
+    if not filters and not must:
+        raise InvalidQuery("at least one filter is required; use DELETE /api/products/index/ to drop everything")
+    return bool_query(must, filters)
+
+
+def build_product_export_body(params):
+    """
+    Body for a full export: the listing filters and ``fields=``/``exclude=``,
+    but no scoring, sorting or facets. Exports walk the index in
+    ``_shard_doc`` order, the cheapest order to page through.
+    """
+    # Nothing is ranked, so the text match can run in filter context too.
+    filters = text_clauses(params.get("q"), PRODUCT_TEXT_FIELDS) + list(product_filters(params).values())
+    body = {"query": bool_query([], filters)}
+    source = parse_source(params)
+    if source:
+        body["_source"] = source
+    return body
+
+
+def build_product_suggest_body(prefix, size):
+    """
+    Prefix match against the search_as_you_type copies of name and sku.
+    bool_prefix scores the shingle subfields as terms and only the last
+    word as a prefix, so it stays cheap per keystroke; only ids and names
+    come back and hits are not counted.
+    """
+    return {
+        "query": {
+            "multi_match": {
+                "query": prefix,
+                "type": "bool_prefix",
+                "fields": PRODUCT_SUGGEST_FIELDS,
+            }
+        },
+        "_source": ["name"],
+        "size": size,
+        "track_total_hits": False,
+    }
+
+
+def parse_facets(params):
+    value = params.get("facets")
+    if not value:
+        return []
+    if value.lower() in ("1", "true", "all"):
+        return list(FACET_FIELDS)
+    return [f for f in _csv(value) if f in FACET_FIELDS]
+
+
+def _facet_agg(field):
+    if field == "price":
+        ranges = [dict(r) for r in settings.PRODUCT_PRICE_RANGES]
+        return {"range": {"field": "price", "ranges": ranges}}
+    if field == "in_stock":
+        return {"terms": {"field": "in_stock"}}
+    return {"terms": {"field": field, "size": settings.PRODUCT_FACET_SIZE}}
+
+
+def build_product_search_body(params, track_total):
+    """
+    Build the search body for the product listing. With ``facets=`` the
+    selected filters move into ``post_filter`` and every facet aggregation
+    is filtered by all selections except its own field, so counts for a
+    facet show what selecting another of its values would return, all in
+    the same request.
+    """
+    facets = parse_facets(params)
+    filters = product_filters(params)
+    must = text_clauses(params.get("q"), PRODUCT_TEXT_FIELDS)
+    if facets:
+        body = {"query": bool_query(must, []), "track_total_hits": track_total}
+        if filters:
+            body["post_filter"] = {"bool": {"filter": list(filters.values())}}
+    else:
+        body = {"query": bool_query(must, list(filters.values())), "track_total_hits": track_total}
+
+    sort = product_sort(params)
+    if sort:
+        body["sort"] = sort
+    source = product_source(params)
+    if source:
+        body["_source"] = source
+
+    if facets:
+        aggs = {}
+        for field in facets:
+            others = [clause for name, clause in filters.items() if name != field]
+            aggs[field] = {
+                "filter": {"bool": {"filter": others}} if others else {"match_all": {}},
+                "aggs": {"values": _facet_agg(field)},
+            }
+        interval = _float(params, "price_interval")
+        if "price" in facets and interval and interval > 0:
+            aggs["price"]["aggs"]["histogram"] = {"histogram": {"field": "price", "interval": interval, "min_doc_count": 1}}
+        body["aggs"] = aggs
+    return body
+
+
+def read_facets(res):
+    facets = {}
+    for field, agg in (res.get("aggregations") or {}).items():
+        buckets = agg.get("values", {}).get("buckets", [])
+        if field == "price":
+            facets["price"] = [
+                {k: v for k, v in (("from", b.get("from")), ("to", b.get("to")), ("count", b["doc_count"])) if v is not None}
+                for b in buckets
+            ]
+            if "histogram" in agg:
+                facets["price_histogram"] = [
+                    {"value": b["key"], "count": b["doc_count"]} for b in agg["histogram"].get("buckets", [])
+                ]
+        elif field == "in_stock":
+            facets["in_stock"] = [{"value": bool(b["key"]), "count": b["doc_count"]} for b in buckets]
+        else:
+            facets[field] = [{"value": b["key"], "count": b["doc_count"]} for b in buckets]
+    return facets
+
+
+# Articles
+
+def article_filters(params):
+    filters = {}
+    author = params.get("author")
+    if author:
+        filters["author"] = {"term": {"author": author}}
+    created_from = _date(params, "created_from")
+    created_to = _date(params, "created_to")
+    if created_from or created_to:
+        date_range = {}
+        if created_from:
+            date_range["gte"] = created_from
+        if created_to:
+            date_range["lte"] = created_to
+        filters["created_at"] = {"range": {"created_at": date_range}}
+    return filters
+
+
+def build_article_query(params):
+    return bool_query(text_clauses(params.get("q"), ARTICLE_TEXT_FIELDS), list(article_filters(params).values()))
+
+
+def article_sort(params):
+    return parse_sort(params.get("sort"), ARTICLE_SORT_FIELDS)
+
+
+def article_view(params):
+    view = (params.get("view") or "full").lower()
+    if view not in ARTICLE_VIEWS:
+        raise InvalidQuery(f"view must be one of {', '.join(ARTICLE_VIEWS)}")
+    return view
+
+
+def build_article_search_body(params, track_total):
+    """
+    Build the search body for the article listing. ``view=excerpt`` leaves
+    ``content`` out of ``_source`` and asks for a single highlighted
+    fragment instead (the leading ``no_match_size`` characters when nothing
+    matched), so page size no longer depends on article length.
+    """
+    q_text = params.get("q")
+    body = {"query": build_article_query(params), "track_total_hits": track_total}
+    sort = article_sort(params)
+    if sort:
+        body["sort"] = sort
+    source = parse_source(params)
+    if article_view(params) == "excerpt":
+        excerpt_size = settings.ARTICLE_EXCERPT_SIZE
+        source = source or {}
+        source["excludes"] = sorted(set(source.get("excludes", [])) | {"content"})
+        fields = {
+            "content": {
+                "fragment_size": excerpt_size,
+                "number_of_fragments": 1,
+                "no_match_size": excerpt_size,
+            }
+        }
+        if q_text:
+            fields["title"] = {"number_of_fragments": 0}
+        body["highlight"] = {"fields": fields, "pre_tags": ["<em>"], "post_tags": ["</em>"]}
+    if source:
+        body["_source"] = source
+    return body
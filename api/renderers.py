@@ -0,0 +1,64 @@
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.utils import encoders
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from .metrics import phase
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSONRenderer whose serialization time shows up as the ``render`` request phase."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with phase("render"):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+def _require_orjson():
+    if orjson is None:
+        raise ImproperlyConfigured("API_JSON_BACKEND=orjson needs the orjson package (pip install orjson)")
+
+
+# Types orjson does not know natively (Decimal, lazy strings, ...) go
+# through DRF's encoder so both renderers produce the same values.
+_drf_default = encoders.JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Drop-in JSONRenderer backed by orjson, which serializes dicts, lists,
+    datetimes and UUIDs in C. Output is compact UTF-8 like the default
+    renderer; the browsable API's indent is honoured as two spaces.
+    """
+
+    def __init__(self, *args, **kwargs):
+        _require_orjson()
+        super().__init__(*args, **kwargs)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        with phase("render"):
+            option = orjson.OPT_NON_STR_KEYS
+            if self.get_indent(accepted_media_type, renderer_context or {}):
+                option |= orjson.OPT_INDENT_2
+            return orjson.dumps(data, default=_drf_default, option=option)
+
+
+class ORJSONParser(JSONParser):
+    """JSONParser backed by orjson."""
+
+    def __init__(self, *args, **kwargs):
+        _require_orjson()
+        super().__init__(*args, **kwargs)
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
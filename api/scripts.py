@@ -0,0 +1,34 @@
+# Painless scripts the API sends to Elasticsearch, each registered with the
+# Python function the in-memory backend (SEARCH_BACKEND=memory) runs in its
+# place. The equivalent is declared right below the painless source it
+# mirrors, and api/tests/test_scripts.py runs both through the same cases.
+# Sources are matched with whitespace normalized, so reformatting a script
+# does not disconnect it from its equivalent.
+_equivalents = {}
+
+
+def _normalize(source):
+    return " ".join(source.split())
+
+
+def painless(source):
+    """
+    Register the decorated function as the Python equivalent of painless
+    ``source``. It edits ``ctx._source`` (a dict) in place from ``params``
+    and returns False where the script sets ``ctx.op = 'noop'``.
+    """
+
+    def register(fn):
+        _equivalents[_normalize(source)] = fn
+        return fn
+
+    return register
+
+
+def python_equivalent(source):
+    """The registered Python equivalent of painless ``source``, or None."""
+    return _equivalents.get(_normalize(source))
+
+
+def registered_sources():
+    return list(_equivalents)
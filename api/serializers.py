@@ -1,18 +1,34 @@
+from django.conf import settings
 from rest_framework import serializers
+from .metrics import phase
 
-class RegisterSerializer(serializers.Serializer):
+class TimedSerializer(serializers.Serializer):
+    """Serializer whose validation time shows up as the ``validate`` request phase."""
+
+    def is_valid(self, *args, **kwargs):
+        with phase("validate"):
+            return super().is_valid(*args, **kwargs)
+
+class RegisterSerializer(TimedSerializer):
     username = serializers.CharField(max_length=150)
     email = serializers.EmailField()
     password = serializers.CharField(write_only=True, min_length=6)
 
-class LoginSerializer(serializers.Serializer):
+class LoginSerializer(TimedSerializer):
     username = serializers.CharField()
     password = serializers.CharField(write_only=True)
 
-class ArticleSerializer(serializers.Serializer):
+class RefreshTokenSerializer(TimedSerializer):
+    refresh = serializers.CharField()
+
+class ArticleSerializer(TimedSerializer):
     id = serializers.CharField(read_only=True)
     title = serializers.CharField()
     content = serializers.CharField()
     author = serializers.CharField(required=False, allow_blank=True)
     created_at = serializers.DateTimeField(required=False)
     updated_at = serializers.DateTimeField(required=False)
+
+class MGetSerializer(TimedSerializer):
+    ids = serializers.ListField(child=serializers.CharField(), allow_empty=False, max_length=settings.MGET_MAX_IDS)
+    fields = serializers.ListField(child=serializers.CharField(), required=False)
@@ -1,25 +1,112 @@
 # backend/api/simplejwt_auth.py
+import hashlib
+import threading
+import time
 from rest_framework import exceptions
-from rest_framework_simplejwt.backends import TokenBackend
 from django.conf import settings
+from .cache import LocalLRUCache, register_cache
+
+_token_backend = None
+
+
+def get_token_backend():
+    """
+    TokenBackend built from SIMPLE_JWT settings on first use. Importing
+    SimpleJWT's backends pulls in its token and blacklist models, so
+    workers only pay for that once a token actually has to be verified.
+    """
+    global _token_backend
+    if _token_backend is None:
+        from rest_framework_simplejwt.backends import TokenBackend
+
+        # Note: TokenBackend.__init__ signature differs between versions;
+        # avoid passing unsupported kwargs (like `verify`) here.
+        _token_backend = TokenBackend(
+            algorithm=settings.SIMPLE_JWT.get("ALGORITHM", "HS256"),
+            signing_key=settings.SIMPLE_JWT.get("SIGNING_KEY", settings.SECRET_KEY),
+        )
+    return _token_backend
+
+
+class VerifiedTokenCache:
+    """
+    Bounded cache of already verified token payloads keyed by the token's
+    SHA-256 digest. An entry never outlives the token's own ``exp`` claim,
+    so a cached token stops authenticating exactly when it would have
+    failed verification anyway.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.cache = LocalLRUCache(max_entries=max_entries, ttl=ttl)
+        self.ttl = ttl
+        self.verifications = 0
+        self.failures = 0
+        self.verify_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(token):
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        return self.cache.get(key, None)
+
+    def put(self, key, payload):
+        exp = payload.get("exp")
+        ttl = self.ttl
+        if exp is not None:
+            ttl = min(ttl, exp - time.time())
+        if ttl > 0:
+            self.cache.set(key, payload, ttl)
+
+    def record(self, seconds, ok):
+        with self._lock:
+            self.verifications += 1
+            self.verify_seconds += seconds
+            if not ok:
+                self.failures += 1
+
+    def stats(self):
+        stats = self.cache.stats()
+        stats.update({
+            "verifications": self.verifications,
+            "verification_failures": self.failures,
+            "verify_seconds_total": round(self.verify_seconds, 6),
+            "verify_ms_avg": round(self.verify_seconds * 1000 / self.verifications, 4) if self.verifications else 0.0,
+        })
+        return stats
+
+
+_verified_tokens = None
+if settings.JWT_VERIFY_CACHE.get("MAX_ENTRIES", 0) > 0:
+    _verified_tokens = register_cache("jwt_verify", VerifiedTokenCache(
+        settings.JWT_VERIFY_CACHE["MAX_ENTRIES"],
+        settings.JWT_VERIFY_CACHE.get("TTL", 300),
+    ))
 
-# Construct TokenBackend using SIMPLE_JWT settings
-# Note: TokenBackend.__init__ signature differs between versions;
-# avoid passing unsupported kwargs (like `verify`) here.
-token_backend = TokenBackend(
-    algorithm=settings.SIMPLE_JWT.get("ALGORITHM", "HS256"),
-    signing_key=settings.SIMPLE_JWT.get("SIGNING_KEY", settings.SECRET_KEY),
-)
 
 def decode_and_validate_token(token: str) -> dict:
     """
     Decode and validate a JWT using Simple JWT's TokenBackend.
     Raises rest_framework.exceptions.AuthenticationFailed on invalid/expired token.
+    Successfully verified payloads are memoized until the token expires.
     """
+    key = None
+    if _verified_tokens is not None:
+        key = VerifiedTokenCache.key(token)
+        payload = _verified_tokens.get(key)
+        if payload is not None:
+            return payload
+    start = time.perf_counter()
     try:
         # TokenBackend.decode will raise exceptions for invalid/expired tokens.
-        payload = token_backend.decode(token, verify=True)
-        return payload
+        payload = get_token_backend().decode(token, verify=True)
     except Exception as exc:
+        if _verified_tokens is not None:
+            _verified_tokens.record(time.perf_counter() - start, ok=False)
         # Normalize to DRF authentication failure
         raise exceptions.AuthenticationFailed("Invalid or expired token") from exc
+    if _verified_tokens is not None:
+        _verified_tokens.record(time.perf_counter() - start, ok=True)
+        _verified_tokens.put(key, payload)
+    return payload
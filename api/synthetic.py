@@ -0,0 +1,84 @@
+# Deterministic synthetic catalog data for seeding and benchmarks. Values
+# follow rough real-world shapes (skewed categories, long-tail prices, a
+# shared vocabulary) so searches, facets and sorts have something to chew on.
+import random
+import uuid
+from datetime import datetime, timedelta
+
+CATEGORIES = [
+    "electronics", "books", "home", "kitchen", "toys", "sports", "garden",
+    "beauty", "automotive", "clothing", "grocery", "office",
+]
+TAGS = [
+    "new", "sale", "bestseller", "eco", "premium", "budget", "gift", "limited",
+    "refurbished", "bundle", "imported", "handmade", "wireless", "organic",
+]
+ADJECTIVES = [
+    "compact", "portable", "classic", "smart", "durable", "lightweight", "deluxe",
+    "ergonomic", "vintage", "modern", "rugged", "slim", "quiet", "fast", "solar",
+]
+NOUNS = [
+    "phone", "lamp", "kettle", "backpack", "chair", "speaker", "novel", "blender",
+    "drone", "jacket", "watch", "camera", "desk", "bottle", "router", "keyboard",
+    "tent", "bicycle", "headphones", "notebook",
+]
+WORDS = ADJECTIVES + NOUNS + [
+    "quality", "design", "battery", "steel", "cotton", "warranty", "travel", "home",
+    "office", "outdoor", "daily", "use", "perfect", "gift", "easy", "clean", "power",
+    "fits", "includes", "colour", "size", "extra", "soft", "strong", "performance",
+]
+AUTHORS = ["admin", "alice", "bob", "carol", "dave", "erin", "frank", "grace"]
+
+SEARCH_TERMS = NOUNS + ADJECTIVES
+
+
+def _sentence(rng, min_words, max_words):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraphs(rng, count):
+    return "\n\n".join(" ".join(_sentence(rng, 8, 18) for _ in range(rng.randint(3, 6))) for _ in range(count))
+
+
+def _timestamp(rng, now, days=365):
+    return (now - timedelta(seconds=rng.randint(0, days * 86400))).isoformat()
+
+
+def synthetic_products(count, seed=0, start=0):
+    """Yield ``count`` product documents; the same seed always yields the same catalog."""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    # Zipf-like category weights: a few large categories, many small ones.
+    weights = [1.0 / (i + 1) for i in range(len(CATEGORIES))]
+    for n in range(start, start + count):
+        name = f"{rng.choice(ADJECTIVES).capitalize()} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}"
+        created = _timestamp(rng, now)
+        yield {
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "sku": f"SKU-{n:08d}",
+            "name": name,
+            "description": _paragraphs(rng, 1),
+            "price": round(rng.lognormvariate(3.5, 1.0), 2),
+            "category": rng.choices(CATEGORIES, weights)[0],
+            "in_stock": rng.random() < 0.85,
+            "tags": rng.sample(TAGS, rng.randint(0, 4)),
+            "created_at": created,
+            "updated_at": created,
+        }
+
+
+def synthetic_articles(count, seed=0):
+    """Yield ``count`` article documents of a few paragraphs each."""
+    rng = random.Random(seed + 1)
+    now = datetime.utcnow()
+    for _ in range(count):
+        created = _timestamp(rng, now)
+        yield {
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "title": _sentence(rng, 3, 8).rstrip("."),
+            "content": _paragraphs(rng, rng.randint(2, 6)),
+            "author": rng.choice(AUTHORS),
+            "created_at": created,
+            "updated_at": created,
+        }
@@ -0,0 +1,95 @@
+# Background Elasticsearch tasks started by this API. Clients only ever see
+# a signed handle for a task id, so /api/tasks/<handle>/ cannot be used to
+# read or cancel cluster tasks (reindex, snapshots, ...) the API did not
+# start. Delete-by-query tasks are watched by one shared daemon thread that
+# drops the product search cache once the deletions are done, whether or not
+# anyone polls the status endpoint. A task is given up on (and the cache
+# dropped anyway) after MAX_WAIT seconds or MAX_POLL_ERRORS failed polls in a
+# row, so an unreachable cluster cannot leave watches running forever.
+import logging
+import threading
+import time
+from django.core import signing
+from elasticsearch import NotFoundError
+from .cache import invalidate_product_search
+from .es_client import get_es_client
+
+logger = logging.getLogger(__name__)
+
+DELETE_BY_QUERY_ACTION = "indices:data/write/delete/byquery"
+POLL_INTERVAL = 1.0
+MAX_WAIT = 3600.0
+MAX_POLL_ERRORS = 30
+
+_signer = signing.Signer(salt="api.tasks")
+
+# task id -> {"deadline": monotonic time, "errors": consecutive failed polls}
+_watched = {}
+_watch_lock = threading.Lock()
+_watcher = None
+
+
+def task_handle(task_id):
+    """The client-facing handle for a task id this API started."""
+    return _signer.sign(task_id)
+
+
+def task_id_from_handle(handle):
+    """The task id behind ``handle``, or None when it was not issued by this API."""
+    try:
+        return _signer.unsign(handle)
+    except signing.BadSignature:
+        return None
+
+
+def is_delete_by_query(task):
+    return task.get("action") == DELETE_BY_QUERY_ACTION
+
+
+def invalidate_when_done(task_id):
+    """Invalidate the product search cache once delete-by-query task ``task_id`` completes."""
+    global _watcher
+    with _watch_lock:
+        _watched[task_id] = {"deadline": time.monotonic() + MAX_WAIT, "errors": 0}
+        if _watcher is None or not _watcher.is_alive():
+            _watcher = threading.Thread(target=_watch, name="task-watch", daemon=True)
+            _watcher.start()
+
+
+def _finished(es, task_id, state):
+    try:
+        if es.tasks.get(task_id=task_id).get("completed"):
+            return True
+        state["errors"] = 0
+    except NotFoundError:
+        return True
+    except Exception:
+        state["errors"] += 1
+        if state["errors"] >= MAX_POLL_ERRORS:
+            logger.warning("giving up on task %s after %d failed polls", task_id, state["errors"], exc_info=True)
+            return True
+        logger.debug("could not poll task %s", task_id, exc_info=True)
+    if time.monotonic() >= state["deadline"]:
+        logger.warning("giving up on task %s after %.0f s", task_id, MAX_WAIT)
+        return True
+    return False
+
+
+def _watch():
+    global _watcher
+    es = get_es_client()
+    while True:
+        with _watch_lock:
+            watched = list(_watched.items())
+        done = [task_id for task_id, state in watched if _finished(es, task_id, state)]
+        with _watch_lock:
+            for task_id in done:
+                _watched.pop(task_id, None)
+            idle = not _watched
+            if idle:
+                _watcher = None
+        if done:
+            invalidate_product_search(searchable=True)
+        if idle:
+            return
+        time.sleep(POLL_INTERVAL)
@@ -0,0 +1,51 @@
+# Views and helpers are exercised against the in-memory search backend
+# (SEARCH_BACKEND=memory), so the suite runs without a cluster:
+#
+#     python manage.py test api
+#
+# Every test gets a fresh backend with the registry indices created and
+# empty caches.
+from unittest import mock
+from django.test import TestCase, override_settings
+from api import cache, es_client, memory_client, token_store
+from api.cache import MISSING
+from api.utils import create_token_pair_for_user
+
+MEMORY_SETTINGS = {
+    "SEARCH_BACKEND": "memory",
+    "MEMORY_SEARCH": {"CREATE_INDICES": True, "SEED_PRODUCTS": 0, "SEED_ARTICLES": 0, "SEED": 0},
+    "PASSWORD_HASH_COST": {
+        "PBKDF2_ITERATIONS": 1000, "ARGON2_TIME_COST": 0, "ARGON2_MEMORY_COST": 0,
+        "ARGON2_PARALLELISM": 0, "BCRYPT_ROUNDS": 0,
+    },
+}
+
+
+@override_settings(**MEMORY_SETTINGS)
+class MemoryBackendTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        for target, name, value in (
+            (memory_client, "_backend", None),
+            (es_client, "_client", None),
+            (es_client, "_client_pid", None),
+            (cache, "_product_search_cache", MISSING),
+            (cache, "_product_suggest_cache", MISSING),
+            (cache, "_document_cache", MISSING),
+            (token_store, "_store", None),
+        ):
+            patcher = mock.patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.es = es_client.get_es_client()
+        self.auth = self.auth_headers("u1", "alice")
+
+    def auth_headers(self, user_id, username):
+        token = create_token_pair_for_user(user_id, username)["access"]
+        return {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+    def create_product(self, **fields):
+        data = {"sku": "SKU-1", "name": "Blue bottle", "price": 10.0, "category": "kitchen", **fields}
+        response = self.client.post("/api/products/?refresh=wait_for", data, content_type="application/json", **self.auth)
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()
@@ -0,0 +1,28 @@
+from api.tests.base import MemoryBackendTestCase
+
+
+class ArticleTests(MemoryBackendTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(3):
+            response = self.client.post("/api/articles/?refresh=wait_for", {
+                "title": f"Post {i}", "content": f"All about elasticsearch number {i}",
+            }, content_type="application/json", **self.auth)
+            self.assertEqual(response.status_code, 201, response.content)
+
+    def test_listing_is_a_bare_list_by_default(self):
+        body = self.client.get("/api/articles/", **self.auth).json()
+        self.assertIsInstance(body, list)
+        self.assertEqual(len(body), 3)
+
+    def test_envelope_and_excerpt(self):
+        body = self.client.get("/api/articles/?envelope=true&q=elasticsearch&view=excerpt", **self.auth).json()
+        self.assertEqual(body["total"], 3)
+        self.assertNotIn("content", body["items"][0])
+        self.assertIn("<em>", body["items"][0]["excerpt"])
+
+    def test_invalid_dates_are_a_400(self):
+        response = self.client.get("/api/articles/?created_from=last-week", **self.auth)
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get("/api/articles/?created_from=2000-01-01&created_to=2999-01-01", **self.auth)
+        self.assertEqual(len(response.json()), 3)
@@ -0,0 +1,65 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from api.compression import compress_response
+from api.tests.base import MemoryBackendTestCase
+
+
+class AuthTests(MemoryBackendTestCase):
+    def register_and_login(self, username="bob", password="s3cret-pass"):
+        response = self.client.post("/api/auth/register/", {
+            "username": username, "email": f"{username}@example.com", "password": password,
+        }, content_type="application/json")
+        self.assertEqual(response.status_code, 201, response.content)
+        response = self.client.post("/api/auth/login/", {"username": username, "password": password},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_register_login_and_use_token(self):
+        tokens = self.register_and_login()
+        response = self.client.get("/api/products/", HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        self.assertEqual(response.status_code, 200)
+
+    def test_duplicate_username_and_wrong_password(self):
+        self.register_and_login()
+        response = self.client.post("/api/auth/register/", {
+            "username": "bob", "email": "other@example.com", "password": "another-pass",
+        }, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post("/api/auth/login/", {"username": "bob", "password": "wrong"},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 401)
+
+    def test_revoked_refresh_token_is_rejected(self):
+        refresh = self.register_and_login()["refresh"]
+        response = self.client.post("/api/auth/token/refresh/", {"refresh": refresh}, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.client.post("/api/auth/token/revoke/", {"refresh": refresh}, content_type="application/json")
+        response = self.client.post("/api/auth/token/refresh/", {"refresh": refresh}, content_type="application/json")
+        self.assertEqual(response.status_code, 401)
+
+    def test_auth_responses_are_not_compressed(self):
+        factory = RequestFactory()
+        for path, encoding in (("/api/auth/login/", None), ("/api/auth/token/refresh/", None), ("/api/products/", "gzip")):
+            request = factory.post(path, HTTP_ACCEPT_ENCODING="gzip")
+            response = compress_response(request, HttpResponse(b'{"access": "token"}' * 100))
+            self.assertEqual(response.get("Content-Encoding"), encoding, path)
+
+
+class HealthTests(MemoryBackendTestCase):
+    def test_anonymous_callers_only_get_liveness(self):
+        self.assertEqual(self.client.get("/api/health/es/?ping=1").json(), {"ok": True})
+        self.assertEqual(self.client.get("/api/cache/stats/").status_code, 403)
+        self.assertEqual(self.client.get("/api/metrics/").status_code, 403)
+
+    def test_authenticated_callers_get_details(self):
+        body = self.client.get("/api/health/es/?ping=1", **self.auth).json()
+        self.assertTrue(body["reachable"])
+        self.assertIn("write_buffers", body)
+        self.assertEqual(self.client.get("/api/cache/stats/", **self.auth).status_code, 200)
+        self.assertEqual(self.client.get("/api/metrics/", **self.auth).status_code, 200)
+
+    @override_settings(METRICS_TOKEN="scrape-secret")
+    def test_metrics_accept_the_scrape_token(self):
+        self.assertEqual(self.client.get("/api/metrics/", HTTP_AUTHORIZATION="Bearer scrape-secret").status_code, 200)
+        self.assertEqual(self.client.get("/api/metrics/", HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
@@ -0,0 +1,126 @@
+from api.memory_client import get_memory_backend
+from api.tests.base import MemoryBackendTestCase
+
+
+class ProductCrudTests(MemoryBackendTestCase):
+    def test_requires_token(self):
+        self.assertEqual(self.client.get("/api/products/").status_code, 403)
+
+    def test_create_get_update_delete(self):
+        product = self.create_product(description="A sturdy bottle")
+        url = f"/api/products/{product['id']}/"
+
+        response = self.client.get(url, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["name"], "Blue bottle")
+        etag = response["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag, **self.auth).status_code, 304)
+
+        response = self.client.patch(url, {"price": 12.5}, content_type="application/json", HTTP_IF_MATCH=etag, **self.auth)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()["price"], 12.5)
+        stale = self.client.patch(url, {"price": 1}, content_type="application/json", HTTP_IF_MATCH=etag, **self.auth)
+        self.assertEqual(stale.status_code, 412)
+
+        self.assertEqual(self.client.delete(url, **self.auth).status_code, 204)
+        self.assertEqual(self.client.get(url, **self.auth).status_code, 404)
+
+    def test_in_stock_follows_stock(self):
+        product = self.create_product(stock=3)
+        url = f"/api/products/{product['id']}/"
+        response = self.client.patch(url + "?refresh=wait_for", {"stock": 0}, content_type="application/json", **self.auth)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual((response.json()["stock"], response.json()["in_stock"]), (0, False))
+        listed = self.client.get("/api/products/?in_stock=true", **self.auth).json()
+        self.assertNotIn(product["id"], [p["id"] for p in listed["items"]])
+
+        replacement = {"sku": "B-1", "name": "Blue bottle", "price": 9.5}
+        response = self.client.put(url, replacement, content_type="application/json", **self.auth)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("stock", response.json())
+        response = self.client.put(url, dict(replacement, stock=2, in_stock=False), content_type="application/json", **self.auth)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual((response.json()["stock"], response.json()["in_stock"]), (2, True))
+
+    def test_invalid_product_is_rejected(self):
+        response = self.client.post("/api/products/", {"name": "x"}, content_type="application/json", **self.auth)
+        self.assertEqual(response.status_code, 400)
+
+
+class ProductListingTests(MemoryBackendTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(12):
+            self.create_product(
+                sku=f"SKU-{i:02d}", name=f"Item {i}", price=float(i), description="long text",
+                category="kitchen" if i % 2 else "garden",
+            )
+
+    def test_filters_sort_and_default_excludes(self):
+        response = self.client.get("/api/products/?category=kitchen&sort=-price&size=3", **self.auth)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["total"], 6)
+        self.assertEqual([item["price"] for item in body["items"]], [11.0, 9.0, 7.0])
+        self.assertNotIn("description", body["items"][0])
+
+        body = self.client.get("/api/products/?size=1&fields=name,description", **self.auth).json()
+        self.assertEqual(set(body["items"][0]), {"id", "name", "description"})
+
+    def test_invalid_filter_is_a_400(self):
+        self.assertEqual(self.client.get("/api/products/?min_price=abc", **self.auth).status_code, 400)
+
+    def test_search_results_see_new_writes(self):
+        self.assertEqual(self.client.get("/api/products/?category=toys", **self.auth).json()["total"], 0)
+        self.create_product(sku="SKU-T", name="Kite", category="toys")
+        self.assertEqual(self.client.get("/api/products/?category=toys", **self.auth).json()["total"], 1)
+
+    def test_cursor_walks_every_product_once(self):
+        seen = []
+        cursor = "*"
+        while cursor:
+            body = self.client.get(f"/api/products/?cursor={cursor}&size=5&sort=price", **self.auth).json()
+            seen.extend(item["price"] for item in body["items"])
+            cursor = body["next_cursor"]
+        self.assertEqual(seen, [float(i) for i in range(12)])
+
+    def test_cursor_is_bound_to_its_query(self):
+        body = self.client.get("/api/products/?cursor=*&size=5&sort=price", **self.auth).json()
+        cursor = body["next_cursor"]
+        response = self.client.get(f"/api/products/?cursor={cursor}&size=5&sort=-price", **self.auth)
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(f"/api/products/?cursor={cursor}&size=5&sort=price&category=garden", **self.auth)
+        self.assertEqual(response.status_code, 400)
+
+    def test_suggest(self):
+        body = self.client.get("/api/products/suggest/?prefix=ite", **self.auth).json()
+        self.assertTrue(body["suggestions"])
+        self.assertTrue(all(s["name"].startswith("Item") for s in body["suggestions"]))
+        body = self.client.get("/api/products/suggest/?prefix=sku-0", **self.auth).json()
+        self.assertTrue(body["suggestions"])
+
+    def test_suggest_forgets_deleted_products(self):
+        self.assertTrue(self.client.get("/api/products/suggest/?prefix=ite", **self.auth).json()["suggestions"])
+        self.assertEqual(self.client.delete("/api/products/index/", **self.auth).status_code, 204)
+        body = self.client.get("/api/products/suggest/?prefix=ite", **self.auth).json()
+        self.assertEqual(body["suggestions"], [])
+
+    def test_facets(self):
+        body = self.client.get("/api/products/?facets=category", **self.auth).json()
+        counts = {f["value"]: f["count"] for f in body["facets"]["category"]}
+        self.assertEqual(counts, {"kitchen": 6, "garden": 6})
+
+    def test_export_rejects_bad_filters_before_opening_a_pit(self):
+        response = self.client.get("/api/products/export?min_price=abc", **self.auth)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(get_memory_backend().pits, {})
+
+    def test_delete_by_query_task(self):
+        response = self.client.post("/api/products/_delete_by_query", {"category": "garden"},
+                                    content_type="application/json", **self.auth)
+        self.assertEqual(response.status_code, 202, response.content)
+        status_url = response.json()["status_url"]
+        body = self.client.get(status_url, **self.auth).json()
+        self.assertTrue(body["completed"])
+        self.assertEqual(self.client.get("/api/products/", **self.auth).json()["total"], 6)
+        self.assertEqual(self.client.get("/api/tasks/not-a-handle/", **self.auth).status_code, 404)
@@ -0,0 +1,88 @@
+# Parity checks for the painless scripts and the Python equivalents the
+# in-memory backend runs for them. The cases always run against
+# SEARCH_BACKEND=memory; set ELASTICSEARCH_TEST_URL to run the same cases
+# against a real cluster (a throwaway index is created and deleted).
+import importlib
+import os
+import pkgutil
+import unittest
+import uuid
+from django.test import SimpleTestCase
+from elasticsearch import Elasticsearch
+import api
+from api.inventory import stock_script
+from api.scripts import python_equivalent
+from api.tests.base import MemoryBackendTestCase
+from api.token_store import REVOKE_SCRIPT
+
+NOW = "2030-01-01T00:00:00"
+
+
+def _stock(source, expected, **kwargs):
+    script = stock_script(**kwargs)
+    script["params"]["now"] = NOW
+    return source, script, expected
+
+
+STOCK_CASES = [
+    _stock({"stock": 5}, {"stock": 3, "in_stock": True, "updated_at": NOW}, delta=-2),
+    _stock({"stock": 1}, {"stock": 0, "in_stock": False, "updated_at": NOW}, delta=-1),
+    _stock({"stock": 1}, None, delta=-2),
+    _stock({"stock": 1}, {"stock": -1, "in_stock": False, "updated_at": NOW}, delta=-2, allow_negative=True),
+    _stock({}, {"stock": 3, "in_stock": True, "updated_at": NOW}, delta=3),
+    _stock({"stock": 2}, {"stock": 7, "in_stock": True, "updated_at": NOW}, set_to=7),
+]
+REVOKE = {"source": REVOKE_SCRIPT, "lang": "painless", "params": {"now": NOW}}
+REVOKE_CASES = [
+    ({"jti": "a"}, REVOKE, {"revoked_at": NOW}),
+    ({"jti": "a", "revoked_at": "2029-01-01T00:00:00"}, REVOKE, None),
+]
+
+
+class ScriptParityMixin:
+    """Runs each (source, script, expected) case; expected None means the script is a noop."""
+
+    def run_cases(self, es, index):
+        for source, script, expected in STOCK_CASES + REVOKE_CASES:
+            with self.subTest(source=source, params=script["params"]):
+                doc_id = str(uuid.uuid4())
+                es.index(index=index, id=doc_id, document=source, refresh="wait_for")
+                res = es.update(index=index, id=doc_id, script=script)
+                stored = es.get(index=index, id=doc_id)["_source"]
+                if expected is None:
+                    self.assertEqual(res["result"], "noop")
+                    self.assertEqual(stored, source)
+                else:
+                    self.assertEqual(res["result"], "updated")
+                    self.assertEqual(stored, {**source, **expected})
+
+
+class MemoryScriptParityTests(ScriptParityMixin, MemoryBackendTestCase):
+    def test_scripts(self):
+        self.run_cases(self.es, "products")
+
+
+@unittest.skipUnless(os.environ.get("ELASTICSEARCH_TEST_URL"), "set ELASTICSEARCH_TEST_URL to check against a cluster")
+class ClusterScriptParityTests(ScriptParityMixin, SimpleTestCase):
+    def test_scripts(self):
+        es = Elasticsearch(os.environ["ELASTICSEARCH_TEST_URL"])
+        index = f"script-parity-{uuid.uuid4().hex}"
+        es.indices.create(index=index)
+        try:
+            self.run_cases(es, index)
+        finally:
+            es.indices.delete(index=index)
+
+
+class ScriptRegistryTests(SimpleTestCase):
+    def test_every_app_script_has_a_python_equivalent(self):
+        scripts = {}
+        for info in pkgutil.iter_modules(api.__path__):
+            module = importlib.import_module(f"api.{info.name}")
+            for name, value in vars(module).items():
+                if name.endswith("_SCRIPT") and isinstance(value, str) and "ctx." in value:
+                    scripts[f"{info.name}.{name}"] = value
+        self.assertTrue(scripts)
+        for name, source in scripts.items():
+            self.assertIsNotNone(python_equivalent(source), name)
+            self.assertIsNotNone(python_equivalent("  " + source.replace("\n", "\n  ")), name)
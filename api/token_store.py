@@ -0,0 +1,226 @@
+# Refresh-token state: which refresh tokens were issued and which have been
+# revoked. The database store keeps using SimpleJWT's blacklist tables; the
+# Elasticsearch store keeps one document per jti in the "tokens" index, so
+# every node shares the state without a local SQLite file. Revocation checks
+# go through an in-process front cache: a revocation is final, so a revoked
+# jti is cached until the token expires, while "not revoked" answers are
+# only trusted for a few seconds.
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, transaction
+from django.utils.module_loading import import_string
+from elasticsearch import NotFoundError
+from .cache import MISSING, LocalLRUCache, register_cache
+from .es_client import get_es_client
+from .scripts import painless
+
+logger = logging.getLogger(__name__)
+
+TOKEN_STORE_BACKENDS = {
+    "elasticsearch": "api.token_store.ElasticsearchTokenStore",
+    "database": "api.token_store.DatabaseTokenStore",
+}
+
+REVOKE_SCRIPT = """
+if (ctx._source.revoked_at != null) {
+  ctx.op = 'noop';
+} else {
+  ctx._source.revoked_at = params.now;
+}
+"""
+
+
+@painless(REVOKE_SCRIPT)
+def _revoke_script(source, params):
+    if source.get("revoked_at") is not None:
+        return False
+    source["revoked_at"] = params["now"]
+    return True
+
+
+def _utc(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+class TokenStore:
+    """
+    Interface for refresh-token state. ``revoke`` must be atomic: when two
+    requests revoke the same jti at once, exactly one of them gets True, so
+    a rotated refresh token can be exchanged only once.
+    """
+
+    def record(self, jti, user_id, expires_at, token=None):
+        """Remember an issued refresh token (``expires_at`` is a Unix timestamp)."""
+        raise NotImplementedError
+
+    def revoke(self, jti, user_id, expires_at):
+        """Revoke ``jti``; True when this call revoked it, False when it already was."""
+        raise NotImplementedError
+
+    def is_revoked(self, jti, expires_at=None):
+        raise NotImplementedError
+
+    def purge_expired(self):
+        """Drop state for tokens past their expiry; returns how many were removed."""
+        raise NotImplementedError
+
+
+class ElasticsearchTokenStore(TokenStore):
+    """Token state in the ``tokens`` index, one document per jti. Raw tokens are never stored."""
+
+    def __init__(self, index=None):
+        self.index = index or settings.TOKEN_STORE["INDEX"]
+
+    def record(self, jti, user_id, expires_at, token=None):
+        get_es_client().index(index=self.index, id=jti, document={
+            "user_id": user_id,
+            "issued_at": datetime.now(timezone.utc).isoformat(),
+            "expires_at": _utc(expires_at).isoformat(),
+            "revoked_at": None,
+        })
+
+    def revoke(self, jti, user_id, expires_at):
+        now = datetime.now(timezone.utc).isoformat()
+        # The upsert covers tokens that were never recorded; for recorded ones
+        # the script turns a second revocation into a noop, and concurrent
+        # revocations of one jti are serialized by its version.
+        res = get_es_client().update(
+            index=self.index,
+            id=jti,
+            script={"source": REVOKE_SCRIPT, "lang": "painless", "params": {"now": now}},
+            upsert={"user_id": user_id, "expires_at": _utc(expires_at).isoformat(), "revoked_at": now},
+            retry_on_conflict=5,
+        )
+        return res.get("result") != "noop"
+
+    def is_revoked(self, jti, expires_at=None):
+        try:
+            res = get_es_client().get(index=self.index, id=jti, source_includes=["revoked_at"])
+        except NotFoundError:
+            return False
+        return res.get("_source", {}).get("revoked_at") is not None
+
+    def purge_expired(self):
+        try:
+            res = get_es_client().delete_by_query(
+                index=self.index, query={"range": {"expires_at": {"lt": "now"}}}, conflicts="proceed"
+            )
+        except NotFoundError:
+            return 0
+        return res.get("deleted", 0)
+
+
+class DatabaseTokenStore(TokenStore):
+    """SimpleJWT's OutstandingToken/BlacklistedToken tables (the original setup)."""
+
+    def __init__(self):
+        if "rest_framework_simplejwt.token_blacklist" not in settings.INSTALLED_APPS:
+            raise ImproperlyConfigured("TOKEN_STORE_BACKEND=database needs rest_framework_simplejwt.token_blacklist installed")
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+        self.outstanding = OutstandingToken
+        self.blacklisted = BlacklistedToken
+
+    def _outstanding(self, jti, expires_at, token=None):
+        try:
+            with transaction.atomic():
+                outstanding, _ = self.outstanding.objects.get_or_create(jti=jti, defaults={
+                    "token": token or "",
+                    "created_at": datetime.now(timezone.utc),
+                    "expires_at": _utc(expires_at),
+                })
+        except IntegrityError:
+            # A concurrent request recorded the same jti first.
+            outstanding = self.outstanding.objects.get(jti=jti)
+        return outstanding
+
+    def record(self, jti, user_id, expires_at, token=None):
+        # Users live in Elasticsearch, so the user foreign key stays empty.
+        self._outstanding(jti, expires_at, token)
+
+    def revoke(self, jti, user_id, expires_at):
+        outstanding = self._outstanding(jti, expires_at)
+        try:
+            with transaction.atomic():
+                _, created = self.blacklisted.objects.get_or_create(token=outstanding)
+        except IntegrityError:
+            # A concurrent revoke of the same token won the race.
+            return False
+        return created
+
+    def is_revoked(self, jti, expires_at=None):
+        return self.blacklisted.objects.filter(token__jti=jti).exists()
+
+    def purge_expired(self):
+        _, per_model = self.outstanding.objects.filter(expires_at__lte=datetime.now(timezone.utc)).delete()
+        return per_model.get(self.outstanding._meta.label, 0)
+
+
+class CachedTokenStore:
+    """Front cache for ``is_revoked`` in front of any TokenStore."""
+
+    def __init__(self, store, max_entries, negative_ttl):
+        self.store = store
+        self.negative_ttl = negative_ttl
+        self.cache = LocalLRUCache(max_entries=max_entries, ttl=negative_ttl)
+
+    def record(self, jti, user_id, expires_at, token=None):
+        return self.store.record(jti, user_id, expires_at, token)
+
+    def revoke(self, jti, user_id, expires_at):
+        revoked = self.store.revoke(jti, user_id, expires_at)
+        self.cache.set(jti, True, expires_at - time.time())
+        return revoked
+
+    def is_revoked(self, jti, expires_at=None):
+        cached = self.cache.get(jti, MISSING)
+        if cached is not MISSING:
+            return cached
+        revoked = self.store.is_revoked(jti)
+        if revoked:
+            ttl = expires_at - time.time() if expires_at is not None else None
+        else:
+            ttl = self.negative_ttl
+        self.cache.set(jti, revoked, ttl)
+        return revoked
+
+    def purge_expired(self):
+        return self.store.purge_expired()
+
+    def stats(self):
+        return dict(self.cache.stats(), store=type(self.store).__name__)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_token_store():
+    """The process-wide token store selected by ``TOKEN_STORE["BACKEND"]``."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                config = settings.TOKEN_STORE
+                backend = TOKEN_STORE_BACKENDS.get(config["BACKEND"], config["BACKEND"])
+                store = import_string(backend)()
+                if config["CACHE_MAX_ENTRIES"] > 0:
+                    store = register_cache("token_revocations", CachedTokenStore(
+                        store, config["CACHE_MAX_ENTRIES"], config["CACHE_NEGATIVE_TTL"]
+                    ))
+                _store = store
+    return _store
+
+
+def record_issued(refresh):
+    """Write-through for a newly issued RefreshToken; failures are logged, not raised."""
+    if not settings.TOKEN_STORE["RECORD_ISSUED"]:
+        return
+    try:
+        get_token_store().record(refresh["jti"], refresh.get("sub"), refresh["exp"], token=str(refresh))
+    except Exception:
+        logger.warning("could not record refresh token %s", refresh.get("jti"), exc_info=True)
@@ -1,14 +1,39 @@
 # backend/api/urls.py
 from django.urls import path
 from django.http import JsonResponse
-from .views import RegisterView, LoginView, ArticleListCreateView, ArticleDetailView
-from rest_framework_simplejwt.views import TokenRefreshView
+from .views import (
+    RegisterView,
+    LoginView,
+    TokenRefreshView,
+    TokenRevokeView,
+    ArticleListCreateView,
+    ArticleMGetView,
+    ArticleDetailView,
+    ElasticsearchHealthView,
+    CacheStatsView,
+    TaskStatusView,
+    metrics_view,
+)
 from .products import (
     ProductIndexCreateView,
     ProductIndexDeleteView,
     ProductListCreateView,
+    ProductBulkView,
+    ProductExportView,
+    ProductSuggestView,
+    ProductStockView,
+    ProductBulkStockView,
+    ProductBulkDeleteView,
+    ProductDeleteByQueryView,
+    ProductMGetView,
     ProductDetailView,
 )
+from .async_views import (
+    AsyncArticleDetailView,
+    AsyncArticleListView,
+    AsyncProductDetailView,
+    AsyncProductListView,
+)
 
 def api_root(request):
     return JsonResponse({
@@ -18,21 +43,44 @@ def api_root(request):
             "login": "/api/auth/login/",
             "refresh": "/api/auth/token/refresh/",
             "articles": "/api/articles/",
-            "products": "/api/products/"
+            "products": "/api/products/",
+            "async_products": "/api/async/products/",
+            "es_health": "/api/health/es/",
+            "cache_stats": "/api/cache/stats/",
+            "metrics": "/api/metrics/"
         }
     })
 
 urlpatterns = [
     path("", api_root, name="api_root"),  # <-- this is the new root route
+    path("health/es/", ElasticsearchHealthView.as_view(), name="es_health"),
+    path("cache/stats/", CacheStatsView.as_view(), name="cache_stats"),
+    path("metrics/", metrics_view, name="metrics"),
+    path("tasks/<str:task_id>/", TaskStatusView.as_view(), name="task_status"),
     path("auth/register/", RegisterView.as_view(), name="register"),
     path("auth/login/", LoginView.as_view(), name="login"),
     path("auth/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("auth/token/revoke/", TokenRevokeView.as_view(), name="token_revoke"),
 
     path("articles/", ArticleListCreateView.as_view(), name="articles_list_create"),
+    path("articles/_mget", ArticleMGetView.as_view(), name="articles_mget"),
     path("articles/<str:pk>/", ArticleDetailView.as_view(), name="article_detail"),
 
+    path("async/articles/", AsyncArticleListView.as_view(), name="async_articles_list"),
+    path("async/articles/<str:pk>/", AsyncArticleDetailView.as_view(), name="async_article_detail"),
+    path("async/products/", AsyncProductListView.as_view(), name="async_products_list"),
+    path("async/products/<str:pk>/", AsyncProductDetailView.as_view(), name="async_product_detail"),
+
     path("products/index/create/", ProductIndexCreateView.as_view(), name="products_index_create"),
     path("products/index/", ProductIndexDeleteView.as_view(), name="products_index_delete"),
     path("products/", ProductListCreateView.as_view(), name="products_list_create"),
+    path("products/bulk/", ProductBulkView.as_view(), name="products_bulk"),
+    path("products/export", ProductExportView.as_view(), name="products_export"),
+    path("products/suggest/", ProductSuggestView.as_view(), name="products_suggest"),
+    path("products/_mget", ProductMGetView.as_view(), name="products_mget"),
+    path("products/stock/_bulk", ProductBulkStockView.as_view(), name="products_stock_bulk"),
+    path("products/_delete", ProductBulkDeleteView.as_view(), name="products_bulk_delete"),
+    path("products/_delete_by_query", ProductDeleteByQueryView.as_view(), name="products_delete_by_query"),
     path("products/<str:pk>/", ProductDetailView.as_view(), name="product_detail"),
+    path("products/<str:pk>/stock/", ProductStockView.as_view(), name="product_stock"),
 ]
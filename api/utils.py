@@ -1,17 +1,107 @@
+import os
+import threading
+import uuid
 from datetime import datetime
+from django.conf import settings
 from django.contrib.auth.hashers import make_password, check_password
-from rest_framework_simplejwt.tokens import RefreshToken
+from .token_store import record_issued
+
+
+# Users are stored under an id derived from their normalized username, so a
+# login is a realtime GET and registration an atomic create. Changing this
+# namespace or the normalization orphans every existing user document.
+USER_ID_NAMESPACE = uuid.UUID("6f1c0b5e-3b0e-5a4c-9d8e-2a7f4e1c9b3d")
+
+
+def normalize_username(username: str) -> str:
+    return username.strip().casefold()
+
+
+def user_id_for(username: str) -> str:
+    return str(uuid.uuid5(USER_ID_NAMESPACE, normalize_username(username)))
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when no password hashing slot is free in time."""
+
+
+# Password hashing is CPU bound, so only PASSWORD_HASH_WORKERS hashes run at
+# once; they run inline on the request thread, which would be waiting for
+# the result anyway. A second semaphore caps running plus waiting callers so
+# that callers beyond PASSWORD_HASH_QUEUE fail fast instead of piling up
+# behind a login burst.
+_hash_slots = None
+_hash_admission = None
+_hash_pid = None
+_hash_lock = threading.Lock()
+
+
+def _get_hash_slots():
+    global _hash_slots, _hash_admission, _hash_pid
+    pid = os.getpid()
+    if _hash_slots is None or _hash_pid != pid:
+        with _hash_lock:
+            if _hash_slots is None or _hash_pid != pid:
+                workers = settings.PASSWORD_HASH_WORKERS
+                _hash_slots = threading.BoundedSemaphore(workers)
+                _hash_admission = threading.BoundedSemaphore(workers + settings.PASSWORD_HASH_QUEUE)
+                _hash_pid = pid
+    return _hash_slots, _hash_admission
+
+
+def run_hashing(fn, *args):
+    """
+    Run ``fn(*args)`` once a hashing slot is free. Raises PasswordHashingBusy
+    when PASSWORD_HASH_QUEUE callers are already waiting, or when no slot
+    frees up within PASSWORD_HASH_QUEUE_TIMEOUT seconds.
+    """
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return fn(*args)
+    slots, admission = _get_hash_slots()
+    if not admission.acquire(blocking=False):
+        raise PasswordHashingBusy("password hashing queue is full")
+    try:
+        if not slots.acquire(timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT):
+            raise PasswordHashingBusy("no password hashing slot became free")
+        try:
+            return fn(*args)
+        finally:
+            slots.release()
+    finally:
+        admission.release()
+
 
 def hash_password(raw_password: str) -> str:
-    return make_password(raw_password)
+    return run_hashing(make_password, raw_password)
+
+
+def _check(raw_password, stored_hash):
+    needs_rehash = []
+    ok = check_password(raw_password, stored_hash, setter=needs_rehash.append)
+    return ok, bool(needs_rehash)
+
+
+def verify_password(stored_hash: str, raw_password: str, on_rehash=None) -> bool:
+    """
+    Check ``raw_password`` against ``stored_hash``. When the hash was made
+    with a non-preferred hasher or an outdated cost, ``on_rehash`` is called
+    with a fresh hash so the caller can persist it.
+    """
+    ok, needs_rehash = run_hashing(_check, raw_password, stored_hash)
+    if ok and needs_rehash and on_rehash is not None:
+        on_rehash(hash_password(raw_password))
+    return ok
 
-def verify_password(stored_hash: str, raw_password: str) -> bool:
-    return check_password(raw_password, stored_hash)
 
 def create_token_pair_for_user(user_id: str, username: str) -> dict:
+    # Imported on first use: the tokens module pulls in Django's auth and
+    # token blacklist models, which requests that only verify tokens never need.
+    from rest_framework_simplejwt.tokens import RefreshToken
+
     refresh = RefreshToken()
     refresh["sub"] = user_id
     refresh["username"] = username
     refresh["created_at_iso"] = datetime.utcnow().isoformat()
+    record_issued(refresh)
     access = refresh.access_token
     return {"access": str(access), "refresh": str(refresh)}
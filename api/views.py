@@ -1,16 +1,52 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .serializers import RegisterSerializer, LoginSerializer, ArticleSerializer
-from .es_client import get_es_client
-from .utils import hash_password, verify_password, create_token_pair_for_user
-from .permissions import IsAuthenticatedFromJWT
+from elasticsearch import ConflictError, NotFoundError
+from .serializers import RegisterSerializer, LoginSerializer, ArticleSerializer, MGetSerializer, RefreshTokenSerializer
+from .es_client import get_es_client, get_es_pool_stats
+from .utils import PasswordHashingBusy, hash_password, verify_password, create_token_pair_for_user, user_id_for
+from .permissions import IsAuthenticatedFromJWT, jwt_payload_from_request
+from .cache import cache_stats, get_document_cache, get_product_search_cache
+from .documents import (
+    document_response,
+    fetch_document,
+    invalid_refresh,
+    invalidate_document,
+    mget_response,
+    parse_if_match,
+    precondition_failed,
+    refresh_kwargs,
+    store_document,
+    update_document,
+    write_response,
+)
+from .pagination import InvalidCursor, parse_page_params, parse_track_total, read_total, search_pit_page
+from .query_builder import InvalidQuery, build_article_search_body
+from django.conf import settings
+from django.http import HttpResponse
+from .metrics import render_prometheus
+from .tasks import is_delete_by_query, task_id_from_handle
+from .write_buffer import write_buffer_stats
+from .token_store import get_token_store
 from datetime import datetime
+import hmac
+import logging
+import math
 import uuid
 
 USER_INDEX = "users"
 ARTICLE_INDEX = "articles"
 
+logger = logging.getLogger(__name__)
+
+# Newest first; the point-in-time adds an implicit _shard_doc tiebreaker.
+ARTICLE_CURSOR_SORT = [{"created_at": {"order": "desc", "missing": "_last"}}]
+
+def hashing_busy_response():
+    response = Response({"detail": "authentication is busy, retry shortly"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response["Retry-After"] = "1"
+    return response
+
 class RegisterView(APIView):
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
@@ -18,12 +54,11 @@ class RegisterView(APIView):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         es = get_es_client()
         username = serializer.validated_data["username"]
-        q = {"query": {"term": {"username.keyword": username}}}
-        res = es.search(index=USER_INDEX, body=q, size=1, ignore_unavailable=True)
-        if res.get("hits", {}).get("total", {}).get("value", 0) > 0:
-            return Response({"detail": "username already exists"}, status=status.HTTP_400_BAD_REQUEST)
-        user_id = str(uuid.uuid4())
-        hashed = hash_password(serializer.validated_data["password"])
+        user_id = user_id_for(username)
+        try:
+            hashed = hash_password(serializer.validated_data["password"])
+        except PasswordHashingBusy:
+            return hashing_busy_response()
         doc = {
             "id": user_id,
             "username": username,
@@ -31,7 +66,12 @@ class RegisterView(APIView):
             "password": hashed,
             "created_at": datetime.utcnow().isoformat(),
         }
-        es.index(index=USER_INDEX, id=user_id, document=doc)
+        # op_type=create fails if the id is taken, so two concurrent
+        # registrations of the same name cannot both succeed.
+        try:
+            es.create(index=USER_INDEX, id=user_id, document=doc)
+        except ConflictError:
+            return Response({"detail": "username already exists"}, status=status.HTTP_400_BAD_REQUEST)
         return Response({"id": user_id, "username": username, "email": doc["email"]}, status=status.HTTP_201_CREATED)
 
 class LoginView(APIView):
@@ -40,29 +80,165 @@ class LoginView(APIView):
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         es = get_es_client()
-        username = serializer.validated_data["username"]
-        q = {"query": {"term": {"username.keyword": username}}}
-        res = es.search(index=USER_INDEX, body=q, size=1, ignore_unavailable=True)
-        hits = res.get("hits", {}).get("hits", [])
-        if not hits:
+        doc_id = user_id_for(serializer.validated_data["username"])
+        try:
+            res = es.get(index=USER_INDEX, id=doc_id)
+        except NotFoundError:
             return Response({"detail": "invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
-        user_doc = hits[0]["_source"]
-        if not verify_password(user_doc["password"], serializer.validated_data["password"]):
+        user_doc = res["_source"]
+
+        def rehash(new_hash):
+            # The hasher or its cost changed since this hash was stored.
+            try:
+                es.update(index=USER_INDEX, id=doc_id, doc={"password": new_hash, "updated_at": datetime.utcnow().isoformat()})
+            except Exception:
+                logger.warning("could not store rehashed password for user %s", doc_id, exc_info=True)
+
+        try:
+            valid = verify_password(user_doc["password"], serializer.validated_data["password"], on_rehash=rehash)
+        except PasswordHashingBusy:
+            return hashing_busy_response()
+        if not valid:
             return Response({"detail": "invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
         tokens = create_token_pair_for_user(user_doc["id"], user_doc["username"])
         return Response(tokens)
 
+def token_not_valid(detail="Token is invalid or expired"):
+    # Same body SimpleJWT's own views return for a bad token.
+    return Response({"detail": detail, "code": "token_not_valid"}, status=status.HTTP_401_UNAUTHORIZED)
+
+def parse_refresh_token(raw):
+    """Verified RefreshToken for ``raw``, or None when it is malformed, expired or not a refresh token."""
+    from rest_framework_simplejwt.exceptions import TokenError
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    try:
+        return RefreshToken(raw)
+    except TokenError:
+        return None
+
+class TokenRefreshView(APIView):
+    """
+    Exchange a refresh token for a new access token. With
+    ROTATE_REFRESH_TOKENS a new refresh token is issued too and, with
+    BLACKLIST_AFTER_ROTATION, the old one is revoked atomically in the token
+    store, so a refresh token can only be exchanged once.
+    """
+
+    def post(self, request):
+        serializer = RefreshTokenSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        refresh = parse_refresh_token(serializer.validated_data["refresh"])
+        if refresh is None:
+            return token_not_valid()
+        jti, exp, user_id = refresh["jti"], refresh["exp"], refresh.get("sub")
+        store = get_token_store()
+        jwt_settings = settings.SIMPLE_JWT
+        rotate = jwt_settings.get("ROTATE_REFRESH_TOKENS", False)
+        if rotate and jwt_settings.get("BLACKLIST_AFTER_ROTATION", True):
+            if not store.revoke(jti, user_id, exp):
+                return token_not_valid("Token is blacklisted")
+        elif store.is_revoked(jti, exp):
+            return token_not_valid("Token is blacklisted")
+        if rotate:
+            return Response(create_token_pair_for_user(user_id, refresh.get("username")))
+        return Response({"access": str(refresh.access_token)})
+
+class TokenRevokeView(APIView):
+    """Revoke a refresh token (logout); later refreshes with it get 401."""
+
+    def post(self, request):
+        serializer = RefreshTokenSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        refresh = parse_refresh_token(serializer.validated_data["refresh"])
+        if refresh is None:
+            return token_not_valid()
+        get_token_store().revoke(refresh["jti"], refresh.get("sub"), refresh["exp"])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+def article_items(hits):
+    items = []
+    for h in hits:
+        # Updated in place, like hits_to_items; the response is ours alone.
+        item = h.get("_source")
+        if item is None:
+            item = {}
+        item["id"] = h.get("_id")
+        highlight = h.get("highlight")
+        if highlight:
+            if "content" in highlight:
+                item["excerpt"] = highlight["content"][0]
+            if "title" in highlight:
+                item["title_highlight"] = highlight["title"][0]
+        items.append(item)
+    return items
+
+def wants_envelope(params):
+    return str(params.get("envelope", "")).lower() in ("1", "true", "yes")
+
+def article_page_payload(res, page, size, envelope=True):
+    """The page-mode listing: the items/total object, or the original bare list."""
+    if not envelope:
+        return article_items(res.get("hits", {}).get("hits", []))
+    total_hits, relation = read_total(res)
+    return {
+        "items": article_items(res.get("hits", {}).get("hits", [])),
+        "total": total_hits,
+        "total_relation": relation,
+        "page": page,
+        "size": size,
+        "total_pages": math.ceil(total_hits / size) if total_hits is not None else None
+    }
+
 class ArticleListCreateView(APIView):
     permission_classes = [IsAuthenticatedFromJWT]
 
     def get(self, request):
         es = get_es_client()
-        q = {"query": {"match_all": {}}}
-        res = es.search(index=ARTICLE_INDEX, body=q, size=100, ignore_unavailable=True)
-        items = [ {**h["_source"], "id": h["_id"]} for h in res.get("hits", {}).get("hits", []) ]
-        return Response(items)
+        params = request.query_params
+        track_total = parse_track_total(params.get("track_total"), settings.ARTICLE_TRACK_TOTAL_HITS)
+        try:
+            body = build_article_search_body(params, track_total)
+        except InvalidQuery as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        cursor = params.get("cursor")
+        if cursor is not None:
+            _, size = parse_page_params(params, settings.ARTICLE_PAGE_SIZE)
+            body["sort"] = body.get("sort") or ARTICLE_CURSOR_SORT
+            try:
+                res, next_cursor = search_pit_page(
+                    es, ARTICLE_INDEX, body, cursor, size, settings.ARTICLE_CURSOR_KEEP_ALIVE
+                )
+            except InvalidCursor as exc:
+                return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+            if res is None:
+                return Response({"items": [], "total": 0, "total_relation": "eq", "size": size, "next_cursor": None})
+            total_hits, relation = read_total(res)
+            return Response({
+                "items": article_items(res.get("hits", {}).get("hits", [])),
+                "total": total_hits,
+                "total_relation": relation,
+                "size": size,
+                "next_cursor": next_cursor
+            })
+
+        page, size = parse_page_params(params, settings.ARTICLE_PAGE_SIZE)
+        from_ = (page - 1) * size
+        if from_ + size > settings.ARTICLE_MAX_RESULT_WINDOW:
+            return Response(
+                {"detail": f"page window exceeds {settings.ARTICLE_MAX_RESULT_WINDOW} results; use cursor pagination (cursor=*)"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        res = es.search(index=ARTICLE_INDEX, body=body, from_=from_, size=size, ignore_unavailable=True)
+        return Response(article_page_payload(res, page, size, envelope=wants_envelope(params)))
 
     def post(self, request):
+        write_kwargs = refresh_kwargs(request)
+        if write_kwargs is None:
+            return invalid_refresh()
         serializer = ArticleSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -71,41 +247,173 @@ class ArticleListCreateView(APIView):
         doc["author"] = getattr(request, "user_payload", {}).get("username", "unknown")
         doc["created_at"] = datetime.utcnow().isoformat()
         new_id = str(uuid.uuid4())
-        es.index(index=ARTICLE_INDEX, id=new_id, document=doc)
+        es.index(index=ARTICLE_INDEX, id=new_id, document=doc, **write_kwargs)
         doc["id"] = new_id
         return Response(doc, status=status.HTTP_201_CREATED)
 
+class ArticleMGetView(APIView):
+    permission_classes = [IsAuthenticatedFromJWT]
+
+    def post(self, request):
+        serializer = MGetSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return mget_response(get_es_client(), ARTICLE_INDEX, serializer.validated_data)
+
 class ArticleDetailView(APIView):
     permission_classes = [IsAuthenticatedFromJWT]
 
     def get(self, request, pk):
         es = get_es_client()
-        try:
-            res = es.get(index=ARTICLE_INDEX, id=pk)
-        except Exception:
+        entry = fetch_document(es, ARTICLE_INDEX, pk)
+        if entry is None:
             return Response(status=status.HTTP_404_NOT_FOUND)
-        doc = res["_source"]
-        doc["id"] = pk
-        return Response(doc)
+        return document_response(request, entry, pk)
 
     def put(self, request, pk):
+        write_kwargs = refresh_kwargs(request)
+        if write_kwargs is None:
+            return invalid_refresh()
         serializer = ArticleSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            if_match = parse_if_match(request.headers.get("If-Match"))
+        except ValueError as exc:
+            return precondition_failed(str(exc))
         es = get_es_client()
         try:
             doc = serializer.validated_data
             doc["updated_at"] = datetime.utcnow().isoformat()
-            es.index(index=ARTICLE_INDEX, id=pk, document=doc)
+            res = es.index(index=ARTICLE_INDEX, id=pk, document=doc, **if_match, **write_kwargs)
+        except ConflictError:
+            invalidate_document(ARTICLE_INDEX, pk)
+            return precondition_failed()
         except Exception:
+            invalidate_document(ARTICLE_INDEX, pk)
             return Response(status=status.HTTP_404_NOT_FOUND)
-        doc["id"] = pk
-        return Response(doc)
+        entry = store_document(ARTICLE_INDEX, pk, dict(doc), res)
+        return write_response(entry, pk)
+
+    def patch(self, request, pk):
+        write_kwargs = refresh_kwargs(request)
+        if write_kwargs is None:
+            return invalid_refresh()
+        serializer = ArticleSerializer(data=request.data, partial=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if not serializer.validated_data:
+            return Response({"detail": "no fields to update"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            if_match = parse_if_match(request.headers.get("If-Match"))
+        except ValueError as exc:
+            return precondition_failed(str(exc))
+        partial = dict(serializer.validated_data, updated_at=datetime.utcnow().isoformat())
+        try:
+            entry = update_document(get_es_client(), ARTICLE_INDEX, pk, partial, if_match, **write_kwargs)
+        except NotFoundError:
+            invalidate_document(ARTICLE_INDEX, pk)
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        except ConflictError:
+            invalidate_document(ARTICLE_INDEX, pk)
+            return precondition_failed()
+        return write_response(entry, pk)
 
     def delete(self, request, pk):
+        write_kwargs = refresh_kwargs(request)
+        if write_kwargs is None:
+            return invalid_refresh()
         es = get_es_client()
         try:
-            es.delete(index=ARTICLE_INDEX, id=pk)
+            es.delete(index=ARTICLE_INDEX, id=pk, **write_kwargs)
         except Exception:
             pass
+        invalidate_document(ARTICLE_INDEX, pk)
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+class ElasticsearchHealthView(APIView):
+    """
+    Liveness for anyone; pool, buffer and cluster details only with a valid
+    token, so anonymous callers can neither read them nor trigger pings.
+    """
+
+    def get(self, request):
+        if jwt_payload_from_request(request) is None:
+            return Response({"ok": True})
+        stats = get_es_pool_stats()
+        if str(request.query_params.get("ping", "")).lower() in ("1", "true", "yes"):
+            try:
+                stats["reachable"] = bool(get_es_client().ping())
+            except Exception:
+                stats["reachable"] = False
+        stats["write_buffers"] = write_buffer_stats()
+        return Response(stats)
+
+class TaskStatusView(APIView):
+    """Progress of a delete-by-query task started by this API, addressed by its signed handle."""
+    permission_classes = [IsAuthenticatedFromJWT]
+
+    def _task(self, es, handle):
+        task_id = task_id_from_handle(handle)
+        if task_id is None:
+            return None, None
+        try:
+            res = es.tasks.get(task_id=task_id)
+        except NotFoundError:
+            return task_id, None
+        if not is_delete_by_query(res.get("task", {})):
+            return task_id, None
+        return task_id, res
+
+    def get(self, request, task_id):
+        es = get_es_client()
+        _, res = self._task(es, task_id)
+        if res is None:
+            return Response({"detail": "task not found"}, status=status.HTTP_404_NOT_FOUND)
+        task = res.get("task", {})
+        payload = {
+            "task": task_id,
+            "action": task.get("action"),
+            "description": task.get("description"),
+            "completed": bool(res.get("completed")),
+            "running_time_ms": task.get("running_time_in_nanos", 0) // 1_000_000,
+            "status": task.get("status", {}),
+        }
+        if res.get("completed"):
+            payload["response"] = res.get("response")
+            if res.get("error"):
+                payload["error"] = res["error"]
+        return Response(payload)
+
+    def delete(self, request, task_id):
+        es = get_es_client()
+        es_task_id, res = self._task(es, task_id)
+        if res is None:
+            return Response({"detail": "task not found"}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            es.tasks.cancel(task_id=es_task_id)
+        except NotFoundError:
+            return Response({"detail": "task not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(status=status.HTTP_202_ACCEPTED)
+
+def _is_metrics_scraper(request):
+    token = settings.METRICS_TOKEN
+    auth = request.headers.get("Authorization", "")
+    return bool(token) and hmac.compare_digest(auth.encode(), f"Bearer {token}".encode())
+
+def metrics_view(request):
+    # Plain Django view: the Prometheus text format is not JSON, and scrapes
+    # should not go through DRF content negotiation. Route names and timings
+    # are not for anonymous callers: a scrape token or a JWT is required.
+    if not _is_metrics_scraper(request) and jwt_payload_from_request(request) is None:
+        return HttpResponse("authentication required\n", status=403, content_type="text/plain; charset=utf-8")
+    return HttpResponse(render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+class CacheStatsView(APIView):
+    permission_classes = [IsAuthenticatedFromJWT]
+
+    def get(self, request):
+        # Make sure configured caches show up even before their first use.
+        get_product_search_cache()
+        get_document_cache()
+        return Response(cache_stats())
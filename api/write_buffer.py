@@ -0,0 +1,240 @@
+# In-process write buffer for bursty product writes. Index/update requests
+# are coalesced per document id and sent as periodic _bulk requests by a
+# background thread, so a feed pushing thousands of single-document writes
+# costs a handful of bulk round trips and refreshes instead.
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from django.conf import settings
+from elasticsearch import helpers
+from .es_client import get_es_client
+
+logger = logging.getLogger(__name__)
+
+# Buffered writes were already answered with 202, so a failed flush cannot
+# be reported to the client; the most recent failures are kept for stats().
+RECENT_FAILURES = 100
+
+
+class WriteBufferFull(Exception):
+    pass
+
+
+class WriteBuffer:
+    """
+    Coalescing write buffer for one index.
+
+    ``put`` merges writes for the same id (a later full document replaces
+    the pending one; a partial update is merged into it) and returns once
+    the write is queued. A flush is triggered when ``max_docs`` are pending
+    or ``flush_interval`` seconds have passed since the oldest pending
+    write. When ``capacity`` writes are pending, ``put`` blocks for up to
+    ``put_timeout`` seconds and then raises WriteBufferFull.
+    """
+
+    def __init__(self, es_factory, index, max_docs=500, flush_interval=1.0, capacity=10000, put_timeout=2.0,
+                 on_flush=None):
+        self.es_factory = es_factory
+        self.index = index
+        self.max_docs = max_docs
+        self.flush_interval = flush_interval
+        self.capacity = capacity
+        self.put_timeout = put_timeout
+        self.on_flush = on_flush
+        self._pending = OrderedDict()
+        self._oldest = None
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._closed = False
+        self.stats_counters = {
+            "queued": 0, "coalesced": 0, "flushes": 0, "flushed_docs": 0, "failed_docs": 0, "rejected": 0,
+        }
+        self.recent_failures = deque(maxlen=RECENT_FAILURES)
+
+    def _ensure_thread(self):
+        # The flusher thread does not survive a fork; start one per process.
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name=f"write-buffer-{self.index}", daemon=True)
+        self._thread.start()
+
+    def put(self, doc_id, source, op="index"):
+        with self._cond:
+            if self._closed:
+                raise WriteBufferFull("write buffer is closed")
+            self._ensure_thread()
+            if doc_id not in self._pending and len(self._pending) >= self.capacity:
+                self._cond.notify_all()
+                deadline = time.monotonic() + self.put_timeout
+                while len(self._pending) >= self.capacity:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.stats_counters["rejected"] += 1
+                        raise WriteBufferFull("write buffer is full")
+                    self._cond.wait(remaining)
+            existing = self._pending.get(doc_id)
+            if existing is not None:
+                self.stats_counters["coalesced"] += 1
+                if op == "update":
+                    source = {**existing[1], **source}
+                    op = existing[0]
+            self._pending[doc_id] = (op, source)
+            self.stats_counters["queued"] += 1
+            if self._oldest is None:
+                # Wake the idle flusher so it starts the flush_interval clock.
+                self._oldest = time.monotonic()
+                self._cond.notify_all()
+            if len(self._pending) >= self.max_docs:
+                self._cond.notify_all()
+
+    def is_pending(self, doc_id):
+        with self._cond:
+            return doc_id in self._pending
+
+    def discard(self, doc_id):
+        """Drop a pending write, e.g. because the document is being deleted."""
+        with self._cond:
+            if self._pending.pop(doc_id, None) is not None:
+                self._cond.notify_all()
+                return True
+            return False
+
+    @contextmanager
+    def paused(self):
+        """
+        Hold off flushes for the block: a batch already being sent finishes
+        first and none starts until the block exits. Deletes run in here so
+        a write taken for an in-flight batch cannot land after them.
+        """
+        with self._flush_lock:
+            yield
+
+    def _take(self):
+        batch = self._pending
+        self._pending = OrderedDict()
+        self._oldest = None
+        self._cond.notify_all()
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if len(self._pending) >= self.max_docs:
+                        break
+                    if self._oldest is not None:
+                        remaining = self._oldest + self.flush_interval - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+                if self._closed and not self._pending:
+                    return
+            self.flush()
+
+    def flush(self):
+        """Send everything pending now from the calling thread."""
+        # Taking the batch under the flush lock keeps batches in order, so an
+        # older write for an id can never land after a newer one.
+        with self._flush_lock:
+            with self._cond:
+                batch = self._take()
+            if batch:
+                self._send(batch)
+
+    def _send(self, batch):
+        actions = []
+        for doc_id, (op, source) in batch.items():
+            if op == "update":
+                actions.append({"_op_type": "update", "_index": self.index, "_id": doc_id, "doc": source})
+            else:
+                actions.append({"_op_type": "index", "_index": self.index, "_id": doc_id, "_source": source})
+        failed = 0
+        try:
+            for ok, item in helpers.streaming_bulk(
+                self.es_factory(), actions, chunk_size=self.max_docs, raise_on_error=False, raise_on_exception=False
+            ):
+                if not ok:
+                    failed += 1
+                    result = next(iter(item.values()), {})
+                    self._record_failure(result.get("_id"), result.get("error") or result.get("status"))
+                    logger.warning("buffered write to %s failed: %s", self.index, item)
+        except Exception as exc:
+            failed = len(actions)
+            for doc_id in batch:
+                self._record_failure(doc_id, repr(exc))
+            logger.exception("flushing %d buffered writes to %s failed", len(actions), self.index)
+        self.stats_counters["flushes"] += 1
+        self.stats_counters["flushed_docs"] += len(actions) - failed
+        self.stats_counters["failed_docs"] += failed
+        if self.on_flush is not None:
+            self.on_flush(list(batch))
+
+    def _record_failure(self, doc_id, error):
+        if isinstance(error, dict):
+            error = error.get("reason") or error.get("type")
+        self.recent_failures.append({
+            "id": doc_id, "error": str(error), "at": datetime.now(timezone.utc).isoformat(),
+        })
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self.flush()
+
+    def stats(self):
+        with self._cond:
+            pending = len(self._pending)
+        return dict(self.stats_counters, pending=pending, capacity=self.capacity,
+                    recent_failures=list(self.recent_failures))
+
+
+_buffers = {}
+_buffers_lock = threading.Lock()
+
+
+def get_write_buffer(index, on_flush=None):
+    """Return the process-wide buffer for ``index``, or None when buffering is disabled."""
+    config = settings.PRODUCT_WRITE_BUFFER
+    if not config["ENABLED"]:
+        return None
+    with _buffers_lock:
+        buffer = _buffers.get(index)
+        if buffer is None:
+            buffer = _buffers[index] = WriteBuffer(
+                get_es_client,
+                index,
+                max_docs=config["MAX_DOCS"],
+                flush_interval=config["FLUSH_INTERVAL"],
+                capacity=config["CAPACITY"],
+                put_timeout=config["PUT_TIMEOUT"],
+                on_flush=on_flush,
+            )
+        return buffer
+
+
+def write_buffer_stats():
+    with _buffers_lock:
+        buffers = dict(_buffers)
+    return {index: buffer.stats() for index, buffer in buffers.items()}
+
+
+@atexit.register
+def flush_write_buffers():
+    with _buffers_lock:
+        buffers = list(_buffers.values())
+    for buffer in buffers:
+        try:
+            buffer.close()
+        except Exception:
+            logger.exception("flushing write buffer for %s at shutdown failed", buffer.index)
@@ -0,0 +1,23 @@
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+django_application = get_asgi_application()
+
+# Imported once the app registry is ready.
+from api.es_client import close_async_es_client  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # Django does not handle ASGI lifespan events; answer them here so the
+    # worker's AsyncElasticsearch client is closed on shutdown.
+    if scope["type"] != "lifespan":
+        return await django_application(scope, receive, send)
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await close_async_es_client()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
@@ -22,13 +22,15 @@ INSTALLED_APPS = [
 
     # Third-party
     "rest_framework",
-    "rest_framework_simplejwt.token_blacklist",  # optional: remove if you don't want blacklist
     "corsheaders",  # <-- add this line
     # Your app
     "api",
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover the rest of the stack.
+    "api.middleware.RequestMetricsMiddleware",
+    "api.middleware.CompressionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -78,6 +80,7 @@ CORS_EXPOSE_HEADERS = [
 
 ROOT_URLCONF = "backend.urls"
 WSGI_APPLICATION = "backend.wsgi.application"
+ASGI_APPLICATION = "backend.asgi.application"
 
 # Templates: REQUIRED for admin and many Django features
 TEMPLATES = [
@@ -97,7 +100,8 @@ TEMPLATES = [
     },
 ]
 
-# Minimal SQLite DB for Django built-in migrations (token blacklist uses it)
+# Minimal SQLite DB for Django built-in migrations; at runtime only the
+# database token store (TOKEN_STORE_BACKEND=database) writes to it
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
@@ -105,6 +109,32 @@ DATABASES = {
     }
 }
 
+# Password hashing. PASSWORD_HASHER picks the preferred hasher ("pbkdf2",
+# "argon2" needs argon2-cffi, "bcrypt" needs bcrypt); the others stay listed
+# so existing hashes still verify and are upgraded on the next login.
+PASSWORD_HASHER = os.getenv("PASSWORD_HASHER", "pbkdf2")
+_PASSWORD_HASHERS = {
+    "pbkdf2": "api.hashers.TunablePBKDF2PasswordHasher",
+    "argon2": "api.hashers.TunableArgon2PasswordHasher",
+    "bcrypt": "api.hashers.TunableBCryptSHA256PasswordHasher",
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    path for name, path in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER
+]
+# Cost overrides; 0 keeps Django's default for that hasher
+PASSWORD_HASH_COST = {
+    "PBKDF2_ITERATIONS": int(os.getenv("PBKDF2_ITERATIONS", 0)),
+    "ARGON2_TIME_COST": int(os.getenv("ARGON2_TIME_COST", 0)),
+    "ARGON2_MEMORY_COST": int(os.getenv("ARGON2_MEMORY_COST", 0)),
+    "ARGON2_PARALLELISM": int(os.getenv("ARGON2_PARALLELISM", 0)),
+    "BCRYPT_ROUNDS": int(os.getenv("BCRYPT_ROUNDS", 0)),
+}
+# Concurrent hashes/verifications allowed (0 disables the limit), and how
+# many more callers may wait for a slot, for up to QUEUE_TIMEOUT seconds
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 2))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", 32))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", 2))
+
 # Internationalization / static
 LANGUAGE_CODE = "en-us"
 TIME_ZONE = "UTC"
@@ -113,16 +143,210 @@ USE_TZ = True
 STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# JSON backend for API responses and request bodies: "stdlib" (DRF's
+# renderer/parser) or "orjson" (needs `pip install orjson`; much faster on
+# large listing pages)
+API_JSON_BACKEND = os.getenv("API_JSON_BACKEND", "stdlib")
+_JSON_RENDERERS = {"stdlib": "api.renderers.TimedJSONRenderer", "orjson": "api.renderers.ORJSONRenderer"}
+_JSON_PARSERS = {"stdlib": "rest_framework.parsers.JSONParser", "orjson": "api.renderers.ORJSONParser"}
+
 # REST Framework: we use custom token validation, so no default auth classes
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [],
     "DEFAULT_PERMISSION_CLASSES": [],
+    "DEFAULT_RENDERER_CLASSES": [
+        _JSON_RENDERERS[API_JSON_BACKEND],
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        _JSON_PARSERS[API_JSON_BACKEND],
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
+# Response compression (api.middleware.CompressionMiddleware): bodies of at
+# least MIN_BYTES are sent as brotli (if `pip install brotli` and accepted)
+# or gzip. Turn off when a reverse proxy already compresses.
+# Responses under EXCLUDE_PATHS (comma separated prefixes) are never
+# compressed: auth responses carry tokens next to attacker-influenced input,
+# which compression ratios can leak (BREACH).
+RESPONSE_COMPRESSION = {
+    "ENABLED": os.getenv("RESPONSE_COMPRESSION", "1").lower() in ("1", "true", "yes"),
+    "MIN_BYTES": int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", 1024)),
+    "GZIP_LEVEL": int(os.getenv("RESPONSE_COMPRESSION_GZIP_LEVEL", 4)),
+    "BROTLI_QUALITY": int(os.getenv("RESPONSE_COMPRESSION_BROTLI_QUALITY", 4)),
+    "EXCLUDE_PATHS": [p for p in os.getenv("RESPONSE_COMPRESSION_EXCLUDE_PATHS", "/api/auth/").split(",") if p],
+}
+
+# Request metrics (api.middleware.RequestMetricsMiddleware, GET /api/metrics/)
+METRICS_SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "1").lower() in ("1", "true", "yes")
+# Bearer token a scraper (Prometheus) sends for GET /api/metrics/; a valid
+# JWT access token is accepted too. Without either the endpoint answers 403.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Log requests slower than this many milliseconds with their Elasticsearch
+# query bodies to the "api.slow_requests" logger (0 disables). Only search
+# style bodies are logged, with credential fields redacted; document writes
+# and anything sent to the users/tokens indices are listed without a body.
+SLOW_REQUEST_LOG_MS = int(os.getenv("SLOW_REQUEST_LOG_MS", 0))
+SLOW_REQUEST_LOG_BODY_CHARS = int(os.getenv("SLOW_REQUEST_LOG_BODY_CHARS", 2000))
+
 # Elasticsearch config
 ELASTICSEARCH_HOST = os.getenv("ELASTICSEARCH_HOST", "http://localhost:9200")
 ELASTICSEARCH_USER = os.getenv("ELASTICSEARCH_USER", "")
 ELASTICSEARCH_PASSWORD = os.getenv("ELASTICSEARCH_PASSWORD", "")
+# Dotted path to a zero-argument callable returning the client to use instead
+# of Elasticsearch(...) (e.g. a stand-in for benchmarks). This is only a hook:
+# the stand-in shipped with the app is SEARCH_BACKEND=memory below.
+ELASTICSEARCH_CLIENT_FACTORY = os.getenv("ELASTICSEARCH_CLIENT_FACTORY", "")
+
+# Search backend: "elasticsearch" (the cluster above) or "memory" (an
+# in-process engine, api.memory_client, for running the API and its load
+# tests offline; data is per worker process and lost on exit). With memory,
+# CREATE_INDICES creates the registry indices on first use and the SEED_*
+# counts load synthetic documents into them.
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "elasticsearch")
+MEMORY_SEARCH = {
+    "CREATE_INDICES": os.getenv("MEMORY_SEARCH_CREATE_INDICES", "1") == "1",
+    "SEED_PRODUCTS": int(os.getenv("MEMORY_SEARCH_SEED_PRODUCTS", 0)),
+    "SEED_ARTICLES": int(os.getenv("MEMORY_SEARCH_SEED_ARTICLES", 0)),
+    "SEED": int(os.getenv("MEMORY_SEARCH_SEED", 0)),
+}
+
+# Elasticsearch connection pool (one shared client per worker process)
+ELASTICSEARCH_POOL_MAXSIZE = int(os.getenv("ELASTICSEARCH_POOL_MAXSIZE", 10))
+ELASTICSEARCH_KEEP_ALIVE = os.getenv("ELASTICSEARCH_KEEP_ALIVE", "1") == "1"
+ELASTICSEARCH_REQUEST_TIMEOUT = float(os.getenv("ELASTICSEARCH_REQUEST_TIMEOUT", 10))
+ELASTICSEARCH_MAX_RETRIES = int(os.getenv("ELASTICSEARCH_MAX_RETRIES", 3))
+ELASTICSEARCH_RETRY_ON_TIMEOUT = os.getenv("ELASTICSEARCH_RETRY_ON_TIMEOUT", "1") == "1"
+ELASTICSEARCH_HTTP_COMPRESS = os.getenv("ELASTICSEARCH_HTTP_COMPRESS", "0") == "1"
+ELASTICSEARCH_SNIFF_ON_START = os.getenv("ELASTICSEARCH_SNIFF_ON_START", "0") == "1"
+ELASTICSEARCH_SNIFF_ON_NODE_FAILURE = os.getenv("ELASTICSEARCH_SNIFF_ON_NODE_FAILURE", "0") == "1"
+# Minimum seconds between sniffs; 0 leaves the client default
+ELASTICSEARCH_SNIFF_INTERVAL = float(os.getenv("ELASTICSEARCH_SNIFF_INTERVAL", 0))
+
+# Product listing pagination
+# track_total_hits default: True counts exactly, False skips, an int caps the count
+# (10000 matches the Elasticsearch default)
+_track_total = os.getenv("PRODUCT_TRACK_TOTAL_HITS", "10000").lower()
+PRODUCT_TRACK_TOTAL_HITS = (
+    True if _track_total in ("1", "true") else False if _track_total in ("0", "false") else int(_track_total)
+)
+PRODUCT_MAX_RESULT_WINDOW = int(os.getenv("PRODUCT_MAX_RESULT_WINDOW", 10000))
+PRODUCT_CURSOR_KEEP_ALIVE = os.getenv("PRODUCT_CURSOR_KEEP_ALIVE", "1m")
+
+# _source fields left out of product listings unless the client asks with
+# fields=/exclude= (comma separated). The long description is only needed on
+# detail pages; set it to "" to list full documents.
+PRODUCT_LIST_SOURCE_EXCLUDES = [f for f in os.getenv("PRODUCT_LIST_SOURCE_EXCLUDES", "description").split(",") if f]
+
+# Article listing (GET /api/articles/): same paging knobs as products.
+# Page mode keeps the original response, a bare list of ARTICLE_PAGE_SIZE
+# articles, unless the client asks for the items/total object with
+# envelope=true; cursor mode always answers the object.
+_article_track_total = os.getenv("ARTICLE_TRACK_TOTAL_HITS", "10000").lower()
+ARTICLE_TRACK_TOTAL_HITS = (
+    True if _article_track_total in ("1", "true")
+    else False if _article_track_total in ("0", "false")
+    else int(_article_track_total)
+)
+ARTICLE_PAGE_SIZE = int(os.getenv("ARTICLE_PAGE_SIZE", 100))
+ARTICLE_MAX_RESULT_WINDOW = int(os.getenv("ARTICLE_MAX_RESULT_WINDOW", PRODUCT_MAX_RESULT_WINDOW))
+ARTICLE_CURSOR_KEEP_ALIVE = os.getenv("ARTICLE_CURSOR_KEEP_ALIVE", PRODUCT_CURSOR_KEEP_ALIVE)
+# view=excerpt returns a highlighted snippet of this many characters
+ARTICLE_EXCERPT_SIZE = int(os.getenv("ARTICLE_EXCERPT_SIZE", 200))
+
+# Product facets (GET /api/products/?facets=category,tags,in_stock,price)
+PRODUCT_FACET_SIZE = int(os.getenv("PRODUCT_FACET_SIZE", 20))
+PRODUCT_PRICE_RANGES = [
+    {"to": 25},
+    {"from": 25, "to": 50},
+    {"from": 50, "to": 100},
+    {"from": 100, "to": 250},
+    {"from": 250},
+]
+
+# Product search result cache. BACKEND is "local" (per-process LRU with TTL),
+# "django" (the Django cache framework, shared when ALIAS points at
+# memcached/redis) or "none". Writes invalidate it by bumping a generation.
+# The local backend keeps that generation per process: a write only
+# invalidates the worker that handled it, and every other worker keeps
+# serving stale results for up to TTL seconds. Use "django" with a shared
+# ALIAS when running several workers.
+PRODUCT_SEARCH_CACHE = {
+    "BACKEND": os.getenv("PRODUCT_SEARCH_CACHE_BACKEND", "local"),
+    "ALIAS": os.getenv("PRODUCT_SEARCH_CACHE_ALIAS", "default"),
+    "MAX_ENTRIES": int(os.getenv("PRODUCT_SEARCH_CACHE_MAX_ENTRIES", 2048)),
+    "TTL": int(os.getenv("PRODUCT_SEARCH_CACHE_TTL", 30)),
+    # Seconds after a write (without refresh=wait_for) at which the cache is
+    # invalidated again, once the index refresh made it searchable. Keep it
+    # above the index refresh_interval (1s); 0 disables the second bump.
+    "REFRESH_DELAY": float(os.getenv("PRODUCT_SEARCH_CACHE_REFRESH_DELAY", 1.5)),
+}
+
+# Product autocomplete (GET /api/products/suggest/?prefix=). Popular prefixes
+# are kept in a small in-process cache for a few seconds; suggest calls get
+# their own short client timeout so a slow cluster fails fast on keystrokes.
+PRODUCT_SUGGEST_CACHE = {
+    "BACKEND": os.getenv("PRODUCT_SUGGEST_CACHE_BACKEND", "local"),
+    "MAX_ENTRIES": int(os.getenv("PRODUCT_SUGGEST_CACHE_MAX_ENTRIES", 4096)),
+    "TTL": int(os.getenv("PRODUCT_SUGGEST_CACHE_TTL", 10)),
+}
+PRODUCT_SUGGEST_SIZE = int(os.getenv("PRODUCT_SUGGEST_SIZE", 8))
+PRODUCT_SUGGEST_TIMEOUT = float(os.getenv("PRODUCT_SUGGEST_TIMEOUT", 1.0))
+
+# Single-document read-through cache for product/article detail GETs.
+# TTL bounds how long a worker's local copy may lag writes made by other
+# workers; the optional shared tier ("django") is invalidated on PUT/DELETE.
+DOCUMENT_CACHE = {
+    "MAX_ENTRIES": int(os.getenv("DOCUMENT_CACHE_MAX_ENTRIES", 4096)),
+    "TTL": int(os.getenv("DOCUMENT_CACHE_TTL", 5)),
+    "SHARED_BACKEND": os.getenv("DOCUMENT_CACHE_SHARED_BACKEND", "none"),
+    "SHARED_ALIAS": os.getenv("DOCUMENT_CACHE_SHARED_ALIAS", "default"),
+    "SHARED_TTL": int(os.getenv("DOCUMENT_CACHE_SHARED_TTL", 60)),
+}
+
+# Maximum ids accepted by the _mget endpoints
+MGET_MAX_IDS = int(os.getenv("MGET_MAX_IDS", 1000))
+
+# Bulk product ingestion (POST /api/products/bulk/ and manage.py import_products)
+PRODUCT_BULK_CHUNK_SIZE = int(os.getenv("PRODUCT_BULK_CHUNK_SIZE", 500))
+PRODUCT_BULK_MAX_CHUNK_BYTES = int(os.getenv("PRODUCT_BULK_MAX_CHUNK_BYTES", 10 * 1024 * 1024))
+PRODUCT_BULK_THREADS = int(os.getenv("PRODUCT_BULK_THREADS", 4))
+PRODUCT_BULK_QUEUE_SIZE = int(os.getenv("PRODUCT_BULK_QUEUE_SIZE", 4))
+PRODUCT_BULK_MAX_ERRORS = int(os.getenv("PRODUCT_BULK_MAX_ERRORS", 1000))
+
+# Catalog export (GET /api/products/export and manage.py export_products):
+# hits per point-in-time page, how long the point-in-time stays open between
+# pages, and how many bytes are gathered before a chunk is sent/compressed.
+PRODUCT_EXPORT_PAGE_SIZE = int(os.getenv("PRODUCT_EXPORT_PAGE_SIZE", 1000))
+PRODUCT_EXPORT_KEEP_ALIVE = os.getenv("PRODUCT_EXPORT_KEEP_ALIVE", "2m")
+PRODUCT_EXPORT_CHUNK_BYTES = int(os.getenv("PRODUCT_EXPORT_CHUNK_BYTES", 64 * 1024))
+
+# Default refresh policy for writes when the request has no ?refresh=
+# ("false": return once durable, "wait_for": return once searchable)
+ES_WRITE_REFRESH = os.getenv("ES_WRITE_REFRESH", "false")
+
+# Optional write buffer for product creates/updates: writes are coalesced per
+# id and sent as _bulk every FLUSH_INTERVAL seconds or MAX_DOCS writes. When
+# CAPACITY writes are pending, requests wait up to PUT_TIMEOUT seconds, then
+# get 503. Buffered writes are answered with 202 and flushed at shutdown; a
+# write that fails at flush time is only logged and listed in the buffer stats.
+PRODUCT_WRITE_BUFFER = {
+    "ENABLED": os.getenv("PRODUCT_WRITE_BUFFER", "0").lower() in ("1", "true", "yes"),
+    "MAX_DOCS": int(os.getenv("PRODUCT_WRITE_BUFFER_MAX_DOCS", 500)),
+    "FLUSH_INTERVAL": float(os.getenv("PRODUCT_WRITE_BUFFER_FLUSH_INTERVAL", 1.0)),
+    "CAPACITY": int(os.getenv("PRODUCT_WRITE_BUFFER_CAPACITY", 10000)),
+    "PUT_TIMEOUT": float(os.getenv("PRODUCT_WRITE_BUFFER_PUT_TIMEOUT", 2.0)),
+}
+
+# POST /api/products/_delete: most ids accepted per request
+PRODUCT_BULK_DELETE_MAX = int(os.getenv("PRODUCT_BULK_DELETE_MAX", 10000))
+
+# Stock changes (POST /api/products/<id>/stock/, POST /api/products/stock/_bulk)
+PRODUCT_STOCK_BULK_MAX = int(os.getenv("PRODUCT_STOCK_BULK_MAX", 10000))
+PRODUCT_UPDATE_RETRY_ON_CONFLICT = int(os.getenv("PRODUCT_UPDATE_RETRY_ON_CONFLICT", 5))
 
 # SIMPLE JWT configuration
 SIMPLE_JWT = {
@@ -130,8 +354,32 @@ SIMPLE_JWT = {
     "ALGORITHM": os.getenv("JWT_ALGORITHM", "HS256"),
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=int(os.getenv("JWT_ACCESS_MINUTES", 60))),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=int(os.getenv("JWT_REFRESH_DAYS", 7))),
-    "ROTATE_REFRESH_TOKENS": False,
-    "BLACKLIST_AFTER_ROTATION": False,
+    "ROTATE_REFRESH_TOKENS": os.getenv("JWT_ROTATE_REFRESH_TOKENS", "0").lower() in ("1", "true", "yes"),
+    "BLACKLIST_AFTER_ROTATION": os.getenv("JWT_BLACKLIST_AFTER_ROTATION", "1").lower() in ("1", "true", "yes"),
+}
+
+# Refresh-token state (api.token_store): "elasticsearch" keeps issued and
+# revoked refresh tokens in the INDEX index, shared by every node;
+# "database" uses SimpleJWT's blacklist tables in the local database. A
+# dotted path selects a custom TokenStore. Revocation checks are cached in
+# process: revoked jtis until they expire, "not revoked" for
+# CACHE_NEGATIVE_TTL seconds (CACHE_MAX_ENTRIES=0 disables the cache).
+TOKEN_STORE = {
+    "BACKEND": os.getenv("TOKEN_STORE_BACKEND", "elasticsearch"),
+    "INDEX": os.getenv("TOKEN_STORE_INDEX", "tokens"),
+    "RECORD_ISSUED": os.getenv("TOKEN_STORE_RECORD_ISSUED", "1").lower() in ("1", "true", "yes"),
+    "CACHE_MAX_ENTRIES": int(os.getenv("TOKEN_STORE_CACHE_MAX_ENTRIES", 100000)),
+    "CACHE_NEGATIVE_TTL": float(os.getenv("TOKEN_STORE_CACHE_NEGATIVE_TTL", 5)),
+}
+if TOKEN_STORE["BACKEND"] == "database":
+    INSTALLED_APPS.append("rest_framework_simplejwt.token_blacklist")
+
+# Verified access-token cache used by IsAuthenticatedFromJWT. Entries expire
+# at the earlier of TTL seconds and the token's own exp claim; MAX_ENTRIES=0
+# disables it.
+JWT_VERIFY_CACHE = {
+    "MAX_ENTRIES": int(os.getenv("JWT_VERIFY_CACHE_MAX_ENTRIES", 10000)),
+    "TTL": int(os.getenv("JWT_VERIFY_CACHE_TTL", 300)),
 }
 
 # Optional convenience constants
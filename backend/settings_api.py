@@ -0,0 +1,38 @@
+# Lean API-only profile: DJANGO_SETTINGS_MODULE=backend.settings_api
+#
+# Everything in backend.settings applies, minus the parts the token
+# authenticated JSON API never uses: admin, sessions, messages, static files,
+# templates, the browsable API and the session/CSRF/auth/message middleware.
+# DRF views are CSRF exempt and authenticate from the Authorization header,
+# so requests behave the same with a shorter middleware stack and workers
+# boot without importing admin, forms and the template engine.
+from .settings import *  # noqa: F401,F403
+from .settings import REST_FRAMEWORK, TOKEN_STORE, _JSON_RENDERERS, API_JSON_BACKEND
+
+INSTALLED_APPS = [
+    # auth/contenttypes back SimpleJWT's token models and DRF's anonymous user
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "rest_framework",
+    "corsheaders",
+    "api",
+]
+if TOKEN_STORE["BACKEND"] == "database":
+    INSTALLED_APPS.append("rest_framework_simplejwt.token_blacklist")
+
+MIDDLEWARE = [
+    "api.middleware.RequestMetricsMiddleware",
+    "api.middleware.CompressionMiddleware",
+    "corsheaders.middleware.CorsMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    "django.middleware.common.CommonMiddleware",
+]
+
+TEMPLATES = []
+
+REST_FRAMEWORK = dict(
+    REST_FRAMEWORK,
+    DEFAULT_RENDERER_CLASSES=[_JSON_RENDERERS[API_JSON_BACKEND]],
+    # Nothing reads request.user; skip building an AnonymousUser per request.
+    UNAUTHENTICATED_USER=None,
+)